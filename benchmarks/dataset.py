@@ -0,0 +1,367 @@
+"""
+A synthetic, reproducible dataset for benchmarks: users, photos, tags, comments and ratings.
+
+The data has the shape of a real photo-sharing site rather than uniform noise:
+
+- tag popularity follows a power law, so a few tags are on a large share of the photos;
+- so does user activity: a few users post most of the photos and comments;
+- a small fraction of photos are viral, with comment and rating counts orders of
+  magnitude above the rest.
+
+Rows are generated in batches and streamed to Postgres with `COPY`, so millions of rows
+load in minutes and memory stays bounded by `--batch-size`. The same `--seed` always
+produces the same rows, IDs included. Every user logs in with `BENCH_PASSWORD`.
+
+The spec of the loaded dataset is stored in the one-row table `bench_dataset`, so
+benchmarks describe the data that is actually in the database.
+
+Meant for a dedicated benchmark database: `--reset` empties all application tables first,
+and the load holds an exclusive lock on `photos` and `photo_tag` until it commits.
+
+    python -m benchmarks.dataset --users 1000000 --photos 5000000 --seed 1 --reset
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import asyncpg
+
+from src.configuration.settings import config
+from src.entity.models import Base
+
+BENCH_PASSWORD = "benchmark"
+# The bcrypt hash of `BENCH_PASSWORD`, fixed so every load writes the same `users.password`;
+# hashing it per load would pick a new random salt.
+BENCH_PASSWORD_HASH = "$2b$12$6FkOEm6WwdL8SI47Ne6KoOK7SsnZdsaEoAYIR4V8ZDVEV/2Iw4mOe"
+# Holds the `Spec.describe()` of the loaded dataset. Not an application table, so it is not
+# part of the migrations and `--reset` does not empty it; every load overwrites its row.
+SPEC_TABLE = "bench_dataset"
+# Bump whenever a change to the generator makes the same `Spec` produce different rows, so
+# benchmark results recorded on the old data are not compared with the new.
+GENERATOR_VERSION = 3
+WORDS = (
+    "sunset beach mountain river city night street portrait forest lake snow desert bridge "
+    "tower market garden flower bird dog cat coffee train harbor island road storm cloud"
+).split()
+_START = datetime(2023, 1, 1)
+_SPAN = timedelta(days=365)
+_MASK = (1 << 64) - 1
+
+_USER_COLUMNS = ("id", "username", "email", "password", "role", "created_at", "updated_at")
+_TAG_COLUMNS = ("id", "name")
+_PHOTO_COLUMNS = (
+    "id", "cloudinary_id", "url", "description", "user_id", "created_at", "updated_at",
+    "rating_count", "rating_sum", "comment_count",
+)
+_PHOTO_TAG_COLUMNS = ("photo_id", "tag_id")
+_COMMENT_COLUMNS = ("id", "text", "user_id", "photo_id", "created_at", "updated_at")
+_RATING_COLUMNS = ("id", "photo_id", "user_id", "rating")
+# Maintained row by row by triggers (migration 7998bb822df5); during a bulk load they are
+# disabled and the search vectors are computed once per photo after each batch instead.
+_SEARCH_TRIGGERS = (("photos", "photos_search_vector_update"), ("photo_tag", "photo_tag_search_vector_update"))
+
+
+def user_email(index: int) -> str:
+    return f"bench_{index}@example.com"
+
+
+def tag_name(index: int) -> str:
+    return f"{WORDS[index % len(WORDS)]}{index // len(WORDS) or ''}"
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _splitmix64(value: int) -> int:
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+class Ids:
+    """
+    Deterministic UUIDs by entity and index, so rows can reference each other without
+    keeping the referenced rows in memory. The index sits in the low bits, which keeps the
+    IDs unique; the high bits are a hash of it, which keeps them in random order like `uuid4`.
+    """
+
+    def __init__(self, seed: int):
+        self.seed = seed
+
+    def __call__(self, entity: int, index: int) -> uuid.UUID:
+        high = _splitmix64((self.seed << 8 | entity) * 0x100000001B3 ^ index)
+        return uuid.UUID(int=high << 64 | index, version=4)
+
+
+_USER, _TAG, _PHOTO, _COMMENT, _RATING = range(5)
+
+
+def _zipf(rng: random.Random, n: int, skew: float) -> int:
+    """
+    A 0-based index in `[0, n)` drawn with probability roughly proportional to `1 / (index + 1) ** skew`.
+    Inverse transform of the continuous power law, so no table of `n` weights is needed.
+    """
+    u = rng.random()
+    if skew == 1.0:
+        x = (n + 1) ** u
+    else:
+        exponent = 1.0 - skew
+        x = (((n + 1) ** exponent - 1.0) * u + 1.0) ** (1.0 / exponent)
+    return min(int(x) - 1, n - 1)
+
+
+class Spec:
+    """
+    The size and shape of the dataset.
+
+    **Attributes:**
+
+    - `users`, `photos`, `tags` (int): Number of rows of each.
+    - `comments_per_photo`, `ratings_per_photo` (float): Mean count on an ordinary photo.
+    - `tag_skew`, `user_skew` (float): Power-law exponents of tag popularity and user activity.
+    - `viral_fraction` (float): Share of photos that are viral.
+    - `viral_factor` (float): How many times more comments and ratings a viral photo gets.
+    - `seed` (int): Seed of the random generator.
+    - `batch_size` (int): Photos generated and copied per batch.
+    """
+
+    def __init__(
+        self,
+        users: int = 100,
+        photos: int = 2000,
+        tags: int = 200,
+        comments_per_photo: float = 5.0,
+        ratings_per_photo: float = 5.0,
+        tag_skew: float = 1.1,
+        user_skew: float = 1.0,
+        viral_fraction: float = 0.001,
+        viral_factor: float = 200.0,
+        seed: int = 1,
+        batch_size: int = 10000,
+    ):
+        self.users = users
+        self.photos = photos
+        self.tags = tags
+        self.comments_per_photo = comments_per_photo
+        self.ratings_per_photo = ratings_per_photo
+        self.tag_skew = tag_skew
+        self.user_skew = user_skew
+        self.viral_fraction = viral_fraction
+        self.viral_factor = viral_factor
+        self.seed = seed
+        self.batch_size = batch_size
+
+    def describe(self) -> dict:
+        """
+        The spec with the generator version; together they determine every generated row.
+        `batch_size` is left out, it only changes how the rows are copied.
+        """
+        fields = {name: value for name, value in vars(self).items() if name != "batch_size"}
+        return {"generator": GENERATOR_VERSION, **fields}
+
+
+class Generator:
+    """Produces the rows of a `Spec`, batch by batch, from a single seeded random stream."""
+
+    def __init__(self, spec: Spec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.ids = Ids(spec.seed)
+        self.comments = 0
+        self.ratings = 0
+
+    def users(self, start: int, stop: int) -> list[tuple]:
+        return [
+            (
+                self.ids(_USER, index), f"bench_{index}", user_email(index), BENCH_PASSWORD_HASH,
+                "admin" if index == 0 else "user", _START, _START,
+            )
+            for index in range(start, stop)
+        ]
+
+    def tags(self) -> list[tuple]:
+        return [(self.ids(_TAG, index), tag_name(index)) for index in range(self.spec.tags)]
+
+    def photos(self, start: int, stop: int) -> dict[str, list[tuple]]:
+        spec, rng, ids = self.spec, self.rng, self.ids
+        rows = {"photos": [], "photo_tag": [], "comments": [], "ratings": []}
+        for index in range(start, stop):
+            photo_id = ids(_PHOTO, index)
+            owner = _zipf(rng, spec.users, spec.user_skew)
+            created_at = _START + _SPAN * (index / spec.photos) + timedelta(seconds=rng.randrange(60))
+
+            viral = rng.random() < spec.viral_fraction
+            if viral:
+                comment_count = int(spec.comments_per_photo * spec.viral_factor * rng.uniform(0.5, 1.5))
+                rating_count = int(spec.ratings_per_photo * spec.viral_factor * rng.uniform(0.5, 1.5))
+            else:
+                comment_count = int(rng.expovariate(1 / spec.comments_per_photo)) if spec.comments_per_photo else 0
+                rating_count = int(rng.expovariate(1 / spec.ratings_per_photo)) if spec.ratings_per_photo else 0
+            rating_count = min(rating_count, spec.users - 1)
+
+            tags = set()
+            for _ in range(min(rng.randint(0, 5), spec.tags)):
+                tags.add(_zipf(rng, spec.tags, spec.tag_skew))
+            rows["photo_tag"].extend((photo_id, ids(_TAG, tag)) for tag in sorted(tags))
+
+            for offset in range(comment_count):
+                commented_at = created_at + timedelta(seconds=offset + rng.expovariate(1 / 3600))
+                rows["comments"].append((
+                    ids(_COMMENT, self.comments), sentence(rng, rng.randint(2, 12)),
+                    ids(_USER, _zipf(rng, spec.users, spec.user_skew)), photo_id, commented_at, commented_at,
+                ))
+                self.comments += 1
+
+            # One rating per user and none by the owner, as RatingRepository enforces.
+            raters = [rater for rater in rng.sample(range(spec.users), rating_count + 1) if rater != owner]
+            rating_sum = 0
+            for rater in raters[:rating_count]:
+                score = min(5, max(1, round(rng.gauss(3.8 if viral else 3.2, 1.0))))
+                rating_sum += score
+                rows["ratings"].append((ids(_RATING, self.ratings), photo_id, ids(_USER, rater), score))
+                self.ratings += 1
+
+            rows["photos"].append((
+                photo_id, f"bench_{index}",
+                f"https://res.cloudinary.com/{config.CLOUDINARY_NAME}/image/upload/v1/bench_{index}",
+                sentence(rng, rng.randint(3, 8)), ids(_USER, owner), created_at, created_at,
+                rating_count, rating_sum, comment_count,
+            ))
+        return rows
+
+
+async def load(
+    connection: asyncpg.Connection,
+    spec: Spec,
+    reset: bool = False,
+    progress: Optional[Callable[[str], None]] = None,
+) -> bool:
+    """
+    Generates the dataset of `spec` and copies it into the database in one transaction,
+    together with `spec.describe()` in `SPEC_TABLE`.
+
+    **Parameters:**
+
+    - `connection` (asyncpg.Connection): Connection to the benchmark database.
+    - `spec` (Spec): Size and shape of the dataset.
+    - `reset` (bool): Empty all application tables first.
+    - `progress` (Optional[Callable[[str], None]]): Called with a line of progress after every batch.
+
+    **Returns:**
+
+    - `bool`: `False` if the database already holds a dataset and nothing was inserted.
+    """
+    generator = Generator(spec)
+    report = progress or (lambda line: None)
+    async with connection.transaction():
+        if reset:
+            names = ", ".join(table.name for table in Base.metadata.sorted_tables)
+            await connection.execute(f"TRUNCATE {names} CASCADE")
+        elif await connection.fetchval("SELECT 1 FROM users WHERE email = $1", user_email(0)):
+            return False
+
+        for table, trigger in _SEARCH_TRIGGERS:
+            await connection.execute(f"ALTER TABLE {table} DISABLE TRIGGER {trigger}")
+
+        for start in range(0, spec.users, spec.batch_size):
+            stop = min(start + spec.batch_size, spec.users)
+            await connection.copy_records_to_table("users", records=generator.users(start, stop), columns=_USER_COLUMNS)
+            report(f"users {stop}/{spec.users}")
+        await connection.copy_records_to_table("tags", records=generator.tags(), columns=_TAG_COLUMNS)
+
+        for start in range(0, spec.photos, spec.batch_size):
+            stop = min(start + spec.batch_size, spec.photos)
+            rows = generator.photos(start, stop)
+            await connection.copy_records_to_table("photos", records=rows["photos"], columns=_PHOTO_COLUMNS)
+            await connection.copy_records_to_table("photo_tag", records=rows["photo_tag"], columns=_PHOTO_TAG_COLUMNS)
+            await connection.copy_records_to_table("comments", records=rows["comments"], columns=_COMMENT_COLUMNS)
+            await connection.copy_records_to_table("ratings", records=rows["ratings"], columns=_RATING_COLUMNS)
+            await connection.execute(
+                "UPDATE photos SET search_vector = photo_search_vector(id, description) WHERE id = ANY($1::uuid[])",
+                [row[0] for row in rows["photos"]],
+            )
+            report(
+                f"photos {stop}/{spec.photos}, comments {generator.comments}, ratings {generator.ratings}"
+            )
+
+        for table, trigger in _SEARCH_TRIGGERS:
+            await connection.execute(f"ALTER TABLE {table} ENABLE TRIGGER {trigger}")
+
+        await connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {SPEC_TABLE} (id boolean PRIMARY KEY DEFAULT true CHECK (id), spec jsonb NOT NULL)"
+        )
+        await connection.execute(
+            f"INSERT INTO {SPEC_TABLE} (spec) VALUES ($1) ON CONFLICT (id) DO UPDATE SET spec = EXCLUDED.spec",
+            json.dumps(spec.describe()),
+        )
+
+    # Fresh statistics, so the first benchmark queries get the same plans as later ones.
+    await connection.execute("ANALYZE")
+    return True
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("dataset")
+    group.add_argument("--users", type=int, default=100)
+    group.add_argument("--photos", type=int, default=2000)
+    group.add_argument("--tags", type=int, default=200)
+    group.add_argument("--comments-per-photo", type=float, default=5.0, help="mean on an ordinary photo")
+    group.add_argument("--ratings-per-photo", type=float, default=5.0, help="mean on an ordinary photo")
+    group.add_argument("--tag-skew", type=float, default=1.1, help="power-law exponent of tag popularity")
+    group.add_argument("--user-skew", type=float, default=1.0, help="power-law exponent of user activity")
+    group.add_argument("--viral-fraction", type=float, default=0.001, help="share of viral photos")
+    group.add_argument("--viral-factor", type=float, default=200.0, help="engagement of a viral photo over the mean")
+    group.add_argument("--batch-size", type=int, default=10000, help="photos generated and copied per batch")
+    group.add_argument("--seed", type=int, default=1)
+    group.add_argument("--reset", action="store_true", help="empty all application tables first")
+
+
+def spec_from_args(args: argparse.Namespace) -> Spec:
+    return Spec(
+        users=args.users,
+        photos=args.photos,
+        tags=args.tags,
+        comments_per_photo=args.comments_per_photo,
+        ratings_per_photo=args.ratings_per_photo,
+        tag_skew=args.tag_skew,
+        user_skew=args.user_skew,
+        viral_fraction=args.viral_fraction,
+        viral_factor=args.viral_factor,
+        seed=args.seed,
+        batch_size=args.batch_size,
+    )
+
+
+async def seed_from_args(args: argparse.Namespace, progress: Optional[Callable[[str], None]] = None) -> bool:
+    spec = spec_from_args(args)
+    connection = await asyncpg.connect(config.ASYNC_DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1))
+    try:
+        return await load(connection, spec, args.reset, progress)
+    finally:
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    def progress(line: str) -> None:
+        print(f"[{time.perf_counter() - start:7.1f}s] {line}", flush=True)
+
+    if asyncio.run(seed_from_args(args, progress)):
+        print(f"Seeded {args.users} users and {args.photos} photos in {time.perf_counter() - start:.1f}s")
+    else:
+        print("The database already holds a dataset, use --reset to replace it")
+
+
+if __name__ == "__main__":
+    main()
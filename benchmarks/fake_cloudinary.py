@@ -0,0 +1,151 @@
+"""
+A stand-in for the Cloudinary upload API, for load tests and local runs.
+
+It answers the upload and destroy calls the SDK makes, keeps uploaded files in memory and
+serves them back at the returned delivery URLs, optionally after an artificial delay that
+mimics the round trip to the real service. Point the app at it with
+`CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:9100`.
+
+    python -m benchmarks.fake_cloudinary --port 9100 --latency 0.15
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_API_PATH = re.compile(r"^/v1_1/([^/]+)/image/(upload|destroy)$")
+_DELIVERY_PATH = re.compile(r"^/([^/]+)/image/upload/(?:v\d+/)?(.+)$")
+_FIELD_NAME = re.compile(rb'name="([^"]+)"')
+
+
+def _parse_multipart(body: bytes, content_type: str) -> dict[bytes, bytes]:
+    boundary = content_type.partition("boundary=")[2].strip('"').encode()
+    fields = {}
+    for part in body.split(b"--" + boundary):
+        headers, separator, value = part.partition(b"\r\n\r\n")
+        name = _FIELD_NAME.search(headers)
+        if separator and name:
+            fields[name.group(1)] = value.removesuffix(b"\r\n")
+    return fields
+
+
+class FakeCloudinary(ThreadingHTTPServer):
+    """
+    The server. Uploaded files are kept in an LRU of `max_files` entries.
+
+    **Attributes:**
+
+    - `latency` (float): Seconds every API call is delayed by.
+    - `uploads` (int), `destroys` (int): Number of calls served.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], latency: float = 0.0, max_files: int = 1000):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.max_files = max_files
+        self.files: OrderedDict[str, bytes] = OrderedDict()
+        self.lock = threading.Lock()
+        self.uploads = 0
+        self.destroys = 0
+        self.counter = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="fake-cloudinary", daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeCloudinary
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        match = _API_PATH.match(self.path)
+        if not match:
+            return self._send_json(404, {"error": {"message": "Not found"}})
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        fields = _parse_multipart(body, self.headers.get("Content-Type", ""))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        cloud_name, action = match.groups()
+        server = self.server
+        with server.lock:
+            if action == "destroy":
+                server.destroys += 1
+                public_id = fields.get(b"public_id", b"").decode()
+                found = server.files.pop(public_id, None) is not None
+                return self._send_json(200, {"result": "ok" if found else "not found"})
+
+            server.uploads += 1
+            server.counter += 1
+            public_id = fields.get(b"public_id", b"").decode() or f"fake_{server.counter}"
+            content = fields.get(b"file", b"")
+            server.files[public_id] = content
+            server.files.move_to_end(public_id)
+            while len(server.files) > server.max_files:
+                server.files.popitem(last=False)
+
+        url = f"{server.base_url}/{cloud_name}/image/upload/v1/{public_id}"
+        self._send_json(200, {
+            "public_id": public_id,
+            "version": 1,
+            "resource_type": "image",
+            "type": "upload",
+            "bytes": len(content),
+            "url": url,
+            "secure_url": url,
+        })
+
+    def do_GET(self):
+        match = _DELIVERY_PATH.match(self.path)
+        content = None
+        if match:
+            with self.server.lock:
+                content = self.server.files.get(match.group(2))
+        if content is None:
+            return self._send_json(404, {"error": {"message": "Resource not found"}})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every API call is delayed by")
+    args = parser.parse_args()
+    server = FakeCloudinary((args.host, args.port), latency=args.latency)
+    print(f"Fake Cloudinary listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
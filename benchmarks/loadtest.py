@@ -0,0 +1,358 @@
+"""
+An end-to-end load test of the API.
+
+Starts a fake Cloudinary server, migrates and seeds the database configured in `.env`
+(see `benchmarks.dataset`), boots `main:app` under uvicorn and drives it with virtual
+users, each running a weighted mix of scenarios back to back:
+
+- `browse`: the photo feed, then one photo and its comments;
+- `search`: a full-text or tag search;
+- `upload`: a new photo;
+- `rate`: a rating of another user's photo;
+- `comment`: a comment on a photo.
+
+Latency percentiles and throughput are reported per route and written to a JSON file.
+With `--baseline` the run is compared to an earlier one and the exit status is 1 if a
+route's p95 or throughput got worse by more than `--threshold` percent.
+
+Use a dedicated database: the dataset is inserted into it and uploads add to it.
+
+    python -m benchmarks.loadtest --duration 60 --concurrency 32 --reset
+    python -m benchmarks.loadtest --baseline benchmarks/results/baseline.json
+
+Requires `httpx` (`poetry install --with bench`).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks import dataset
+from benchmarks.fake_cloudinary import FakeCloudinary
+from benchmarks.stats import ROOT, percentile, write_result
+
+SCENARIOS = ("browse", "search", "upload", "rate", "comment")
+DEFAULT_MIX = "browse=50,search=20,upload=5,rate=15,comment=10"
+PERCENTILES = (50, 95, 99)
+_PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS or not weight.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"Invalid mix item {item!r}, expected e.g. browse=50")
+        mix[name.strip()] = int(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("The mix needs at least one scenario with a positive weight")
+    return mix
+
+
+class Recorder:
+    """
+    Collects the latency and status of every request made after the warm-up.
+
+    Requests are labelled with the route template, e.g. `GET /photo/{photo_id}`, so all
+    requests to one endpoint are aggregated regardless of their IDs.
+    """
+
+    def __init__(self):
+        self.recording = False
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.started = 0.0
+        self.stopped = 0.0
+
+    def start(self) -> None:
+        self.recording = True
+        self.started = time.perf_counter()
+
+    def stop(self) -> None:
+        self.recording = False
+        self.stopped = time.perf_counter()
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except httpx.HTTPError as error:
+            response, status = None, type(error).__name__
+        if self.recording:
+            self.latencies[label].append(time.perf_counter() - start)
+            self.statuses[label][status] += 1
+        return response
+
+    def summary(self) -> dict:
+        elapsed = self.stopped - self.started
+        routes = {}
+        for label, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            statuses = self.statuses[label]
+            failed = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+            routes[label] = {
+                "requests": len(latencies),
+                "throughput": len(latencies) / elapsed,
+                "error_rate": failed / len(latencies),
+                "mean_ms": sum(latencies) / len(latencies) * 1000,
+                **{f"p{p}_ms": percentile(latencies, p) * 1000 for p in PERCENTILES},
+                "max_ms": latencies[-1] * 1000,
+                "statuses": dict(sorted(statuses.items())),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        return {"duration": elapsed, "requests": total, "throughput": total / elapsed, "routes": routes}
+
+
+class VirtualUser:
+    """A logged-in client that runs scenarios picked from the mix with its own seeded generator."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, token: str, rng: random.Random, context: dict):
+        self.client = client
+        self.recorder = recorder
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.rng = rng
+        self.context = context
+        self.rated: set[str] = set()
+
+    def _get(self, label: str, url: str, **kwargs):
+        return self.recorder.request(self.client, f"GET {label}", "GET", url, headers=self.headers, **kwargs)
+
+    def _post(self, label: str, url: str, **kwargs):
+        return self.recorder.request(self.client, f"POST {label}", "POST", url, headers=self.headers, **kwargs)
+
+    def _photo_id(self) -> str:
+        return self.rng.choice(self.context["photo_ids"])
+
+    async def browse(self):
+        response = await self._get("/photo/", "/photo/", params={"limit": 20})
+        photo_ids = [item["id"] for item in response.json()["items"]] if response and response.is_success else []
+        photo_id = self.rng.choice(photo_ids) if photo_ids else self._photo_id()
+        await self._get("/photo/{photo_id}", f"/photo/{photo_id}")
+        await self._get("/comments/photos/{photo_id}", f"/comments/photos/{photo_id}")
+
+    async def search(self):
+        if self.rng.random() < 0.5:
+            params = {"description": self.rng.choice(dataset.WORDS)}
+        else:
+            params = {"tag": self.rng.choice(self.context["tags"])}
+        await self._get("/search_photos/", "/search_photos/", params=params)
+
+    async def upload(self):
+        content = _PNG + self.rng.randbytes(self.context["upload_size"])
+        response = await self._post(
+            "/photo/upload",
+            "/photo/upload",
+            data={"description": dataset.sentence(self.rng, 5), "tags": self.rng.sample(self.context["tags"], 2)},
+            files={"file": ("bench.png", content, "image/png")},
+        )
+        if response and response.is_success:
+            self.context["photo_ids"].append(response.json()["id"])
+
+    async def rate(self):
+        photo_id = self._photo_id()
+        if photo_id in self.rated:
+            return
+        self.rated.add(photo_id)
+        await self._post("/rating/{photo_id}", f"/rating/{photo_id}", json={"rating": self.rng.randint(1, 5)})
+
+    async def comment(self):
+        await self._post(
+            "/comments/", "/comments/", params={"photo_id": self._photo_id()}, json={"text": dataset.sentence(self.rng, 6)}
+        )
+
+    async def run(self, mix: dict[str, int], deadline: float, think_time: float):
+        names, weights = zip(*mix.items())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+            if think_time:
+                await asyncio.sleep(self.rng.expovariate(1 / think_time))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_up(url: str, server: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"The server exited with status {server.returncode}")
+            try:
+                if (await client.get("/healthchecker/db")).is_success:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"The server did not come up within {timeout:.0f}s")
+
+
+def start_server(args: argparse.Namespace, env: dict) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(command, cwd=ROOT, env=env), f"http://127.0.0.1:{port}"
+
+
+async def login(client: httpx.AsyncClient, users: int) -> list[str]:
+    tokens = []
+    for index in range(users):
+        response = await client.post(
+            "/auth/login", json={"email": dataset.user_email(index), "password": dataset.BENCH_PASSWORD}
+        )
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+
+async def drive(args: argparse.Namespace, url: str) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        tokens = await login(client, min(args.concurrency, args.users))
+        response = await client.get("/photo/", params={"limit": 100})
+        response.raise_for_status()
+        context = {
+            "photo_ids": [item["id"] for item in response.json()["items"]],
+            "tags": [dataset.tag_name(index) for index in range(args.tags)],
+            "upload_size": args.upload_size,
+        }
+        if not context["photo_ids"]:
+            raise RuntimeError("The database holds no photos, seed it first")
+
+        users = [
+            VirtualUser(client, recorder, tokens[index % len(tokens)], random.Random(args.seed + index), context)
+            for index in range(args.concurrency)
+        ]
+        start = time.perf_counter()
+        deadline = start + args.warmup + args.duration
+        tasks = [asyncio.create_task(user.run(args.mix, deadline, args.think_time)) for user in users]
+        await asyncio.sleep(args.warmup)
+        recorder.start()
+        await asyncio.gather(*tasks)
+        recorder.stop()
+    return recorder.summary()
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns a line for every route whose p95 or throughput regressed by more than `threshold` percent."""
+    regressions = []
+    for label, route in result["routes"].items():
+        before = baseline["routes"].get(label)
+        if not before:
+            continue
+        if before["p95_ms"] and route["p95_ms"] > before["p95_ms"] * (1 + threshold / 100):
+            regressions.append(f"{label}: p95 {before['p95_ms']:.1f} -> {route['p95_ms']:.1f} ms")
+        if before["throughput"] and route["throughput"] < before["throughput"] * (1 - threshold / 100):
+            regressions.append(f"{label}: throughput {before['throughput']:.1f} -> {route['throughput']:.1f} req/s")
+    return regressions
+
+
+def report(result: dict, baseline: dict | None) -> str:
+    header = f"{'route':<34}{'req':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>7}"
+    lines = [header, "-" * len(header)]
+    for label, route in result["routes"].items():
+        line = (
+            f"{label:<34}{route['requests']:>7}{route['throughput']:>9.1f}"
+            f"{route['p50_ms']:>9.1f}{route['p95_ms']:>9.1f}{route['p99_ms']:>9.1f}{route['error_rate'] * 100:>7.1f}"
+        )
+        before = baseline and baseline["routes"].get(label)
+        if before and before["p95_ms"]:
+            line += f"   p95 {(route['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}%"
+        lines.append(line)
+    lines.append("-" * len(header))
+    lines.append(f"{result['requests']} requests in {result['duration']:.1f}s, {result['throughput']:.1f} req/s")
+    return "\n".join(lines)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.url:
+        return await drive(args, args.url)
+
+    cloudinary = FakeCloudinary(("127.0.0.1", 0), latency=args.cloudinary_latency)
+    cloudinary.start()
+    env = {
+        **os.environ,
+        "CLOUDINARY_UPLOAD_PREFIX": cloudinary.base_url,
+        "STORAGE_BACKEND": "cloudinary",
+        "RELOAD": "false",
+    }
+    try:
+        if args.migrate:
+            subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT, env=env, check=True)
+        if not args.skip_seed:
+            await dataset.seed_from_args(args)
+        server, url = start_server(args, env)
+        try:
+            await _wait_until_up(url, server)
+            return await drive(args, url)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    finally:
+        cloudinary.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"default: {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=16, help="number of virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds measured after the warm-up")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds run before measuring")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between scenarios in seconds")
+    parser.add_argument("--timeout", type=float, default=30.0, help="request timeout in seconds")
+    parser.add_argument("--upload-size", type=int, default=64 * 1024, help="size of uploaded files in bytes")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--cloudinary-latency", type=float, default=0.05, help="seconds added to every fake Cloudinary call")
+    parser.add_argument("--url", help="drive an already running server instead of starting one")
+    parser.add_argument("--migrate", action="store_true", help="run `alembic upgrade head` first")
+    parser.add_argument("--skip-seed", action="store_true", help="use the database as it is")
+    parser.add_argument("--output", type=Path, help="where to write the JSON result; default benchmarks/results/")
+    parser.add_argument("--baseline", type=Path, help="JSON result of an earlier run to compare to")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    dataset.add_arguments(parser)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    result = asyncio.run(run(args))
+    result["started_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    result["config"] = {
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "workers": args.workers,
+        "cloudinary_latency": args.cloudinary_latency,
+        "seed": args.seed,
+        "photos": args.photos,
+    }
+
+    output = write_result(result, args.output, "loadtest")
+    print(report(result, baseline))
+    print(f"Result written to {output}")
+
+    if baseline:
+        regressions = compare(result, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Micro-benchmarks of the hot repository functions and of photo serialization.
+
+Every case calls one function directly, without HTTP, with a fresh session per call:
+
+- `get_all_photos`: the first page and a page deep into the feed;
+- `search_photos`: every combination of the description, tag and username filters;
+- `get_average_rating`;
+- `get_current_user`: with a cold and a warm principal cache;
+- `PhotoResponse` serialization of ORM photos with large comment lists (no database).
+
+The database is the one configured in `.env`, migrated with `alembic upgrade head` and seeded
+with `benchmarks.dataset`. Each run is written to `benchmarks/results/` and compared to the
+committed baseline: the exit status is 1 if a case's median got slower by more than
+`--threshold` percent. A run records the server version, migration and extensions of its
+database and the spec the database was seeded with, as stored by `benchmarks.dataset`;
+against a baseline recorded on a different database or dataset the timings say nothing, so
+the comparison is refused with exit status 2. Timings also depend on the machine, so refresh the
+baseline with `--update-baseline` on the reference machine.
+
+    python -m benchmarks.micro --reset
+    python -m benchmarks.micro --skip-seed --filter search --threshold 15
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from fastapi.security import HTTPAuthorizationCredentials
+from pydantic import TypeAdapter
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks import dataset
+from benchmarks.stats import ROOT, percentile, write_result
+from src.configuration.settings import config
+from src.entity.models import Comment, Photo, Tag
+from src.repository.photo import photo_repository
+from src.repository.rating import RatingRepository
+from src.repository.search_photo import SearchPhotoRepository
+from src.repository.user import UserRepository, principal_cache
+from src.schemas.photo import PhotoResponse
+from src.services.auth import auth_service
+
+BASELINE = ROOT / "benchmarks" / "baselines" / "micro.json"
+COMMENT_COUNTS = (10, 100, 1000)
+
+
+class Suite:
+    """Benchmark cases by name, each an async callable timed one call at a time."""
+
+    def __init__(self):
+        self.cases: dict[str, Callable[[], Awaitable]] = {}
+
+    def add(self, name: str, function: Callable[[], Awaitable]) -> None:
+        self.cases[name] = function
+
+    async def run(self, warmup: int, iterations: int, pattern: str | None) -> dict:
+        results = {}
+        for name, function in self.cases.items():
+            if pattern and pattern not in name:
+                continue
+            for _ in range(warmup):
+                await function()
+            # As in `timeit`, the garbage collector is kept from firing in the middle of a call.
+            gc.collect()
+            gc.disable()
+            try:
+                timings = [await function() for _ in range(iterations)]
+            finally:
+                gc.enable()
+            timings.sort()
+            results[name] = {
+                "iterations": iterations,
+                "min_ms": timings[0] * 1000,
+                "median_ms": percentile(timings, 50) * 1000,
+                "p95_ms": percentile(timings, 95) * 1000,
+                "mean_ms": sum(timings) / len(timings) * 1000,
+            }
+            print(f"{name:<52}{results[name]['median_ms']:>10.3f} ms")
+        return results
+
+
+def database_cases(suite: Suite, session_maker: async_sessionmaker, fixtures: dict) -> None:
+    def timed(call: Callable, before: Callable[[], None] | None = None):
+        # A fresh session per call, as a request would get; only the call itself is timed.
+        async def function() -> float:
+            if before:
+                before()
+            async with session_maker() as db:
+                start = time.perf_counter()
+                await call(db)
+                return time.perf_counter() - start
+        return function
+
+    suite.add("get_all_photos[first_page]", timed(lambda db: photo_repository.get_all_photos(None, 20, db)))
+    suite.add(
+        "get_all_photos[deep_page]",
+        timed(lambda db: photo_repository.get_all_photos(fixtures["deep_cursor"], 20, db)),
+    )
+
+    filters = {"description": fixtures["description"], "tag": fixtures["tag"], "username": fixtures["username"]}
+    for size in range(len(filters) + 1):
+        for combination in itertools.combinations(filters, size):
+            kwargs = {name: filters[name] for name in combination}
+            suite.add(
+                f"search_photos[{'+'.join(combination) or 'no_filter'}]",
+                timed(lambda db, kwargs=kwargs: SearchPhotoRepository.search_photos(db, **kwargs)),
+            )
+
+    suite.add(
+        "get_average_rating",
+        timed(lambda db: RatingRepository.get_average_rating(db, fixtures["photo_id"])),
+    )
+
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=fixtures["token"])
+    suite.add(
+        "get_current_user[cold_cache]",
+        timed(
+            lambda db: UserRepository.get_current_user(credentials, db),
+            before=lambda: principal_cache.invalidate(fixtures["email"]),
+        ),
+    )
+    suite.add("get_current_user[warm_cache]", timed(lambda db: UserRepository.get_current_user(credentials, db)))
+
+
+def serialization_cases(suite: Suite) -> None:
+    # The way FastAPI serializes a `response_model` from ORM objects.
+    adapter = TypeAdapter(PhotoResponse)
+    for comments in COMMENT_COUNTS:
+        photo = _photo(comments)
+
+        async def function(photo=photo) -> float:
+            start = time.perf_counter()
+            adapter.dump_json(adapter.validate_python(photo, from_attributes=True))
+            return time.perf_counter() - start
+
+        suite.add(f"PhotoResponse[{comments}_comments]", function)
+
+
+def _photo(comments: int) -> Photo:
+    created_at = datetime(2024, 1, 1)
+    photo = Photo(
+        id=uuid.UUID(int=1),
+        cloudinary_id="bench_0",
+        url="https://res.cloudinary.com/demo/image/upload/v1/bench_0",
+        description="A photo with many comments",
+        user_id=uuid.UUID(int=2),
+        created_at=created_at,
+        updated_at=created_at,
+        comment_count=comments,
+        rating_count=0,
+        rating_average=0.0,
+    )
+    photo.tags = [Tag(id=uuid.UUID(int=10 + index), name=dataset.tag_name(index)) for index in range(5)]
+    photo.transformed_images = []
+    photo.comments = [
+        Comment(
+            id=uuid.UUID(int=1000 + index),
+            text=f"Comment number {index}",
+            user_id=uuid.UUID(int=2),
+            photo_id=photo.id,
+            created_at=created_at + timedelta(seconds=index),
+            updated_at=created_at + timedelta(seconds=index),
+        )
+        for index in range(comments)
+    ]
+    return photo
+
+
+async def load_fixtures(session_maker: async_sessionmaker) -> dict:
+    async with session_maker() as db:
+        photo_id = await db.scalar(select(Photo.id).order_by(Photo.created_at, Photo.id).limit(1))
+        if photo_id is None:
+            raise RuntimeError("The database holds no photos, seed it first")
+        cursor = None
+        for _ in range(10):
+            _, next_cursor = await photo_repository.get_all_photos(cursor, 20, db)
+            cursor = next_cursor or cursor
+    email = dataset.user_email(1)
+    return {
+        "photo_id": photo_id,
+        "deep_cursor": cursor,
+        "description": dataset.WORDS[0],
+        "tag": dataset.tag_name(0),
+        "username": "bench_1",
+        "email": email,
+        "token": auth_service.create_access_token(data={"sub": email}, expires_delta=3600),
+    }
+
+
+async def describe_database(session_maker: async_sessionmaker) -> dict:
+    """
+    The server, schema and dataset the database cases run against; their timings depend on
+    all three. The dataset is the spec stored when the database was seeded, or None for a
+    database seeded without one.
+    """
+    async with session_maker() as db:
+        spec = None
+        if await db.scalar(text("SELECT to_regclass(:name)"), {"name": dataset.SPEC_TABLE}) is not None:
+            spec = await db.scalar(text(f"SELECT spec::text FROM {dataset.SPEC_TABLE}"))
+        return {
+            "database": {
+                "server_version": await db.scalar(text("SHOW server_version")),
+                "migration": await db.scalar(text("SELECT version_num FROM alembic_version")),
+                "extensions": sorted((await db.scalars(text("SELECT extname FROM pg_extension"))).all()),
+            },
+            "dataset": json.loads(spec) if spec is not None else None,
+        }
+
+
+async def run(args: argparse.Namespace) -> tuple[dict, dict]:
+    suite = Suite()
+    engine = None
+    description = {"database": None, "dataset": None}
+    if not args.no_db:
+        if not args.skip_seed:
+            await dataset.seed_from_args(args)
+        engine = create_async_engine(config.ASYNC_DATABASE_URL)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        description = await describe_database(session_maker)
+        database_cases(suite, session_maker, await load_fixtures(session_maker))
+    serialization_cases(suite)
+    try:
+        return description, await suite.run(args.warmup, args.iterations, args.filter)
+    finally:
+        if engine is not None:
+            await engine.dispose()
+
+
+def mismatches(result: dict, baseline: dict) -> list[str]:
+    """Returns a line for every property of the database or dataset that differs from the baseline's."""
+    if result["database"] is None:
+        return []
+    lines = []
+    for section in ("database", "dataset"):
+        before, now = baseline.get(section) or {}, result[section] or {}
+        lines.extend(
+            f"{section}.{name}: {before.get(name)} in the baseline, {now.get(name)} now"
+            for name in sorted(before.keys() | now.keys())
+            if before.get(name) != now.get(name)
+        )
+    return lines
+
+
+def compare(cases: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns a line for every case whose median got slower by more than `threshold` percent."""
+    regressions = []
+    for name, case in cases.items():
+        before = baseline["cases"].get(name)
+        if before and case["median_ms"] > before["median_ms"] * (1 + threshold / 100):
+            change = (case["median_ms"] / before["median_ms"] - 1) * 100
+            regressions.append(f"{name}: median {before['median_ms']:.3f} -> {case['median_ms']:.3f} ms ({change:+.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--no-db", action="store_true", help="only run the cases that need no database")
+    parser.add_argument("--skip-seed", action="store_true", help="use the database as it is")
+    parser.add_argument("--output", type=Path, help="where to write the JSON result; default benchmarks/results/")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown of a median in percent")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run to the baseline file")
+    dataset.add_arguments(parser)
+    args = parser.parse_args()
+
+    description, cases = asyncio.run(run(args))
+    result = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {"iterations": args.iterations, "warmup": args.warmup},
+        **description,
+        "cases": cases,
+    }
+    print(f"Result written to {write_result(result, args.output, 'micro')}")
+
+    if args.update_baseline:
+        write_result(result, args.baseline, "micro")
+        print(f"Baseline updated: {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        differences = mismatches(result, baseline)
+        if differences:
+            for difference in differences:
+                print(f"BASELINE MISMATCH {difference}")
+            print("The baseline was recorded on another database or dataset, re-record it with --update-baseline")
+            sys.exit(2)
+        regressions = compare(result["cases"], baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
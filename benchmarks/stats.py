@@ -0,0 +1,28 @@
+"""
+Helpers shared by the benchmark scripts: percentiles and result files.
+"""
+import json
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS = ROOT / "benchmarks" / "results"
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def write_result(result: dict, output: Path | None, prefix: str) -> Path:
+    """
+    Writes a run's result as JSON to `output`, or to a new timestamped file in
+    `benchmarks/results/` if it is `None`, and returns the path.
+    """
+    output = output or RESULTS / f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n")
+    return output
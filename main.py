@@ -1,11 +1,31 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.configuration.cloudinary import cloudinary_executor
 from src.configuration.settings import config
-from src.routes import healthchecker, user, photo, comment, cloudinary_func, qrcode, rating, search_photo
+from src.database.db import sessionmanager
+from src.services.auth import password_executor
+from src.services.qr import qr_executor
+from src.services.transformation import transform_executor
+from src.services.metrics import MetricsMiddleware
+from src.services.upload import BodySizeLimitMiddleware
+from src.routes import healthchecker, user, photo, comment, cloudinary_func, qrcode, rating, search_photo, media, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    cloudinary_executor.shutdown()
+    password_executor.shutdown()
+    qr_executor.shutdown()
+    transform_executor.shutdown()
+    await sessionmanager.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(healthchecker.router)
 app.include_router(user.router)
@@ -15,8 +35,15 @@ app.include_router(cloudinary_func.router)
 app.include_router(qrcode.router)
 app.include_router(rating.router)
 app.include_router(search_photo.router)
+app.include_router(media.router)
+app.include_router(metrics.router)
 
 
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=config.UPLOAD_MAX_REQUEST_SIZE,
+    path_limits={"/photo/upload/batch": config.UPLOAD_BATCH_MAX_REQUEST_SIZE},
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=config.ALLOWED_ORIGINS_LIST,
@@ -24,6 +51,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if config.METRICS_ENABLED:
+    # Added last, so it wraps the other middleware and times the whole request.
+    app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/")
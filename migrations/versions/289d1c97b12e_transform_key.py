@@ -0,0 +1,34 @@
+"""transform key
+
+Revision ID: 289d1c97b12e
+Revises: d8a3e63a9f65
+Create Date: 2026-10-17 16:48:13.507219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '289d1c97b12e'
+down_revision: Union[str, None] = 'd8a3e63a9f65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing derivatives keep an empty key: their parameters were never stored.
+    op.add_column('transformed_images', sa.Column('transform_key', sa.String(length=64), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transformed_images_photo_id_transform_key', 'transformed_images', ['photo_id', 'transform_key'],
+            unique=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transformed_images_photo_id_transform_key', table_name='transformed_images')
+    op.drop_column('transformed_images', 'transform_key')
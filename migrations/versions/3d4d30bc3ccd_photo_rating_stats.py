@@ -0,0 +1,77 @@
+"""photo rating stats
+
+Revision ID: 3d4d30bc3ccd
+Revises: 7998bb822df5
+Create Date: 2026-10-17 11:26:05.907133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d4d30bc3ccd'
+down_revision: Union[str, None] = '7998bb822df5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('photos', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('photos', sa.Column(
+        'rating_average', sa.Float(),
+        sa.Computed(
+            "CASE WHEN rating_count > 0 THEN CAST(rating_sum AS double precision) / rating_count ELSE 0 END",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_ratings_photo_id', 'ratings', ['photo_id'], unique=False)
+
+    # Same batching as `python -m src.commands.repair_rating_stats`, committed per batch.
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = None
+        while True:
+            updated_ids = connection.execute(
+                sa.text("""
+                    WITH batch AS (
+                        SELECT id FROM photos
+                        WHERE CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid)
+                        ORDER BY id
+                        LIMIT :batch_size
+                    ), stats AS (
+                        SELECT ratings.photo_id, count(*) AS rating_count, sum(ratings.rating) AS rating_sum
+                        FROM ratings JOIN batch ON batch.id = ratings.photo_id
+                        GROUP BY ratings.photo_id
+                    )
+                    UPDATE photos
+                    SET rating_count = coalesce(stats.rating_count, 0),
+                        rating_sum = coalesce(stats.rating_sum, 0)
+                    FROM batch LEFT JOIN stats ON stats.photo_id = batch.id
+                    WHERE photos.id = batch.id
+                    RETURNING CAST(photos.id AS text)
+                """),
+                {"last_id": last_id, "batch_size": BACKFILL_BATCH_SIZE},
+            ).scalars().all()
+            if not updated_ids:
+                break
+            last_id = max(updated_ids)
+
+        op.create_index(
+            'ix_photos_rating_average_id', 'photos', ['rating_average', 'id'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photos_rating_average_id', table_name='photos')
+    op.drop_index('ix_ratings_photo_id', table_name='ratings')
+    op.drop_column('photos', 'rating_average')
+    op.drop_column('photos', 'rating_sum')
+    op.drop_column('photos', 'rating_count')
@@ -0,0 +1,43 @@
+"""qr code per photo
+
+Revision ID: 4eba2d8c2088
+Revises: 3d4d30bc3ccd
+Create Date: 2026-10-17 13:02:47.551930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4eba2d8c2088'
+down_revision: Union[str, None] = '3d4d30bc3ccd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every call of the QR endpoint used to insert another row; keep one per photo.
+    op.execute(
+        """
+        DELETE FROM qr_codes
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY photo_id ORDER BY id) AS position
+                FROM qr_codes
+            ) AS numbered
+            WHERE numbered.position > 1
+        )
+        """
+    )
+    # QR codes are rendered by the application now instead of being uploaded to Cloudinary.
+    op.execute(
+        "UPDATE qr_codes SET qr_code_url = '/generate_qr/image/' || CAST(photo_id AS text)"
+    )
+    op.create_index('ix_qr_codes_photo_id', 'qr_codes', ['photo_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_qr_codes_photo_id', table_name='qr_codes')
@@ -0,0 +1,63 @@
+"""photo comment count
+
+Revision ID: 63faff51c8a0
+Revises: 4eba2d8c2088
+Create Date: 2026-10-17 14:21:09.482716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '63faff51c8a0'
+down_revision: Union[str, None] = '4eba2d8c2088'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+
+    with op.get_context().autocommit_block():
+        # Serves both the comment pages of a photo and the count backfill below.
+        op.create_index(
+            'ix_comments_photo_id_created_at_id', 'comments', ['photo_id', 'created_at', 'id'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+        connection = op.get_bind()
+        last_id = None
+        while True:
+            updated_ids = connection.execute(
+                sa.text("""
+                    WITH batch AS (
+                        SELECT id FROM photos
+                        WHERE CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid)
+                        ORDER BY id
+                        LIMIT :batch_size
+                    ), counts AS (
+                        SELECT comments.photo_id, count(*) AS comment_count
+                        FROM comments JOIN batch ON batch.id = comments.photo_id
+                        GROUP BY comments.photo_id
+                    )
+                    UPDATE photos
+                    SET comment_count = coalesce(counts.comment_count, 0)
+                    FROM batch LEFT JOIN counts ON counts.photo_id = batch.id
+                    WHERE photos.id = batch.id
+                    RETURNING CAST(photos.id AS text)
+                """),
+                {"last_id": last_id, "batch_size": BACKFILL_BATCH_SIZE},
+            ).scalars().all()
+            if not updated_ids:
+                break
+            last_id = max(updated_ids)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_photo_id_created_at_id', table_name='comments')
+    op.drop_column('photos', 'comment_count')
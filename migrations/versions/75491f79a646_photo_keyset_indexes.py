@@ -0,0 +1,28 @@
+"""photo keyset indexes
+
+Revision ID: 75491f79a646
+Revises: 0c2823573e9a
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '75491f79a646'
+down_revision: Union[str, None] = '0c2823573e9a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_photos_created_at_id', 'photos', ['created_at', 'id'], unique=False)
+    op.create_index('ix_photos_user_id_created_at_id', 'photos', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photos_user_id_created_at_id', table_name='photos')
+    op.drop_index('ix_photos_created_at_id', table_name='photos')
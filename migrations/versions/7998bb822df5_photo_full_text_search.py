@@ -0,0 +1,127 @@
+"""photo full text search
+
+Revision ID: 7998bb822df5
+Revises: 75491f79a646
+Create Date: 2026-10-17 10:03:17.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7998bb822df5'
+down_revision: Union[str, None] = '75491f79a646'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('photos', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.create_index('ix_photo_tag_photo_id', 'photo_tag', ['photo_id'], unique=False)
+    op.create_index('ix_photo_tag_tag_id', 'photo_tag', ['tag_id'], unique=False)
+    op.create_index('ix_tags_name_lower', 'tags', [sa.text('lower(name)')], unique=False)
+
+    # The document of a photo: its description (weight A) followed by its tag names (weight B).
+    op.execute("""
+        CREATE FUNCTION photo_search_vector(p_photo_id uuid, p_description text) RETURNS tsvector
+        LANGUAGE sql STABLE AS $$
+            SELECT setweight(to_tsvector('simple', coalesce(p_description, '')), 'A')
+                || setweight(to_tsvector('simple', coalesce((
+                    SELECT string_agg(tags.name, ' ')
+                    FROM photo_tag JOIN tags ON tags.id = photo_tag.tag_id
+                    WHERE photo_tag.photo_id = p_photo_id
+                ), '')), 'B')
+        $$
+    """)
+    op.execute("""
+        CREATE FUNCTION photos_search_vector_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := photo_search_vector(NEW.id, NEW.description);
+            RETURN NEW;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE FUNCTION photo_tag_search_vector_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed_photo_id uuid;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed_photo_id := OLD.photo_id;
+            ELSE
+                changed_photo_id := NEW.photo_id;
+            END IF;
+            UPDATE photos SET search_vector = photo_search_vector(id, description)
+            WHERE id = changed_photo_id;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_search_vector_update
+        BEFORE INSERT OR UPDATE OF description ON photos
+        FOR EACH ROW EXECUTE PROCEDURE photos_search_vector_trigger()
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_tag_search_vector_update
+        AFTER INSERT OR DELETE ON photo_tag
+        FOR EACH ROW EXECUTE PROCEDURE photo_tag_search_vector_trigger()
+    """)
+
+    # Backfill and index outside the migration transaction: each batch commits on its own,
+    # and the GIN indexes are built without locking writes. The triggers above already keep
+    # rows written during the backfill up to date.
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = None
+        while True:
+            updated_ids = connection.execute(
+                sa.text("""
+                    WITH batch AS (
+                        SELECT id FROM photos
+                        WHERE CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid)
+                        ORDER BY id
+                        LIMIT :batch_size
+                    )
+                    UPDATE photos SET search_vector = photo_search_vector(photos.id, photos.description)
+                    FROM batch WHERE photos.id = batch.id
+                    RETURNING CAST(photos.id AS text)
+                """),
+                {"last_id": last_id, "batch_size": BACKFILL_BATCH_SIZE},
+            ).scalars().all()
+            if not updated_ids:
+                break
+            last_id = max(updated_ids)
+
+        op.create_index(
+            'ix_photos_search_vector', 'photos', ['search_vector'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_photos_description_trgm', 'photos', ['description'],
+            unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photos_description_trgm', table_name='photos')
+    op.drop_index('ix_photos_search_vector', table_name='photos')
+    op.execute("DROP TRIGGER photo_tag_search_vector_update ON photo_tag")
+    op.execute("DROP TRIGGER photos_search_vector_update ON photos")
+    op.execute("DROP FUNCTION photo_tag_search_vector_trigger()")
+    op.execute("DROP FUNCTION photos_search_vector_trigger()")
+    op.execute("DROP FUNCTION photo_search_vector(uuid, text)")
+    op.drop_index('ix_tags_name_lower', table_name='tags')
+    op.drop_index('ix_photo_tag_tag_id', table_name='photo_tag')
+    op.drop_index('ix_photo_tag_photo_id', table_name='photo_tag')
+    op.drop_column('photos', 'search_vector')
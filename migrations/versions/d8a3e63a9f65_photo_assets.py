@@ -0,0 +1,43 @@
+"""photo assets
+
+Revision ID: d8a3e63a9f65
+Revises: 63faff51c8a0
+Create Date: 2026-10-17 16:02:41.218735
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3e63a9f65'
+down_revision: Union[str, None] = '63faff51c8a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('photo_assets',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('cloudinary_id', sa.String(length=255), nullable=False),
+    sa.Column('url', sa.String(length=255), nullable=False),
+    sa.Column('ref_count', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+    # Existing photos keep an empty hash: their images are not shared and are destroyed as before.
+    op.add_column('photos', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_photos_content_hash', 'photos', ['content_hash'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photos_content_hash', table_name='photos')
+    op.drop_column('photos', 'content_hash')
+    op.drop_table('photo_assets')
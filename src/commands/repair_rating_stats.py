@@ -0,0 +1,20 @@
+import argparse
+import asyncio
+
+from src.database.db import sessionmanager
+from src.repository.rating import RatingRepository
+
+
+async def main(batch_size: int) -> None:
+    async with sessionmanager.session() as session:
+        processed = await RatingRepository.recompute_rating_stats(session, batch_size)
+    print(f"Recomputed rating stats of {processed} photos")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recompute rating_count and rating_sum of every photo from the ratings table."
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="Photos per committed batch")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -1,25 +1,83 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
 import cloudinary
 import cloudinary.uploader
 from src.configuration.settings import config
-import io
+from src.services.executor import BoundedExecutor
+from src.services.metrics import cloudinary_request_duration
 
 
-cloudinary.config( 
-    cloud_name = config.CLOUDINARY_NAME, 
-    api_key = config.CLOUDINARY_API_KEY, 
+cloudinary.config(
+    cloud_name = config.CLOUDINARY_NAME,
+    api_key = config.CLOUDINARY_API_KEY,
     api_secret = config.CLOUDINARY_API_SECRET,
     secure=True
 )
+if config.CLOUDINARY_UPLOAD_PREFIX:
+    cloudinary.config(upload_prefix=config.CLOUDINARY_UPLOAD_PREFIX)
+
+# Every call to the synchronous Cloudinary SDK goes through this executor,
+# so network I/O to the image store never blocks the event loop.
+cloudinary_executor = BoundedExecutor(
+    "Cloudinary",
+    ThreadPoolExecutor,
+    max_concurrency=config.CLOUDINARY_MAX_CONCURRENCY,
+    max_queue=config.CLOUDINARY_MAX_QUEUE,
+    timeout=config.CLOUDINARY_TIMEOUT,
+)
+
+
+async def call(operation: str, function, *args, **kwargs):
+    """
+    Runs a blocking Cloudinary call in `cloudinary_executor` and records its duration
+    in `cloudinary_request_duration` under `operation`.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await cloudinary_executor.run(function, *args, **kwargs)
+        outcome = "ok"
+        return result
+    finally:
+        cloudinary_request_duration.labels(operation, outcome).observe(time.perf_counter() - start)
+
+
+async def upload(file, **options) -> dict:
+    return await call(
+        "upload", cloudinary.uploader.upload, file, timeout=config.CLOUDINARY_TIMEOUT, **options
+    )
+
 
-def upload_qr_to_cloudinary(img, filename):
-    img_byte_arr = io.BytesIO()
-    img.save(img_byte_arr)
-    img_byte_arr.seek(0)
-    r = cloudinary.uploader.upload(
-        img_byte_arr,
-        public_id=f'PhotoShare/{filename}',
-        overwrite=True
+async def destroy(public_id: str, **options) -> dict:
+    return await call(
+        "destroy", cloudinary.uploader.destroy, public_id, timeout=config.CLOUDINARY_TIMEOUT, **options
     )
-    return cloudinary.CloudinaryImage(f'PhotoShare/{filename}').build_url(
-        width=250, height=250, crop='fill', version=r.get('version')
-    )
\ No newline at end of file
+
+
+def url_format(url: str, public_id: str) -> Optional[str]:
+    """
+    Returns the format of the asset `public_id` as delivered at `url`, e.g. `jpg`.
+
+    Cloudinary appends the format to the public ID in the URLs it returns. It has to be
+    passed back explicitly when a URL is built from the public ID alone, or a dot in the
+    ID (as in `1700000000.5_user@example.com`) is taken for the format instead.
+    """
+    stem, dot, extension = unquote(urlparse(url).path).rpartition(".")
+    if dot and stem.endswith(public_id) and extension.isalnum():
+        return extension
+    return None
+
+
+def transformed_url(public_id: str, transformation: dict, image_format: Optional[str] = None) -> str:
+    # Built and signed locally without calling Cloudinary, which derives
+    # the image on the first request for the URL and caches it from then on.
+    return cloudinary.CloudinaryImage(public_id).build_url(
+        transformation=[transformation], format=image_format, sign_url=True
+    )
+
+
+def delivery_url(public_id: str, image_format: Optional[str] = None) -> str:
+    return cloudinary.CloudinaryImage(public_id).build_url(format=image_format)
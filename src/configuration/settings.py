@@ -1,3 +1,7 @@
+import os
+import tempfile
+from typing import Literal
+
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
@@ -9,18 +13,64 @@ class Settigns(BaseSettings):
     POSTGRES_HOST_ASYNC: str = "postgres"
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str = "your_db_name"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    STR_DB_REPLICA_URLS: str = ""
+    DB_REPLICA_SELECTION: Literal["round_robin", "least_connections"] = "round_robin"
+    DB_REPLICA_COOLDOWN: float = 30.0
+    DB_READ_YOUR_WRITES_WINDOW: float = 5.0
 
     PORT: int = 8000
     HOST: str = "0.0.0.0"
     RELOAD: bool = True
     STR_ALLOWED_ORIGINS: str = "*,example.url"
+    METRICS_ENABLED: bool = True
 
     AUTH_SECRET_KEY: str = "secret key"
     AUTH_ALGORITHM: str = "algorithm"
+    AUTH_HASH_WORKERS: int = 2
+    AUTH_HASH_MAX_QUEUE: int = 32
+    AUTH_HASH_TIMEOUT: float = 10.0
+    PRINCIPAL_CACHE_TTL: float = 30.0
+    PRINCIPAL_CACHE_SIZE: int = 10000
 
     CLOUDINARY_NAME: str = "cloudinary_name"
     CLOUDINARY_API_KEY: str = "cloudinary_api_key"
     CLOUDINARY_API_SECRET: str = "cloudinary_api_secret"
+    CLOUDINARY_MAX_CONCURRENCY: int = 8
+    CLOUDINARY_MAX_QUEUE: int = 64
+    CLOUDINARY_TIMEOUT: float = 60.0
+    CLOUDINARY_UPLOAD_PREFIX: str = ""
+
+    PHOTO_LATEST_COMMENTS: int = 3
+    UPLOAD_MAX_SIZE: int = 10 * 1024 * 1024
+    UPLOAD_FORM_OVERHEAD: int = 64 * 1024
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    STR_UPLOAD_ALLOWED_FORMATS: str = "jpeg,png,gif,webp"
+    UPLOAD_BATCH_MAX_FILES: int = 20
+    UPLOAD_BATCH_CONCURRENCY: int = 4
+
+    STORAGE_BACKEND: Literal["cloudinary", "local"] = "cloudinary"
+    STORAGE_LOCAL_ROOT: str = "media"
+    STORAGE_LOCAL_BASE_URL: str = "/media"
+    STORAGE_LOCAL_CHUNK_SIZE: int = 256 * 1024
+
+    TRANSFORM_BACKEND: Literal["cloudinary", "local"] = "cloudinary"
+    TRANSFORM_WORKERS: int = 2
+    TRANSFORM_MAX_QUEUE: int = 32
+    TRANSFORM_TIMEOUT: float = 30.0
+
+    QR_CACHE_DIR: str = os.path.join(tempfile.gettempdir(), "photoshare-qr")
+    QR_CACHE_SIZE: int = 1024
+    QR_CACHE_DISK_MAX_FILES: int = 100_000
+    QR_RENDER_WORKERS: int = 2
+    QR_RENDER_MAX_QUEUE: int = 64
+    QR_RENDER_TIMEOUT: float = 10.0
+    QR_BATCH_MAX_SIZE: int = 500
 
     @property
     def ASYNC_DATABASE_URL(self) -> str:
@@ -29,6 +79,22 @@ class Settigns(BaseSettings):
     def SYNC_DATABASE_URL(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def DB_REPLICA_URLS(self) -> list:
+        return [url.strip() for url in self.STR_DB_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def UPLOAD_MAX_REQUEST_SIZE(self) -> int:
+        return self.UPLOAD_MAX_SIZE + self.UPLOAD_FORM_OVERHEAD
+
+    @property
+    def UPLOAD_BATCH_MAX_REQUEST_SIZE(self) -> int:
+        return self.UPLOAD_BATCH_MAX_FILES * self.UPLOAD_MAX_SIZE + self.UPLOAD_FORM_OVERHEAD
+
+    @property
+    def UPLOAD_ALLOWED_FORMATS(self) -> list:
+        return [image_format.strip().lower() for image_format in self.STR_UPLOAD_ALLOWED_FORMATS.split(",") if image_format.strip()]
+
     @property
     def ALLOWED_ORIGINS_LIST(self) -> list:
         return self.STR_ALLOWED_ORIGINS.split(",")
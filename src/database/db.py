@@ -1,38 +1,249 @@
 import contextlib
+import hashlib
+import itertools
+import logging
+import time
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 
 from src.configuration.settings import config
+from src.services.cache import TTLCache
+from src.services.metrics import Histogram, instrument_engine
 
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
+    AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waits for a connection
+    and how many checkouts gave up after `pool_timeout`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_time.observe(time.perf_counter() - start)
+
+
+def _create_engine(url: str, database: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE},
+    )
+    if config.METRICS_ENABLED:
+        instrument_engine(engine, database)
+    return engine
+
+
+def _create_session_maker(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        autocommit=False, autoflush=False, bind=engine, expire_on_commit=False
+    )
+
+
+def _pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "timeout": config.DB_POOL_TIMEOUT,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "timeouts": pool.timeouts,
+        "wait_time": pool.wait_time.snapshot(),
+    }
+
+
+class Replica:
+    """
+    A read replica with its own engine and pool.
+
+    **Attributes:**
+
+    - `engine` (AsyncEngine): Engine connected to the replica.
+    - `unhealthy_until` (float): Monotonic time until which the replica is skipped after a failed connect.
+    - `failures` (int): Number of failed connects so far.
+    """
 
-class DatabaseSessionManager:
     def __init__(self, url: str):
-        self._engine: AsyncEngine | None = create_async_engine(url)
-        self._session_maker: async_sessionmaker = async_sessionmaker(
-            autocommit=False, autoflush=False, bind=self._engine, expire_on_commit=False
-        )
+        self.engine = _create_engine(url, "replica")
+        self.session_maker = _create_session_maker(self.engine)
+        self.unhealthy_until = 0.0
+        self.failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.unhealthy_until <= time.monotonic()
+
+    def mark_unhealthy(self) -> None:
+        self.failures += 1
+        self.unhealthy_until = time.monotonic() + config.DB_REPLICA_COOLDOWN
+
+    def stats(self) -> dict:
+        return {
+            "host": self.engine.url.host,
+            "healthy": self.healthy,
+            "failures": self.failures,
+            "pool": _pool_stats(self.engine),
+        }
+
+
+class DatabaseSessionManager:
+    def __init__(self, url: str, replica_urls: list[str] = ()):
+        self._engine: AsyncEngine | None = _create_engine(url, "primary")
+        self._session_maker: async_sessionmaker = _create_session_maker(self._engine)
+        self._replicas: list[Replica] = [Replica(replica_url) for replica_url in replica_urls]
+        self._round_robin = itertools.count()
 
     @contextlib.asynccontextmanager
     async def session(self):
         if self._session_maker is None:
             raise Exception("Session is not initialized")
-        session = self._session_maker()
+        async with self._scope(self._session_maker()) as session:
+            yield session
+
+    @contextlib.asynccontextmanager
+    async def read_session(self):
+        """
+        Opens a session on a healthy replica, falling back to the primary.
+
+        The replica connection is checked out up front, so an unreachable replica is
+        detected here, put on cooldown for `DB_REPLICA_COOLDOWN` seconds, and the next
+        candidate is tried instead of failing the request halfway through.
+        """
+        if self._session_maker is None:
+            raise Exception("Session is not initialized")
+        session = None
+        for replica in self._replica_candidates():
+            candidate = replica.session_maker()
+            try:
+                await candidate.connection()
+            except (exc.DBAPIError, exc.TimeoutError, OSError) as error:
+                replica.mark_unhealthy()
+                logger.warning(
+                    "Replica %s is unavailable (failure %d), skipping it for %ss: %s",
+                    replica.engine.url.host, replica.failures, config.DB_REPLICA_COOLDOWN, error,
+                )
+                await candidate.close()
+                continue
+            session = candidate
+            break
+        if session is None:
+            session = self._session_maker()
+        async with self._scope(session) as session:
+            yield session
+
+    def _replica_candidates(self) -> list[Replica]:
+        healthy = [replica for replica in self._replicas if replica.healthy]
+        if config.DB_REPLICA_SELECTION == "least_connections":
+            return sorted(healthy, key=lambda replica: replica.engine.pool.checkedout())
+        if not healthy:
+            return []
+        start = next(self._round_robin) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    @staticmethod
+    @contextlib.asynccontextmanager
+    async def _scope(session: AsyncSession):
         try:
             yield session
-        except Exception as error:
-            print(error)
+        except HTTPException as error:
+            logger.debug("Rolling back the session after HTTP %s: %s", error.status_code, error.detail)
+            await session.rollback()
+        except RequestValidationError as error:
+            logger.debug("Rolling back the session after HTTP 422: %s", error.errors())
+            await session.rollback()
+        except Exception:
+            logger.exception("Rolling back the session after an error")
             await session.rollback()
         finally:
             await session.close()
 
+    def pool_stats(self) -> dict:
+        """
+        Returns the connection pool configuration, its current usage and checkout wait times,
+        for the primary and for every replica.
+        """
+        if self._engine is None:
+            raise Exception("Engine is not initialized")
+        return {
+            "primary": _pool_stats(self._engine),
+            "replicas": [replica.stats() for replica in self._replicas],
+        }
+
+    async def close(self):
+        if self._engine is None:
+            return
+        for replica in self._replicas:
+            await replica.engine.dispose()
+        await self._engine.dispose()
+        self._engine = None
+        self._session_maker = None
+        self._replicas = []
+
+
+sessionmanager = DatabaseSessionManager(config.ASYNC_DATABASE_URL, config.DB_REPLICA_URLS)
+
+# Callers that recently sent a write, keyed by a hash of their Authorization header.
+# Their reads stay on the primary for DB_READ_YOUR_WRITES_WINDOW seconds so they see
+# their own changes despite replication lag. The window is tracked per worker process.
+recent_writers = TTLCache(maxsize=10000, ttl=config.DB_READ_YOUR_WRITES_WINDOW)
 
-sessionmanager = DatabaseSessionManager(config.ASYNC_DATABASE_URL)
 
+def _writer_key(request: Request) -> str | None:
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
 
-async def get_db():
+
+async def get_db(request: Request):
+    writer = None if request.method in SAFE_METHODS else _writer_key(request)
+    if writer:
+        recent_writers.set(writer, True)
     async with sessionmanager.session() as session:
         yield session
+    if writer:
+        recent_writers.set(writer, True)
+
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only endpoints: served by a replica unless the caller wrote recently.
+    """
+    writer = _writer_key(request)
+    if writer and recent_writers.get(writer):
+        async with sessionmanager.session() as session:
+            yield session
+        return
+    async with sessionmanager.read_session() as session:
+        yield session
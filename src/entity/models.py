@@ -2,8 +2,8 @@ import enum
 from datetime import date
 from uuid import UUID, uuid4
 
-from sqlalchemy import Integer, String, DateTime, func, Enum, ForeignKey, Column, Table
-from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy import Integer, Float, String, DateTime, func, Enum, ForeignKey, Column, Table, Index, Computed, text
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID as PGUUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -16,6 +16,8 @@ photo_tag_association = Table(
 	Base.metadata,
 	Column("photo_id", PGUUID(as_uuid=True), ForeignKey("photos.id")),
 	Column("tag_id", PGUUID(as_uuid=True), ForeignKey("tags.id")),
+	Index("ix_photo_tag_photo_id", "photo_id"),
+	Index("ix_photo_tag_tag_id", "tag_id"),
 )
 
 
@@ -35,13 +37,13 @@ class User(Base):
 	updated_at: Mapped[date] = mapped_column("updated_at", DateTime, default=func.now(), onupdate=func.now())
 	role: Mapped[Role] = mapped_column("role", Enum(Role), default=Role.user)
 	photos: Mapped[list['Photo']] = relationship(
-		'Photo', back_populates='user', cascade="all, delete-orphan", lazy="selectin"
+		'Photo', back_populates='user', cascade="all, delete-orphan", lazy="noload"
 	)
 	comments: Mapped[list['Comment']] = relationship(
-		'Comment', back_populates='user', cascade="all, delete-orphan", lazy="selectin"
+		'Comment', back_populates='user', cascade="all, delete-orphan", lazy="noload"
 	)
 	ratings: Mapped[list['Rating']] = relationship(
-		'Rating', back_populates='user', cascade="all, delete-orphan", lazy="selectin"
+		'Rating', back_populates='user', cascade="all, delete-orphan", lazy="noload"
 	)
 
 	@property
@@ -62,21 +64,49 @@ class Photo(Base):
 	user_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey('users.id'))
 	created_at: Mapped[date] = mapped_column("created_at", DateTime, default=func.now())
 	updated_at: Mapped[date] = mapped_column("updated_at", DateTime, default=func.now(), onupdate=func.now())
+	# SHA-256 of the uploaded file; photos with the same hash share one PhotoAsset.
+	# Empty for photos uploaded before deduplication and for copies transformed on Cloudinary.
+	content_hash: Mapped[str] = mapped_column(String(64), nullable=True)
+	# Maintained by database triggers from the description and tag names, see migration 7998bb822df5.
+	search_vector: Mapped[str] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+	# Kept up to date by RatingRepository in the same transaction as the rating itself.
+	rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+	rating_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+	rating_average: Mapped[float] = mapped_column(
+		Float, Computed(
+			"CASE WHEN rating_count > 0 THEN CAST(rating_sum AS double precision) / rating_count ELSE 0 END",
+			persisted=True
+		)
+	)
+	# Kept up to date by CommentRepository in the same transaction as the comment itself.
+	comment_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 	tags: Mapped[list['Tag']] = relationship(
-		'Tag', secondary=photo_tag_association, back_populates='photos', lazy="selectin"
+		'Tag', secondary=photo_tag_association, back_populates='photos', lazy="noload"
 	)
 	transformed_images: Mapped[list['TransformedImage']] = relationship(
-		'TransformedImage', back_populates='photo', cascade="all, delete-orphan", lazy="selectin"
+		'TransformedImage', back_populates='photo', cascade="all, delete-orphan", lazy="noload"
 	)
 	qr_code: Mapped[list['QrCode']] = relationship(
-		'QrCode', back_populates='qr_code', cascade="all, delete-orphan", lazy="selectin"
+		'QrCode', back_populates='qr_code', cascade="all, delete-orphan", lazy="noload"
 	)
 	comments: Mapped[list['Comment']] = relationship(
-		'Comment', back_populates='photo', cascade="all, delete-orphan", lazy="selectin"
+		'Comment', back_populates='photo', cascade="all, delete-orphan", lazy="noload"
 	)
-	user: Mapped['User'] = relationship('User', back_populates='photos', lazy="selectin")
+	user: Mapped['User'] = relationship('User', back_populates='photos', lazy="noload")
 	ratings: Mapped[list['Rating']] = relationship(
-		'Rating', back_populates='photo', cascade="all, delete-orphan", lazy="selectin"
+		'Rating', back_populates='photo', cascade="all, delete-orphan", lazy="noload"
+	)
+
+	__table_args__ = (
+		Index("ix_photos_created_at_id", "created_at", "id"),
+		Index("ix_photos_user_id_created_at_id", "user_id", "created_at", "id"),
+		Index("ix_photos_rating_average_id", "rating_average", "id"),
+		Index("ix_photos_content_hash", "content_hash"),
+		Index("ix_photos_search_vector", "search_vector", postgresql_using="gin"),
+		Index(
+			"ix_photos_description_trgm", "description",
+			postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}
+		),
 	)
 
 
@@ -85,7 +115,11 @@ class Tag(Base):
 	id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
 	name: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
 	photos: Mapped[list['Photo']] = relationship(
-		'Photo', secondary=photo_tag_association, back_populates='tags', lazy="selectin"
+		'Photo', secondary=photo_tag_association, back_populates='tags', lazy="noload"
+	)
+
+	__table_args__ = (
+		Index("ix_tags_name_lower", text("lower(name)")),
 	)
 
 
@@ -97,8 +131,12 @@ class Comment(Base):
 	updated_at: Mapped[date] = mapped_column('updated_at', DateTime, default=func.now(), onupdate=func.now())
 	user_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey('users.id'))
 	photo_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey('photos.id'))
-	user: Mapped['User'] = relationship('User', back_populates='comments', lazy="selectin")
-	photo: Mapped['Photo'] = relationship('Photo', back_populates='comments', lazy="selectin")
+	user: Mapped['User'] = relationship('User', back_populates='comments', lazy="noload")
+	photo: Mapped['Photo'] = relationship('Photo', back_populates='comments', lazy="noload")
+
+	__table_args__ = (
+		Index("ix_comments_photo_id_created_at_id", "photo_id", "created_at", "id"),
+	)
 
 
 class TransformedImage(Base):
@@ -106,7 +144,13 @@ class TransformedImage(Base):
 	id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
 	photo_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey('photos.id'))
 	transformed_url: Mapped[str] = mapped_column(String, nullable=True)
-	photo: Mapped['Photo'] = relationship('Photo', back_populates='transformed_images', lazy="selectin")
+	# SHA-256 of the canonical transformation, see src.services.transformation. Empty for legacy rows.
+	transform_key: Mapped[str] = mapped_column(String(64), nullable=True)
+	photo: Mapped['Photo'] = relationship('Photo', back_populates='transformed_images', lazy="noload")
+
+	__table_args__ = (
+		Index("ix_transformed_images_photo_id_transform_key", "photo_id", "transform_key", unique=True),
+	)
 
 
 class QrCode(Base):
@@ -114,7 +158,22 @@ class QrCode(Base):
 	id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
 	photo_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey('photos.id'))
 	qr_code_url: Mapped[str] = mapped_column(String, nullable=True)
-	qr_code: Mapped['Photo'] = relationship('Photo', back_populates='qr_code', lazy="selectin")
+	qr_code: Mapped['Photo'] = relationship('Photo', back_populates='qr_code', lazy="noload")
+
+	__table_args__ = (
+		Index("ix_qr_codes_photo_id", "photo_id", unique=True),
+	)
+
+
+# An image stored in Cloudinary, shared by every photo uploaded with the same content.
+# `ref_count` is the number of those photos; the asset is destroyed when it drops to zero.
+class PhotoAsset(Base):
+	__tablename__ = "photo_assets"
+	content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+	cloudinary_id: Mapped[str] = mapped_column(String(255), nullable=False)
+	url: Mapped[str] = mapped_column(String(255), nullable=False)
+	ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+	created_at: Mapped[date] = mapped_column("created_at", DateTime, default=func.now())
 
 
 class Rating(Base):
@@ -123,5 +182,9 @@ class Rating(Base):
 	photo_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey("photos.id"))
 	user_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey("users.id"))
 	rating: Mapped[int] = mapped_column(Integer, nullable=False)
-	photo: Mapped["Photo"] = relationship("Photo", back_populates="ratings", lazy="selectin")
-	user: Mapped["User"] = relationship("User", back_populates="ratings", lazy="selectin")
\ No newline at end of file
+	photo: Mapped["Photo"] = relationship("Photo", back_populates="ratings", lazy="noload")
+	user: Mapped["User"] = relationship("User", back_populates="ratings", lazy="noload")
+
+	__table_args__ = (
+		Index("ix_ratings_photo_id", "photo_id"),
+	)
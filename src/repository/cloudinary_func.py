@@ -1,70 +1,143 @@
 from fastapi import HTTPException
-from typing import List
+from typing import List, Optional
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from src.entity.models import Photo, TransformedImage, User
+from src.entity.models import Photo, PhotoAsset, TransformedImage
+from src.repository.photo import photo_repository
+from src.repository.photo_asset import PhotoAssetRepository
+from src.repository.tag import MAX_TAGS_PER_PHOTO, TagRepository
 from src.schemas.cloudinary_func import Transformation
+from src.schemas.user import UserPrincipal
+from src.services.storage import storage
+from src.services.transformation import canonicalize, transform_backend, transform_key
 from uuid import UUID
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
 
 
 class CloudinaryRepository:
 
 	@staticmethod
 	async def transform_image(
-			photo_id: UUID,
+			photo: Photo,
 			transformations: List[Transformation],
-			description: str,
+			description: Optional[str],
 			db: AsyncSession,
-			user: User
+			user: UserPrincipal,
+			tags: Optional[List[str]] = None,
+			materialize: bool = False
 			) -> str:
 		"""
-		Transforms an image based on given transformations and uploads the transformed image to Cloudinary.
+		Transforms an image based on given transformations.
+
+		Transformations are canonicalized into a key that is unique per photo, so repeating a
+		transformation returns the existing derivative right away instead of creating another one.
+
+		By default the transformed image is a signed Cloudinary delivery URL built locally from the
+		transformations, so nothing is sent to Cloudinary and no copy is stored; Cloudinary derives
+		the image on the first request for the URL. Only with `materialize` the transformed image is
+		uploaded to Cloudinary as a new copy and saved as a new photo of `user`. With
+		`TRANSFORM_BACKEND=local` images are transformed locally and always materialized.
+
+		No transaction is open while a copy is rendered and stored, and the copy is deleted
+		again if it cannot be recorded afterwards. Copies whose content hash is known (local
+		transforms) are recorded as a `PhotoAsset`, so identical copies share one stored file.
 
 		Args:
-			photo_id (UUID): The ID of the photo to be transformed.
+			photo (Photo): The photo to be transformed, loaded with the `PHOTO_TAGS` profile.
 			transformations (List[Transformation]): A list of transformation objects to be applied to the photo.
-			description (str): A description for the transformed photo.
+			description (Optional[str]): A description for the transformed photo. Only used with `materialize`.
 			db (AsyncSession): The database session object for asynchronous database operations.
-			user (User): The user object to associate the transformed photo with the user.
+			user (UserPrincipal): The user to associate the transformed photo with. Only used with `materialize`.
+			tags (Optional[List[str]]): Tag names for the transformed photo. If omitted, the tags of the original photo are copied.
+				Only used with `materialize`.
+			materialize (bool): Upload the transformed image as a new photo instead of only building its URL.
 
 		Returns:
 			str: The URL of the transformed image.
 
 		Raises:
-			HTTPException: If the photo is not found (404) or if an error occurs during the transformation (500).
+			HTTPException: If more than 5 tags are given (400)
+				or if an error occurs during the transformation (500).
 
 		"""		
 		try:
-			result = await db.execute(select(Photo).filter(Photo.id == photo_id))
-			photo = result.scalars().first()
-			if not photo:
-				raise HTTPException(status_code=404, detail="Photo not found")
-			transform_params = {}
-			for transformation in transformations:
-				transform_params.update(transformation.model_dump(exclude_none=True))
-			response = cloudinary.uploader.upload(photo.url, transformation=transform_params)
-			transform_url = response['url']
-			transformed_image = TransformedImage(
-				photo_id=photo.id,
-				transformed_url=transform_url,
+			if not materialize and not transform_backend.builds_urls:
+				# Backends without delivery URLs store every derivative as a copy.
+				materialize = True
+			transform_params = canonicalize(transformations)
+			key = transform_key(transform_params, materialize)
+			existing_url = await CloudinaryRepository._get_transformed_url(db, photo.id, key)
+			if existing_url is not None:
+				return existing_url
 
-			)
+			if materialize:
+				tag_names = TagRepository.normalize(tags) if tags is not None else None
+				if tag_names and len(tag_names) > MAX_TAGS_PER_PHOTO:
+					raise HTTPException(status_code=400, detail="Error. You can add only 5 tags.")
+				# Nothing was written yet, so ending the transaction returns the connection to the
+				# pool while the copy is rendered and stored. A rollback would expire `photo`.
+				await db.commit()
+				transform_url, public_id, content_hash = await transform_backend.materialize(photo, transform_params)
+			else:
+				transform_url = transform_backend.url(photo, transform_params)
 
-			transformed_photo = Photo(
-				url=transform_url,
-				cloudinary_id=response['public_id'],
-				description=description,
-				user_id=user.id,
-				tags=photo.tags
-			)
-			db.add(transformed_photo)
-			db.add(transformed_image)
-			await db.commit()
+			try:
+				if materialize and content_hash is not None:
+					asset = await PhotoAssetRepository.register(db, content_hash, public_id, transform_url)
+					if asset.cloudinary_id != public_id:
+						# The same image is already stored under another key, e.g. as an upload.
+						await storage.delete(public_id)
+						transform_url, public_id = asset.url, asset.cloudinary_id
+				created = await db.scalar(
+					insert(TransformedImage)
+					.values(photo_id=photo.id, transformed_url=transform_url, transform_key=key)
+					.on_conflict_do_nothing(index_elements=[TransformedImage.photo_id, TransformedImage.transform_key])
+					.returning(TransformedImage.id)
+				)
+				if created is not None:
+					if materialize:
+						db.add(Photo(
+							url=transform_url,
+							cloudinary_id=public_id,
+							content_hash=content_hash,
+							description=description,
+							user_id=user.id,
+							tags=photo.tags if tag_names is None else await TagRepository.get_or_create_many(db, tag_names)
+						))
+					await photo_repository.touch_photo(photo.id, db)
+					await db.commit()
+			except Exception:
+				if materialize:
+					await CloudinaryRepository._discard_copy(db, public_id, content_hash)
+				raise
 
+			if created is None:
+				# The same derivative was created concurrently; keep that one.
+				existing_url = await CloudinaryRepository._get_transformed_url(db, photo.id, key)
+				if materialize:
+					await CloudinaryRepository._discard_copy(db, public_id, content_hash)
+				return existing_url
 			return transform_url
+		except HTTPException:
+			await db.rollback()
+			raise
 		except Exception as e:
 			await db.rollback()
 			raise HTTPException(status_code=500, detail=f"Error transforming image: {str(e)}")
+
+	@staticmethod
+	async def _get_transformed_url(db: AsyncSession, photo_id: UUID, key: str) -> Optional[str]:
+		return await db.scalar(
+			select(TransformedImage.transformed_url).filter_by(photo_id=photo_id, transform_key=key)
+		)
+
+	@staticmethod
+	async def _discard_copy(db: AsyncSession, public_id: str, content_hash: Optional[str]) -> None:
+		# Rolling back drops everything this transform recorded. A copy stored by content can
+		# still be the asset of other photos though, and is only deleted if it is not.
+		await db.rollback()
+		if content_hash is not None and await db.scalar(
+			select(PhotoAsset.cloudinary_id).filter_by(content_hash=content_hash)
+		) == public_id:
+			return
+		await storage.delete(public_id)
@@ -1,8 +1,13 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from fastapi import HTTPException
 from uuid import UUID
 from src.entity.models import Comment, Photo
+from src.repository.photo import photo_repository
+from src.services.pagination import decode_cursor, encode_cursor
 from sqlalchemy.exc import IntegrityError
 from collections.abc import Sequence
 
@@ -35,6 +40,7 @@ class CommentRepository:
         try:
             comment = Comment(text=text, user_id=user_id, photo_id=photo_id)
             db.add(comment)
+            await CommentRepository._update_comment_count(db, photo_id, 1)
             await db.commit()
             await db.refresh(comment)
             return comment
@@ -80,6 +86,7 @@ class CommentRepository:
             comment = await CommentRepository.get_comment_by_id(db, comment_id)
             if comment:
                 comment.text = new_text
+                await photo_repository.touch_photo(comment.photo_id, db)
                 await db.commit()
                 await db.refresh(comment)
                 return comment
@@ -106,6 +113,7 @@ class CommentRepository:
             comment = await CommentRepository.get_comment_by_id(db, comment_id)
             if comment:
                 await db.delete(comment)
+                await CommentRepository._update_comment_count(db, comment.photo_id, -1)
                 await db.commit()
             else:
                 raise HTTPException(status_code=404, detail="Comment not found")
@@ -115,18 +123,63 @@ class CommentRepository:
             raise HTTPException(status_code=500, detail="Error delete comment")
 
     @staticmethod
-    async def get_comment_by_photo_id(
-        db: AsyncSession, photo_id: UUID
-    ) -> Sequence[Comment]:
+    async def _update_comment_count(db: AsyncSession, photo_id: UUID, delta: int) -> None:
         """
-        Retrieves all comments for a given photo ID.
+        Applies a change to the comment count of a photo within the current transaction.
+
+        The increment is done in SQL, so concurrent comments on the same photo cannot lose updates.
+        It also moves the photo's `updated_at` forward, which versions its cached representations.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            photo_id (UUID): The ID of the photo.
+            delta (int): The change of the number of comments.
+        """
+        await db.execute(
+            update(Photo)
+            .where(Photo.id == photo_id)
+            .values(comment_count=Photo.comment_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def get_comments_by_photo_id(
+        db: AsyncSession, photo_id: UUID, cursor: Optional[str], limit: int
+    ) -> tuple[Sequence[Comment], Optional[str]]:
+        """
+        Retrieves a page of the comments of a photo, newest first.
+
+        Pages are addressed by a keyset cursor over `(created_at, id)` and read from
+        `ix_comments_photo_id_created_at_id`, so deep pages of a large thread stay cheap.
 
         Args:
             db (AsyncSession): The database session object for asynchronous database operations.
             photo_id (UUID): The ID of the photo to retrieve comments for.
+            cursor (Optional[str]): The `next_cursor` returned with the previous page, or None for the first page.
+            limit (int): The maximum number of comments to return.
 
         Returns:
-            Sequence[Comment]: A list of comments associated with the photo.
+            tuple[Sequence[Comment], Optional[str]]: The comments and the cursor of the next page,
+            or None if this is the last page.
+
+        Raises:
+            HTTPException: If the cursor is invalid (400).
         """
-        result = await db.execute(select(Comment).where(Comment.photo_id == photo_id))
-        return result.scalars().all()
+        query = (
+            select(Comment)
+            .where(Comment.photo_id == photo_id)
+            .order_by(Comment.created_at.desc(), Comment.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            created_at, comment_id = decode_cursor(cursor, "comments", "desc", datetime.fromisoformat, UUID)
+            query = query.where(tuple_(Comment.created_at, Comment.id) < tuple_(created_at, comment_id))
+
+        result = await db.execute(query)
+        comments = result.scalars().all()
+
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = encode_cursor("comments", "desc", comments[-1].created_at, comments[-1].id)
+        return comments, next_cursor
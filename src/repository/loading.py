@@ -0,0 +1,75 @@
+"""
+Loading profiles for repository queries.
+
+Every relationship in `src.entity.models` is declared with `lazy="noload"`, so a query
+only hydrates the relationships it asks for. A profile is a tuple of loader options that
+a repository method passes to `select(...).options(*profile)`; it lists exactly what the
+caller is going to serialize or touch, and nothing else.
+"""
+from typing import Sequence
+
+from sqlalchemy import select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.configuration.settings import config
+from src.entity.models import Comment, Photo
+
+
+# Columns only: ownership checks, existence lookups, authentication.
+COLUMNS_ONLY = ()
+
+# Everything `PhotoResponse` serializes, except the latest comments: a loader option
+# cannot limit a collection per parent, so those come from `attach_latest_comments`.
+PHOTO_RESPONSE = (
+    selectinload(Photo.tags),
+    selectinload(Photo.transformed_images),
+)
+
+# Tags only, e.g. to copy them onto a transformed photo.
+PHOTO_TAGS = (selectinload(Photo.tags),)
+
+# The small collections the unit of work cascades a photo delete to. Comments and ratings
+# can run into the tens of thousands on a popular photo, so `PhotoRepository.delete_photo`
+# removes them with bulk DELETEs instead of loading them.
+PHOTO_DELETE = (
+    selectinload(Photo.tags),
+    selectinload(Photo.transformed_images),
+    selectinload(Photo.qr_code),
+)
+
+
+async def attach_latest_comments(
+    db: AsyncSession, photos: Sequence[Photo], limit: int = config.PHOTO_LATEST_COMMENTS
+) -> None:
+    """
+    Fills `Photo.comments` of every photo with its newest `limit` comments, newest first.
+
+    One query for all photos: a LATERAL subquery takes the top `limit` comments of each photo
+    from `ix_comments_photo_id_created_at_id`, so a photo with many thousands of comments costs
+    the same as one with a few. The full thread is paginated by `GET /comments/photos/{photo_id}`.
+    """
+    if not photos:
+        return
+    comments_by_photo = {photo.id: [] for photo in photos}
+    if limit > 0:
+        photo_ids = select(Photo.id).where(Photo.id.in_(list(comments_by_photo))).subquery("photo_ids")
+        latest = (
+            select(Comment)
+            .where(Comment.photo_id == photo_ids.c.id)
+            .order_by(Comment.created_at.desc(), Comment.id.desc())
+            .limit(limit)
+            .lateral("latest")
+        )
+        latest_comment = aliased(Comment, latest)
+        result = await db.scalars(
+            select(latest_comment)
+            .select_from(photo_ids)
+            .join(latest, true())
+            .order_by(latest.c.photo_id, latest.c.created_at.desc(), latest.c.id.desc())
+        )
+        for comment in result.all():
+            comments_by_photo[comment.photo_id].append(comment)
+    for photo in photos:
+        set_committed_value(photo, "comments", comments_by_photo[photo.id])
@@ -1,43 +1,80 @@
+import asyncio
+import itertools
+from collections import Counter
 from datetime import datetime
 from typing import Optional, Sequence
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from fastapi import HTTPException, UploadFile, status
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from src.repository.tag import TagRepository
-from src.entity.models import Photo, User
+from src.configuration.settings import config
+from src.repository.loading import PHOTO_RESPONSE, attach_latest_comments
+from src.repository.photo_asset import PhotoAssetRepository
+from src.repository.tag import MAX_TAGS_PER_PHOTO, TagRepository
+from src.entity.models import Comment, Photo, Rating
 from src.schemas.photo import PhotoUpdate
-
-from cloudinary import uploader as cloudinary_uploader
+from src.schemas.user import UserPrincipal
+from src.services.pagination import decode_cursor, encode_cursor
+from src.services.storage import storage
+from src.services.upload import StagedUpload
 
 
 class PhotoRepository:
     async def get_all_photos(
-        self, offset: int, limit: int, db: AsyncSession
-    ) -> Sequence[Photo]:
+        self, cursor: Optional[str], limit: int, db: AsyncSession
+    ) -> tuple[Sequence[Photo], Optional[str]]:
         """
-        Retrieve a paginated list of photos from the database.
+        Retrieve a page of photos from the database, newest first.
+
+        Pages are addressed by a keyset cursor over `(created_at, id)`, so every page is an
+        index range scan on `ix_photos_created_at_id` no matter how deep the client pages.
 
         **Parameters:**
 
-        - `offset` (int): The number of photos to skip before starting to collect the result set.
+        - `cursor` (Optional[str]): The `next_cursor` returned with the previous page, or `None` for the first page.
         - `limit` (int): The maximum number of photos to return.
         - `db` (AsyncSession): The database session for async operations.
 
         **Returns:**
 
-        - `Sequence[Photo]`: A sequence of `Photo` objects.
+        - `tuple[Sequence[Photo], Optional[str]]`: The photos loaded with the `PHOTO_RESPONSE` profile
+          and their latest comments, and the cursor of the next page, or `None` if this is the last page.
+
+        **Raises:**
+
+        - `HTTPException`: 400 Bad Request if the cursor is invalid.
 
         """
-        result = await db.execute(select(Photo).offset(offset).limit(limit))
+        query = (
+            select(Photo)
+            .options(*PHOTO_RESPONSE)
+            .order_by(Photo.created_at.desc(), Photo.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            created_at, photo_id = decode_cursor(
+                cursor, "date", "desc", datetime.fromisoformat, UUID
+            )
+            query = query.where(
+                tuple_(Photo.created_at, Photo.id) < tuple_(created_at, photo_id)
+            )
+
+        result = await db.execute(query)
         photos = result.scalars().all()
 
-        return photos
+        next_cursor = None
+        if len(photos) > limit:
+            photos = photos[:limit]
+            next_cursor = encode_cursor("date", "desc", photos[-1].created_at, photos[-1].id)
+
+        await attach_latest_comments(db, photos)
+        return photos, next_cursor
 
     async def get_photo_by_id_or_404(
-        self, photo_id: UUID, db: AsyncSession
+        self, photo_id: UUID, db: AsyncSession, profile: tuple = PHOTO_RESPONSE
     ) -> Photo | None:
         """
         Retrieve a photo by its ID. Raises an HTTP 404 exception if the photo is not found.
@@ -46,6 +83,8 @@ class PhotoRepository:
 
         - `photo_id` (UUID): The ID of the photo to retrieve.
         - `db` (AsyncSession): The database session for async operations.
+        - `profile` (tuple): Loader options from `src.repository.loading`. Defaults to `PHOTO_RESPONSE`,
+          which also attaches the latest comments.
 
         **Returns:**
 
@@ -56,7 +95,9 @@ class PhotoRepository:
         - `HTTPException`: If the photo with the specified ID is not found.
 
         """
-        result = await db.execute(select(Photo).filter_by(id=photo_id))
+        result = await db.execute(
+            select(Photo).options(*profile).filter_by(id=photo_id)
+        )
         photo = result.scalar_one_or_none()
 
         if not photo:
@@ -64,25 +105,86 @@ class PhotoRepository:
                 status_code=status.HTTP_404_NOT_FOUND, detail="Photo was not found."
             )
 
+        if profile is PHOTO_RESPONSE:
+            await attach_latest_comments(db, [photo])
         return photo
 
+    async def get_photo_version(self, photo_id: UUID, db: AsyncSession) -> datetime:
+        """
+        Retrieve only the `updated_at` of a photo, as a cheap version for conditional requests.
+
+        Every write that changes what `GET /photo/{photo_id}` returns (the photo itself, its
+        comments, ratings or transformed images) moves `updated_at` forward.
+
+        **Parameters:**
+
+        - `photo_id` (UUID): The ID of the photo.
+        - `db` (AsyncSession): The database session for async operations.
+
+        **Returns:**
+
+        - `datetime`: The time the photo or anything shown with it last changed.
+
+        **Raises:**
+
+        - `HTTPException`: 404 Not Found if the photo does not exist.
+
+        """
+        updated_at = await db.scalar(select(Photo.updated_at).filter_by(id=photo_id))
+        if updated_at is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Photo was not found."
+            )
+        return updated_at
+
+    async def touch_photo(self, photo_id: UUID, db: AsyncSession) -> None:
+        """
+        Move `updated_at` of a photo forward after a change to something shown with it,
+        such as a comment or a transformed image. Nothing is committed.
+
+        **Parameters:**
+
+        - `photo_id` (UUID): The ID of the photo.
+        - `db` (AsyncSession): The database session for async operations.
+
+        """
+        await db.execute(
+            update(Photo)
+            .where(Photo.id == photo_id)
+            .values(updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
     async def save_photo_to_db(
         self,
-        file: UploadFile,
+        file: StagedUpload,
         description: str,
         tags: list[str],
-        user: User,
+        user: UserPrincipal,
         db: AsyncSession,
     ) -> Photo:
         """
         Save a new photo to the database with optional tags.
 
+        Tags are resolved with `TagRepository.get_or_create_many` after the upload, so new
+        tags are committed in the same transaction as the photo.
+
+        Files are deduplicated by their SHA-256: if the same content was uploaded before, the
+        new photo shares the existing stored image and nothing is sent to the storage.
+        The asset is reference-counted in `photo_assets` and destroyed with its last photo.
+
+        No transaction is open while a new file is sent to the storage: when the lookup finds
+        no asset, its transaction is rolled back before the upload, so the session does not
+        keep a pooled connection checked out for up to `CLOUDINARY_TIMEOUT`. If saving the
+        photo fails after that, the new file is deleted from the storage again, since no
+        asset row is left to release it.
+
         **Parameters:**
 
-        - file (UploadFile): The file of the photo to upload.
+        - file (StagedUpload): The validated file of the photo to upload, from `stage_upload`.
         - description (str): A description of the photo.
         - tags (list[str]): A list of tags for the photo.
-        - user (User): The user who uploaded the photo.
+        - user (UserPrincipal): The user who uploaded the photo.
         - db (AsyncSession): The database session for async operations.
 
         **Returns:**
@@ -93,47 +195,183 @@ class PhotoRepository:
 
         - HTTPException: If more than 5 tags are provided.
         """
-        if tags:
-            str_tag = tags[0]
-            list_tags = [result for result in str_tag.split(",") if result != ""]
-            tag_objects = []
-
-            if len(list_tags) > 5:
-                raise HTTPException(
-                    status_code=400, detail="Error. You can add only 5 tags."
-                )
+        tag_names = self._tag_names(tags[0] if tags else None)
+
+        public_id = None
+        asset = await PhotoAssetRepository.acquire(db, file.sha256)
+        if asset is None:
+            # The lookup matched no row, so there is nothing to keep; ending the transaction
+            # returns the connection to the pool for the duration of the upload.
+            await db.rollback()
+            public_id = uuid4().hex
+            url = await storage.put(file.file, public_id)
+
+        try:
+            if public_id is not None:
+                asset = await PhotoAssetRepository.register(db, file.sha256, public_id, url)
+                if asset.cloudinary_id != public_id:
+                    # The same content was uploaded concurrently and registered first.
+                    await storage.delete(public_id)
+                    public_id = None
 
-            for tag_name in list_tags:
-                tag = await TagRepository.get_tag(db, tag_name)
-                if not tag:
-                    tag = await TagRepository.create_tag(db, tag_name)
-                tag_objects.append(tag)
-
-            public_id = f"{datetime.now().timestamp()}_{user.email}"
-            resource = cloudinary_uploader.upload(file.file, public_id=public_id)
             photo = Photo(
-                url=resource["secure_url"],
-                cloudinary_id=public_id,
+                url=asset.url,
+                cloudinary_id=asset.cloudinary_id,
+                content_hash=file.sha256,
                 description=description,
                 user_id=user.id,
+                tags=await TagRepository.get_or_create_many(db, tag_names),
             )
 
-            for tag in tag_objects:
-                photo.tags.append(tag)
-        else:
-            public_id = f"{datetime.now().timestamp()}_{user.email}"
-            resource = cloudinary_uploader.upload(file.file, public_id=public_id)
-            photo = Photo(
-                url=resource["secure_url"],
-                cloudinary_id=public_id,
-                description=description,
-                user_id=user.id,
-            )
+            db.add(photo)
+            await db.commit()
+        except Exception:
+            if public_id is not None:
+                await storage.delete(public_id)
+            raise
+        return await self.get_photo_by_id_or_404(photo.id, db)
 
-        db.add(photo)
-        await db.commit()
-        await db.refresh(photo)
-        return photo
+    async def save_photos_to_db(
+        self,
+        uploads: Sequence[tuple[StagedUpload, Optional[str], Optional[str]]],
+        user: UserPrincipal,
+        db: AsyncSession,
+    ) -> list[tuple[Optional[Photo], Optional[str]]]:
+        """
+        Save many new photos at once, reporting a result for every file.
+
+        Files whose content is already stored share the existing asset, as in `save_photo_to_db`;
+        every other distinct file is stored once, at most `UPLOAD_BATCH_CONCURRENCY`
+        at a time. A file with too many tags or a failed upload is reported without failing the others.
+
+        The uploads run outside any transaction: the stored contents are looked up without
+        locking and that transaction is rolled back before the first upload starts. The
+        references to existing assets are taken afterwards, in one short transaction together
+        with the new assets, the tags and the photos, so concurrent uploads and deletes of the
+        same content are never blocked for the duration of the batch.
+
+        **Parameters:**
+
+        - uploads (Sequence[tuple[StagedUpload, Optional[str], Optional[str]]]): The validated file,
+          description and comma-separated tags of every photo.
+        - user (UserPrincipal): The user who uploaded the photos.
+        - db (AsyncSession): The database session for async operations.
+
+        **Returns:**
+
+        - list[tuple[Optional[Photo], Optional[str]]]: The saved photo or an error message for every
+          upload, in the order of `uploads`.
+        """
+        errors: dict[int, str] = {}
+        tag_names: dict[int, list[str]] = {}
+        for index, (_, _, tags) in enumerate(uploads):
+            try:
+                tag_names[index] = self._tag_names(tags)
+            except HTTPException as error:
+                errors[index] = error.detail
+        accepted = [index for index in range(len(uploads)) if index not in errors]
+
+        references = Counter(uploads[index][0].sha256 for index in accepted)
+        stored = await PhotoAssetRepository.find_stored(db, references)
+        # Nothing is locked yet; free the connection while the files are uploaded.
+        await db.rollback()
+        first_upload = {}
+        for index in accepted:
+            first_upload.setdefault(uploads[index][0].sha256, index)
+        missing = {
+            content_hash: index
+            for content_hash, index in first_upload.items()
+            if content_hash not in stored
+        }
+
+        slots = asyncio.Semaphore(config.UPLOAD_BATCH_CONCURRENCY)
+
+        async def upload_one(content_hash: str, index: int):
+            public_id = uuid4().hex
+            async with slots:
+                try:
+                    url = await storage.put(uploads[index][0].file, public_id)
+                except HTTPException as error:
+                    return content_hash, None, error.detail
+                except Exception as error:
+                    return content_hash, None, f"Upload failed: {error}"
+            asset = {
+                "content_hash": content_hash,
+                "cloudinary_id": public_id,
+                "url": url,
+                "ref_count": references[content_hash],
+            }
+            return content_hash, asset, None
+
+        uploaded = await asyncio.gather(
+            *(upload_one(content_hash, index) for content_hash, index in missing.items())
+        )
+        failed_uploads = {content_hash: error for content_hash, _, error in uploaded if error}
+        new_assets = [asset for _, asset, _ in uploaded if asset]
+
+        try:
+            assets = await PhotoAssetRepository.acquire_many(
+                db, {content_hash: references[content_hash] for content_hash in stored}
+            )
+            for content_hash in stored - assets.keys():
+                # The last photo with this content was deleted while the batch was uploading.
+                failed_uploads[content_hash] = "The stored image was deleted meanwhile, upload the file again"
+            assets.update(await PhotoAssetRepository.register_many(db, new_assets))
+            tags = {
+                tag.name: tag
+                for tag in await TagRepository.get_or_create_many(
+                    db, itertools.chain.from_iterable(tag_names.values())
+                )
+            }
+            photos: dict[int, Photo] = {}
+            for index in accepted:
+                file, description, _ = uploads[index]
+                if file.sha256 in failed_uploads:
+                    errors[index] = failed_uploads[file.sha256]
+                    continue
+                asset = assets[file.sha256]
+                photos[index] = Photo(
+                    url=asset.url,
+                    cloudinary_id=asset.cloudinary_id,
+                    content_hash=file.sha256,
+                    description=description,
+                    user_id=user.id,
+                    tags=[tags[name] for name in tag_names[index]],
+                )
+            db.add_all(photos.values())
+            await db.commit()
+        except Exception:
+            for asset in new_assets:
+                await storage.delete(asset["cloudinary_id"])
+            raise
+
+        for asset in new_assets:
+            if assets[asset["content_hash"]].cloudinary_id != asset["cloudinary_id"]:
+                # The same content was uploaded concurrently and registered first.
+                await storage.delete(asset["cloudinary_id"])
+
+        saved = {}
+        if photos:
+            result = await db.scalars(
+                select(Photo)
+                .options(*PHOTO_RESPONSE)
+                .filter(Photo.id.in_([photo.id for photo in photos.values()]))
+            )
+            saved = {photo.id: photo for photo in result.all()}
+            await attach_latest_comments(db, list(saved.values()))
+        return [
+            (saved[photos[index].id], None) if index in photos else (None, errors[index])
+            for index in range(len(uploads))
+        ]
+
+    @staticmethod
+    def _tag_names(tags: Optional[str]) -> list[str]:
+        tag_names = TagRepository.normalize(tags.split(",")) if tags else []
+        if len(tag_names) > MAX_TAGS_PER_PHOTO:
+            raise HTTPException(
+                status_code=400, detail="Error. You can add only 5 tags."
+            )
+        return tag_names
 
     async def update_photo(
         self, photo: Photo, body: PhotoUpdate, db: AsyncSession
@@ -143,30 +381,40 @@ class PhotoRepository:
 
         **Parameters:**
 
-        - `photo` (Photo): The `Photo` object to update.
+        - `photo` (Photo): The `Photo` object to update, loaded with the `COLUMNS_ONLY` profile.
         - `body` (PhotoUpdate): The new details to update in the photo.
         - `db` (AsyncSession): The database session for async operations.
 
         **Returns:**
 
-        - `Photo | None`: The updated `Photo` object.
+        - `Photo | None`: The updated `Photo` object, loaded once after the commit with
+          everything `PhotoResponse` serializes.
 
         """
         photo.description = body.description
         db.add(photo)
 
         await db.commit()
-        await db.refresh(photo)
 
-        return photo
+        # The photo was loaded without relationships, which a reload into the same
+        # instance would keep; the response is built from a fresh one instead.
+        db.expunge(photo)
+        return await self.get_photo_by_id_or_404(photo.id, db)
 
     async def delete_photo(self, photo: Photo, db: AsyncSession) -> None:
         """
-        Delete a photo from the database.
+        Delete a photo from the database and its image from the storage.
+
+        A deduplicated image is shared with other photos, so it is only destroyed when the
+        last photo referencing it is deleted. The image is destroyed after the commit, so a
+        failed delete never leaves a photo pointing to a missing image.
+
+        Comments and ratings are deleted with one statement each, however many there are;
+        they are not loaded, so the ORM cascade has nothing of them to delete row by row.
 
         **Parameters:**
 
-        - `photo` (Photo): The `Photo` object to delete.
+        - `photo` (Photo): The `Photo` object to delete, loaded with the `PHOTO_DELETE` profile.
         - `db` (AsyncSession): The database session for async operations.
 
         **Returns:**
@@ -174,8 +422,15 @@ class PhotoRepository:
         - None
 
         """
+        unused_cloudinary_id = photo.cloudinary_id
+        if photo.content_hash is not None:
+            unused_cloudinary_id = await PhotoAssetRepository.release(db, photo.content_hash)
+        await db.execute(delete(Comment).where(Comment.photo_id == photo.id))
+        await db.execute(delete(Rating).where(Rating.photo_id == photo.id))
         await db.delete(photo)
         await db.commit()
+        if unused_cloudinary_id is not None:
+            await storage.delete(unused_cloudinary_id)
 
 
 photo_repository = PhotoRepository()
@@ -0,0 +1,181 @@
+from typing import Iterable, Mapping, Optional, Sequence
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.entity.models import PhotoAsset
+
+
+class PhotoAssetRepository:
+
+    @staticmethod
+    async def acquire(db: AsyncSession, content_hash: str) -> Optional[PhotoAsset]:
+        """
+        Takes a reference to the stored asset with the given content, if there is one.
+
+        The reference count is incremented in SQL, and the row stays locked until the caller
+        commits, so a concurrent `release` cannot destroy the asset in between.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            content_hash (str): The SHA-256 of the uploaded file.
+
+        Returns:
+            Optional[PhotoAsset]: The asset, or None if this content was never uploaded.
+        """
+        return await db.scalar(
+            update(PhotoAsset)
+            .where(PhotoAsset.content_hash == content_hash)
+            .values(ref_count=PhotoAsset.ref_count + 1)
+            .returning(PhotoAsset)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def register(
+        db: AsyncSession, content_hash: str, cloudinary_id: str, url: str
+    ) -> PhotoAsset:
+        """
+        Records a freshly uploaded asset with one reference.
+
+        If a concurrent upload of the same content registered first, that asset wins and gets
+        the reference instead; the caller can tell by comparing `cloudinary_id` and should
+        destroy its own, now unused, upload.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            content_hash (str): The SHA-256 of the uploaded file.
+            cloudinary_id (str): The public ID of the uploaded asset.
+            url (str): The delivery URL of the uploaded asset.
+
+        Returns:
+            PhotoAsset: The asset now referenced by the caller.
+        """
+        statement = insert(PhotoAsset).values(
+            content_hash=content_hash, cloudinary_id=cloudinary_id, url=url, ref_count=1
+        )
+        return await db.scalar(
+            statement.on_conflict_do_update(
+                index_elements=[PhotoAsset.content_hash],
+                set_={"ref_count": PhotoAsset.ref_count + 1},
+            )
+            .returning(PhotoAsset)
+            .execution_options(populate_existing=True)
+        )
+
+    @staticmethod
+    async def find_stored(db: AsyncSession, content_hashes: Iterable[str]) -> set[str]:
+        """
+        Looks up which of the given contents are already stored, without taking references or locks.
+
+        The answer can be stale by the time it is used; `acquire_many` tells for sure.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            content_hashes (Iterable[str]): The SHA-256 of every file.
+
+        Returns:
+            set[str]: The hashes that have an asset.
+        """
+        content_hashes = list(content_hashes)
+        if not content_hashes:
+            return set()
+        result = await db.scalars(
+            select(PhotoAsset.content_hash).where(PhotoAsset.content_hash.in_(content_hashes))
+        )
+        return set(result.all())
+
+    @staticmethod
+    async def acquire_many(
+        db: AsyncSession, references: Mapping[str, int]
+    ) -> dict[str, PhotoAsset]:
+        """
+        Takes references to the stored assets of many files with a single UPDATE.
+
+        The rows are locked in `content_hash` order, so two batches sharing contents wait on
+        each other instead of deadlocking. They stay locked until the caller commits.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            references (Mapping[str, int]): The number of references to take, by content hash.
+
+        Returns:
+            dict[str, PhotoAsset]: The assets that exist, by content hash. Hashes without an
+            asset are missing from the result and nothing is counted for them.
+        """
+        if not references:
+            return {}
+        locked = (
+            select(PhotoAsset.content_hash)
+            .where(PhotoAsset.content_hash.in_(list(references)))
+            .order_by(PhotoAsset.content_hash)
+            .with_for_update()
+        )
+        result = await db.scalars(
+            update(PhotoAsset)
+            .where(PhotoAsset.content_hash.in_(locked))
+            .values(ref_count=PhotoAsset.ref_count + case(references, value=PhotoAsset.content_hash))
+            .returning(PhotoAsset)
+            .execution_options(synchronize_session=False)
+        )
+        return {asset.content_hash: asset for asset in result.all()}
+
+    @staticmethod
+    async def register_many(
+        db: AsyncSession, assets: Sequence[Mapping]
+    ) -> dict[str, PhotoAsset]:
+        """
+        Records many freshly uploaded assets with a single `INSERT ... ON CONFLICT`.
+
+        As with `register`, an asset registered concurrently for the same content wins and
+        receives the references instead. Rows are inserted in `content_hash` order, for the
+        same reason `acquire_many` locks in that order.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            assets (Sequence[Mapping]): `content_hash`, `cloudinary_id`, `url` and `ref_count`
+                of every uploaded asset.
+
+        Returns:
+            dict[str, PhotoAsset]: The assets now referenced by the caller, by content hash.
+        """
+        if not assets:
+            return {}
+        statement = insert(PhotoAsset)
+        result = await db.scalars(
+            statement.on_conflict_do_update(
+                index_elements=[PhotoAsset.content_hash],
+                set_={"ref_count": PhotoAsset.ref_count + statement.excluded.ref_count},
+            )
+            .returning(PhotoAsset)
+            .execution_options(populate_existing=True),
+            [dict(asset) for asset in sorted(assets, key=lambda asset: asset["content_hash"])],
+        )
+        return {asset.content_hash: asset for asset in result.all()}
+
+    @staticmethod
+    async def release(db: AsyncSession, content_hash: str) -> Optional[str]:
+        """
+        Drops a reference to an asset and removes the asset once nothing references it.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            content_hash (str): The SHA-256 of the deleted photo's file.
+
+        Returns:
+            Optional[str]: The Cloudinary public ID to destroy after commit if this was the last
+            reference, otherwise None.
+        """
+        await db.execute(
+            update(PhotoAsset)
+            .where(PhotoAsset.content_hash == content_hash)
+            .values(ref_count=PhotoAsset.ref_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        return await db.scalar(
+            delete(PhotoAsset)
+            .where(PhotoAsset.content_hash == content_hash, PhotoAsset.ref_count <= 0)
+            .returning(PhotoAsset.cloudinary_id)
+            .execution_options(synchronize_session=False)
+        )
@@ -1,40 +1,74 @@
-from uuid import UUID
-import qrcode
+from typing import Mapping
+from uuid import UUID, uuid4
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.entity.models import QrCode as QrCodeModel
-from src.configuration.cloudinary import upload_qr_to_cloudinary
+
 
 class QrCode:
     @staticmethod
-    async def generate_qr_code(url_photo: str, db: AsyncSession, photo_id: UUID) -> str:
+    async def get_or_create_qr_code(photo_id: UUID, qr_code_url: str, db: AsyncSession) -> QrCodeModel:
         """
-        Generates a QR code for a given photo URL and stores it in the database.
+        Returns the QR code record of a photo, creating it on first use.
+
+        A photo has at most one record (`ix_qr_codes_photo_id` is unique), so repeated and
+        concurrent calls for the same photo return the same row instead of adding new ones.
 
         Args:
-            url_photo (str): The URL of the photo for which the QR code is to be generated.
-            db (AsyncSession): The database session object for asynchronous database operations.
             photo_id (UUID): The ID of the photo for which the QR code is generated.
+            qr_code_url (str): The URL the QR image is served from.
+            db (AsyncSession): The database session object for asynchronous database operations.
 
         Returns:
-            QrCodeModel: The QR code model object containing the generated QR code URL.
+            QrCodeModel: The QR code record of the photo.
+        """
+        qr = await db.scalar(select(QrCodeModel).filter_by(photo_id=photo_id))
+        if qr is not None:
+            return qr
+        qr = await db.scalar(
+            insert(QrCodeModel)
+            .values(photo_id=photo_id, qr_code_url=qr_code_url)
+            .on_conflict_do_nothing(index_elements=[QrCodeModel.photo_id])
+            .returning(QrCodeModel)
+        )
+        if qr is None:
+            # Created by a concurrent request between the select and the insert.
+            qr = await db.scalar(select(QrCodeModel).filter_by(photo_id=photo_id))
+        await db.commit()
+        return qr
 
+    @staticmethod
+    async def get_or_create_qr_codes(
+        qr_code_urls: Mapping[UUID, str], db: AsyncSession
+    ) -> dict[UUID, QrCodeModel]:
         """
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
+        Returns the QR code records of many photos, creating the missing ones.
+
+        The missing records are inserted with a single `INSERT ... ON CONFLICT DO NOTHING`
+        and all records are then read with a single SELECT.
+
+        Args:
+            qr_code_urls (Mapping[UUID, str]): The URL each photo's QR image is served from, by photo ID.
+            db (AsyncSession): The database session object for asynchronous database operations.
+
+        Returns:
+            dict[UUID, QrCodeModel]: The QR code records by photo ID.
+        """
+        if not qr_code_urls:
+            return {}
+        await db.execute(
+            insert(QrCodeModel).on_conflict_do_nothing(index_elements=[QrCodeModel.photo_id]),
+            [
+                {"id": uuid4(), "photo_id": photo_id, "qr_code_url": qr_code_url}
+                for photo_id, qr_code_url in qr_code_urls.items()
+            ],
         )
-        qr.add_data(url_photo)
-        qr.make(fit=True)
-        img = qr.make_image(fill='black', back_color='white')
-        qr_url = upload_qr_to_cloudinary(img, photo_id)
-        transformed_image = QrCodeModel(photo_id=photo_id, qr_code_url=qr_url)
-        db.add(transformed_image)
         await db.commit()
-        await db.refresh(transformed_image)
-        return transformed_image
+        result = await db.scalars(
+            select(QrCodeModel).filter(QrCodeModel.photo_id.in_(list(qr_code_urls)))
+        )
+        return {qr.photo_id: qr for qr in result.all()}
 
     @staticmethod
     async def get_qr_code(qr_id: UUID, db: AsyncSession) -> str:
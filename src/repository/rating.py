@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
+from sqlalchemy import func, update
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from uuid import UUID
@@ -51,6 +51,7 @@ class RatingRepository:
         try:
             rating = Rating(user_id=user_id, photo_id=photo_id, rating=rating_value)
             db.add(rating)
+            await RatingRepository._update_rating_stats(db, photo_id, 1, rating_value)
             await db.commit()
             await db.refresh(rating)
             return rating
@@ -99,6 +100,9 @@ class RatingRepository:
         """
         Retrieves the average rating for a specific photo.
 
+        Reads the `rating_average` column maintained on the photo instead of aggregating
+        the ratings table.
+
         Args:
             db (AsyncSession): The database session object for asynchronous database operations.
             photo_id (UUID): The ID of the photo.
@@ -107,11 +111,80 @@ class RatingRepository:
             float: The average rating of the photo, or 0.0 if no ratings are found.
         """
         result = await db.execute(
-			select(func.avg(Rating.rating)).where(Rating.photo_id == photo_id)
-		)
+            select(Photo.rating_average).where(Photo.id == photo_id)
+        )
         avg_rating = result.scalar()
         return avg_rating if avg_rating is not None else 0.0
 
+    @staticmethod
+    async def _update_rating_stats(
+        db: AsyncSession, photo_id: UUID, count_delta: int, sum_delta: int
+    ) -> None:
+        """
+        Applies a change to the rating aggregates of a photo within the current transaction.
+
+        The increment is done in SQL, so concurrent ratings of the same photo cannot lose updates.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            photo_id (UUID): The ID of the photo.
+            count_delta (int): The change of the number of ratings.
+            sum_delta (int): The change of the sum of rating values.
+        """
+        await db.execute(
+            update(Photo)
+            .where(Photo.id == photo_id)
+            .values(
+                rating_count=Photo.rating_count + count_delta,
+                rating_sum=Photo.rating_sum + sum_delta,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def recompute_rating_stats(db: AsyncSession, batch_size: int = 1000) -> int:
+        """
+        Recomputes the rating aggregates of every photo from the ratings table.
+
+        Photos are processed in batches ordered by ID, and each batch is committed on its own,
+        so the command can run against a live database. `updated_at` is left untouched.
+
+        Args:
+            db (AsyncSession): The database session object for asynchronous database operations.
+            batch_size (int): The number of photos per batch.
+
+        Returns:
+            int: The number of photos processed.
+        """
+        processed = 0
+        last_id = None
+        while True:
+            stmt = select(Photo.id).order_by(Photo.id).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(Photo.id > last_id)
+            photo_ids = (await db.execute(stmt)).scalars().all()
+            if not photo_ids:
+                return processed
+
+            await db.execute(
+                update(Photo)
+                .where(Photo.id.in_(photo_ids))
+                .values(
+                    rating_count=select(func.count(Rating.id))
+                    .where(Rating.photo_id == Photo.id)
+                    .scalar_subquery(),
+                    rating_sum=select(func.coalesce(func.sum(Rating.rating), 0))
+                    .where(Rating.photo_id == Photo.id)
+                    .scalar_subquery(),
+                    updated_at=Photo.updated_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+            processed += len(photo_ids)
+            last_id = photo_ids[-1]
+
     @staticmethod
     async def get_ratings_for_photo(
 			db: AsyncSession,
@@ -149,6 +222,9 @@ class RatingRepository:
             )
             if rating:
                 await db.delete(rating)
+                await RatingRepository._update_rating_stats(
+                    db, rating.photo_id, -1, -rating.rating
+                )
                 await db.commit()
             else:
                 raise HTTPException(status_code=404, detail="Rating not found.")
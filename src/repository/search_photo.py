@@ -1,12 +1,19 @@
-from sqlalchemy import desc, asc, func
-from sqlalchemy.orm import selectinload
+import operator
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import desc, asc, func, or_, tuple_
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
-from typing import List, Optional
-from src.entity.models import Photo, Tag, User, Rating
+from typing import List, Optional, Tuple
+from src.entity.models import Photo, Tag, User
+from src.repository.loading import PHOTO_RESPONSE, attach_latest_comments
 from src.schemas.photo import SortBy, Order
+from src.services.pagination import decode_cursor, encode_cursor
+
+SEARCH_CONFIG = "simple"
 
 
 class SearchPhotoRepository:
@@ -17,50 +24,92 @@ class SearchPhotoRepository:
 			tag: Optional[str] = None,
 			username: Optional[str] = None,
 			sort_by: SortBy = SortBy.date,
-			order: Order = Order.asc
-	) -> List[Photo]:
+			order: Order = Order.asc,
+			cursor: Optional[str] = None,
+			limit: int = 20
+	) -> Tuple[List[Photo], Optional[str]]:
 		"""
         Searches for photos based on various optional filters and sorting options.
 
+        The description is matched against the `search_vector` full-text document (description
+        and tag names) and, through the `pg_trgm` index, as a partial or fuzzy match of the
+        description itself. Results are paginated with a keyset cursor over `(sort key, id)`, so fetching a deep
+        page costs the same as fetching the first one.
+
         Args:
             db (AsyncSession): The database session object for asynchronous database operations.
-            description (Optional[str]): The description to filter photos by (partial match).
+            description (Optional[str]): The search query to filter photos by (full-text, partial or fuzzy match).
             tag (Optional[str]): The tag to filter photos by.
             username (Optional[str]): The username to filter photos by.
             sort_by (SortBy): The field to sort the results by (default is SortBy.date).
             order (Order): The order to sort the results in (default is Order.asc).
+            cursor (Optional[str]): The `next_cursor` of the previous page, or None for the first page.
+            limit (int): The maximum number of photos to return (default is 20).
 
         Returns:
-            List[Photo]: A list of photos matching the search criteria.
+            Tuple[List[Photo], Optional[str]]: The photos matching the search criteria and the cursor
+            of the next page, or None if this is the last page.
 
         Raises:
-            HTTPException: If an error occurs during the search (500).
+            HTTPException: If the cursor is invalid or relevance sorting is requested without
+            a description (400), or if an error occurs during the search (500).
         """
+		if sort_by == SortBy.relevance and not description:
+			raise HTTPException(status_code=400, detail="Sorting by relevance requires a description.")
 		try:
-			query = select(Photo).options(
-				selectinload(Photo.tags),
-				selectinload(Photo.transformed_images)
-			)
+			query = select(Photo).options(*PHOTO_RESPONSE)
 
 			if description:
-				query = query.filter(Photo.description.ilike(f"%{description}%"))
+				ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, description)
+				query = query.filter(or_(
+					Photo.search_vector.op("@@")(ts_query),
+					Photo.description.ilike(f"%{description}%"),
+					Photo.description.op("%>")(description)
+				))
 			if tag:
 				tag_lower = tag.lower()
-				query = query.join(Photo.tags).filter(func.lower(Tag.name) == tag_lower)
+				query = query.filter(Photo.tags.any(func.lower(Tag.name) == tag_lower))
 			if username:
 				query = query.join(User).filter(User.username == username)
 
 			sort_order = desc if order == Order.desc else asc
+			after = operator.lt if order == Order.desc else operator.gt
 
 			if sort_by == SortBy.rating:
-				avg_rating = func.coalesce(func.avg(Rating.rating), 0)
-				query = query.outerjoin(Photo.ratings).group_by(Photo.id).order_by(sort_order(avg_rating))
+				sort_key = Photo.rating_average
+				query = query.add_columns(sort_key)
+				if cursor:
+					rating, photo_id = decode_cursor(cursor, sort_by.value, order.value, float, UUID)
+					query = query.filter(after(tuple_(sort_key, Photo.id), tuple_(rating, photo_id)))
+			elif sort_by == SortBy.relevance:
+				sort_key = (
+					func.ts_rank_cd(Photo.search_vector, ts_query)
+					+ func.word_similarity(description, func.coalesce(Photo.description, ""))
+				)
+				query = query.add_columns(sort_key)
+				if cursor:
+					rank, photo_id = decode_cursor(cursor, sort_by.value, order.value, float, UUID)
+					query = query.filter(after(tuple_(sort_key, Photo.id), tuple_(rank, photo_id)))
 			else:
-				query = query.order_by(sort_order(Photo.created_at))
+				sort_key = Photo.created_at
+				query = query.add_columns(sort_key)
+				if cursor:
+					created_at, photo_id = decode_cursor(cursor, sort_by.value, order.value, datetime.fromisoformat, UUID)
+					query = query.filter(after(tuple_(sort_key, Photo.id), tuple_(created_at, photo_id)))
+
+			query = query.order_by(sort_order(sort_key), sort_order(Photo.id)).limit(limit + 1)
 
 			result = await db.execute(query)
-			photos = result.scalars().all()
-			return photos
+			rows = result.all()
+
+			next_cursor = None
+			if len(rows) > limit:
+				rows = rows[:limit]
+				last_photo, last_key = rows[-1]
+				next_cursor = encode_cursor(sort_by.value, order.value, last_key, last_photo.id)
+			photos = [photo for photo, _ in rows]
+			await attach_latest_comments(db, photos)
+			return photos, next_cursor
 		except IntegrityError:
 			await db.rollback()
 			raise HTTPException(status_code=500, detail="Error searching for photos.")
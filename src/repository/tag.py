@@ -1,60 +1,63 @@
+from typing import Iterable
+from uuid import uuid4
+
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.future import select
 from src.entity.models import Tag
 
+MAX_TAGS_PER_PHOTO = 5
+
 
 class TagRepository:
 
     @staticmethod
-    async def get_tag(db: AsyncSession, tag_name: str) -> Tag:
+    def normalize(tag_names: Iterable[str]) -> list[str]:
         """
-        Retrieves a tag by its name from the database.
+        Normalizes tag names: strips whitespace, lowercases, drops empty names and duplicates.
 
         Args:
-            db (AsyncSession): The database session object for asynchronous database operations.
-            tag_name (str): The name of the tag to retrieve.
+            tag_names (Iterable[str]): The raw tag names.
 
         Returns:
-            Tag: The tag object if found.
-
-        Raises:
-            Exception: If an error occurs during the retrieval.
+            list[str]: The normalized names, in order of first appearance.
         """
-        try:
-            result = await db.execute(
-				select(Tag).filter(Tag.name == tag_name)
-			)
-            tag = result.scalars().first()
-            if tag:
-                return tag
-
-        except IntegrityError:
-            await db.rollback()
-            raise Exception(f"Could not create or retrieve tag: {tag_name}")
+        names = (tag_name.strip().lower() for tag_name in tag_names)
+        return list(dict.fromkeys(name for name in names if name))
 
     @staticmethod
-    async def create_tag(db: AsyncSession, tag_name: str) -> Tag:
+    async def get_or_create_many(db: AsyncSession, tag_names: Iterable[str]) -> list[Tag]:
         """
-        Creates a new tag in the database.
+        Resolves tag names to tags, creating the missing ones.
+
+        All names are inserted with a single `INSERT ... ON CONFLICT DO NOTHING RETURNING`,
+        and the names that already existed are read back with a single SELECT. A tag created
+        concurrently by another transaction is picked up by that SELECT instead of failing
+        on the unique constraint. Names are inserted in sorted order, so two transactions
+        creating the same new tags wait on each other's unique index entries in the same order
+        instead of deadlocking. Nothing is committed; the new tags become visible together
+        with whatever the caller commits.
 
         Args:
             db (AsyncSession): The database session object for asynchronous database operations.
-            tag_name (str): The name of the tag to create.
+            tag_names (Iterable[str]): The tag names, normalized with `TagRepository.normalize`.
 
         Returns:
-            Tag: The newly created tag object.
-
-        Raises:
-            Exception: If an error occurs during the creation.
+            list[Tag]: The tags, in the order of the normalized names.
         """
-        try:
-            new_tag = Tag(name=tag_name)
-            db.add(new_tag)
-            await db.commit()
-            await db.refresh(new_tag)
-            return new_tag
-
-        except IntegrityError:
-            await db.rollback()
-            raise Exception(f"Could not create or retrieve tag: {tag_name}")
+        names = TagRepository.normalize(tag_names)
+        if not names:
+            return []
+
+        result = await db.scalars(
+            insert(Tag).on_conflict_do_nothing(index_elements=[Tag.name]).returning(Tag),
+            [{"id": uuid4(), "name": name} for name in sorted(names)],
+        )
+        tags = {tag.name: tag for tag in result.all()}
+
+        existing_names = [name for name in names if name not in tags]
+        if existing_names:
+            result = await db.scalars(select(Tag).filter(Tag.name.in_(existing_names)))
+            tags.update({tag.name: tag for tag in result.all()})
+
+        return [tags[name] for name in names]
@@ -5,13 +5,20 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.configuration.settings import config
 from src.database.db import get_db
 from src.entity.models import Role, User
-from src.schemas.user import UserDetail, UserSchema
+from src.schemas.user import UserDetail, UserPrincipal, UserSchema
 from src.services.auth import auth_service
+from src.services.cache import TTLCache
 
 security = HTTPBearer()
 
+# Principals of recently authenticated users, keyed by email (the `sub` of the token).
+principal_cache = TTLCache(
+    maxsize=config.PRINCIPAL_CACHE_SIZE, ttl=config.PRINCIPAL_CACHE_TTL
+)
+
 
 class UserRepository:
 
@@ -64,7 +71,7 @@ class UserRepository:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT, detail="Account already exists"
             )
-        body.password = auth_service.get_password_hash(body.password)
+        body.password = await auth_service.get_password_hash(body.password)
         new_user = User(**body.model_dump())
         if role:
             new_user.role = role
@@ -92,7 +99,7 @@ class UserRepository:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email"
             )
-        if not auth_service.verify_password(body.password, user.password):
+        if not await auth_service.verify_password(body.password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password"
             )
@@ -126,35 +133,48 @@ class UserRepository:
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        principal_cache.invalidate(user.email)
         return user
 
     @staticmethod
     async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security),
         db: AsyncSession = Depends(get_db),
-    ):
+    ) -> UserPrincipal:
         """
         Retrieves the current authenticated user based on the provided credentials.
 
+        The principal (id, email, role) is cached in-process for `PRINCIPAL_CACHE_TTL` seconds,
+        so on a warm cache the users table is not queried at all. `change_role` invalidates
+        the entry of the user it changes.
+
         Args:
             credentials (HTTPAuthorizationCredentials): The authorization credentials.
             db (AsyncSession): The database session object for asynchronous database operations.
 
         Returns:
-            User: The current authenticated user.
+            UserPrincipal: The current authenticated user.
 
         Raises:
             HTTPException: If the user is not found or unauthorized.
         """
         token = credentials.credentials
         email = auth_service.get_current_user_with_token(token)
-        user = await db.execute(select(User).where(User.email == email))
-        user = user.scalar_one_or_none()
+        principal = principal_cache.get(email)
+        if principal is not None:
+            return principal
+
+        user = await db.execute(
+            select(User.id, User.email, User.role).where(User.email == email)
+        )
+        user = user.one_or_none()
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
             )
-        return user
+        principal = UserPrincipal.model_validate(user)
+        principal_cache.set(email, principal)
+        return principal
 
 
 user_repository = UserRepository()
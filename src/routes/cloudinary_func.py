@@ -4,10 +4,12 @@ from uuid import UUID
 
 
 from src.schemas.cloudinary_func import TransformImageRequest
+from src.schemas.user import UserPrincipal
 from src.repository.cloudinary_func import CloudinaryRepository
 from src.database.db import get_db
-from src.entity.models import Role, User
+from src.entity.models import Role
 from src.repository.user import UserRepository
+from src.repository.loading import PHOTO_TAGS
 from src.repository.photo import photo_repository
 
 router = APIRouter(prefix="/transform-image", tags=["transform-image"])
@@ -18,16 +20,19 @@ async def transform_image(
 		photo_id: UUID,
 		request: TransformImageRequest,
 		db: AsyncSession = Depends(get_db),
-		current_user: User = Depends(UserRepository.get_current_user)
+		current_user: UserPrincipal = Depends(UserRepository.get_current_user)
 ):
     """
     Transforms an image with specified transformations.
 
+    By default only a signed Cloudinary URL of the transformed image is built, which takes no
+    call to Cloudinary. With `materialize` the transformed image is uploaded as a new photo.
+
     Args:
         photo_id (UUID): The ID of the photo to transform.
-        request (TransformImageRequest): The request body containing transformation details and description.
+        request (TransformImageRequest): The request body containing transformation details and, for a materialized copy, description and optional tags.
         db (AsyncSession, optional): The database session object for asynchronous database operations. Defaults to Depends(get_db).
-        current_user (User, optional): The current authenticated user. Defaults to Depends(UserRepository.get_current_user).
+        current_user (UserPrincipal, optional): The current authenticated user. Defaults to Depends(UserRepository.get_current_user).
 
     Returns:
         dict: A dictionary containing the URL of the transformed image.
@@ -39,7 +44,9 @@ async def transform_image(
             - 500: If there is an internal server error.
     """
     try:
-        photo = await photo_repository.get_photo_by_id_or_404(photo_id, db)
+        photo = await photo_repository.get_photo_by_id_or_404(
+            photo_id, db, profile=PHOTO_TAGS
+        )
 
         if (
             current_user.id != photo.user_id
@@ -50,13 +57,17 @@ async def transform_image(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Not autorized"
             )
         transformed_url = await CloudinaryRepository.transform_image(
-            photo_id=photo_id,
+            photo=photo,
             transformations=request.transformations,
             description=request.description,
             db=db,
             user=current_user,
+            tags=request.tags,
+            materialize=request.materialize,
         )
 
         return {"transformed_url": transformed_url}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,15 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from src.database.db import get_db
-from src.schemas.coment import CommentCreate, CommentUpdate, CommentResponse
+from src.database.db import get_db, get_read_db
+from src.schemas.coment import CommentCreate, CommentPage, CommentUpdate, CommentResponse
+from src.schemas.user import UserPrincipal
 from src.repository.comment import CommentRepository
-from src.entity.models import Role, User
+from src.repository.photo import photo_repository
+from src.entity.models import Role
+from src.services import http_cache
 from src.services.decorators import roles_required
 from src.repository.user import UserRepository
 
-router = APIRouter(prefix="/comments", tags=["comments"])
+router = APIRouter(
+	prefix="/comments",
+	tags=["comments"],
+	dependencies=[Depends(http_cache.cache_control(http_cache.REVALIDATE))],
+)
 
 
 @router.post("/", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
@@ -17,7 +24,7 @@ async def create_comment(
 		comment_create: CommentCreate,
 		photo_id: UUID,
 		db: AsyncSession = Depends(get_db),
-		current_user: User = Depends(UserRepository.get_current_user)
+		current_user: UserPrincipal = Depends(UserRepository.get_current_user)
 ) -> CommentResponse:
 	"""
     Create a new comment on a specific photo.
@@ -30,7 +37,7 @@ async def create_comment(
     **Dependencies:**
 
     - `db` (AsyncSession): The database session for async operations.
-    - `current_user` (User): The currently authenticated user.
+    - `current_user` (UserPrincipal): The currently authenticated user.
 
     **Responses:**
 
@@ -51,11 +58,15 @@ async def create_comment(
 @router.get("/{comment_id}", response_model=CommentResponse)
 async def read_comment(
 		comment_id: UUID,
+		request: Request,
+		response: Response,
 		db: AsyncSession = Depends(get_db)
-) -> CommentResponse:
+) -> CommentResponse | Response:
 	"""
     Retrieve a specific comment by its ID.
 
+    The response carries an `ETag` and `Last-Modified` derived from the comment's `updated_at`.
+
     **Request Parameters:**
 
     - `comment_id` (UUID): The ID of the comment to retrieve.
@@ -67,6 +78,7 @@ async def read_comment(
     **Responses:**
 
     - **200 OK**: The requested comment.
+    - **304 Not Modified**: If the client's copy is still current.
 
     **Raises:**
 
@@ -76,6 +88,11 @@ async def read_comment(
 	comment = await CommentRepository.get_comment_by_id(db, comment_id)
 	if not comment:
 		raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+	not_modified = http_cache.conditional(
+		request, response, http_cache.make_etag("comment", comment.id, comment.updated_at), comment.updated_at
+	)
+	if not_modified:
+		return not_modified
 	return CommentResponse.model_validate(comment)
 
 
@@ -84,7 +101,7 @@ async def update_comment(
 		comment_id: UUID,
 		comment_update: CommentUpdate,
 		db: AsyncSession = Depends(get_db),
-		current_user: User = Depends(UserRepository.get_current_user)
+		current_user: UserPrincipal = Depends(UserRepository.get_current_user)
 ) -> CommentResponse:
 	"""
     Update an existing comment.
@@ -97,7 +114,7 @@ async def update_comment(
     **Dependencies:**
 
     - `db` (AsyncSession): The database session for async operations.
-    - `current_user` (User): The currently authenticated user.
+    - `current_user` (UserPrincipal): The currently authenticated user.
 
     **Responses:**
 
@@ -126,7 +143,7 @@ async def update_comment(
 async def delete_comment(
 		comment_id: UUID,
 		db: AsyncSession = Depends(get_db),
-		current_user: User = Depends(UserRepository.get_current_user)
+		current_user: UserPrincipal = Depends(UserRepository.get_current_user)
 ) -> None:
 	"""
     Delete a specific comment.
@@ -138,7 +155,7 @@ async def delete_comment(
     **Dependencies:**
 
     - `db` (AsyncSession): The database session for async operations.
-    - `current_user` (User): The currently authenticated user.
+    - `current_user` (UserPrincipal): The currently authenticated user.
 
     **Responses:**
 
@@ -159,26 +176,47 @@ async def delete_comment(
 		raise e
 
 
-@router.get("/photos/{photo_id}", response_model=list[CommentResponse])
+@router.get("/photos/{photo_id}", response_model=CommentPage)
 async def get_comments_by_photo(
 		photo_id: UUID,
-		db: AsyncSession = Depends(get_db)
-) -> list[CommentResponse]:
+		request: Request,
+		response: Response,
+		cursor: str | None = None,
+		limit: int = Query(20, ge=1, le=100),
+		db: AsyncSession = Depends(get_read_db)
+) -> CommentPage | Response:
 	"""
-    Retrieve all comments associated with a specific photo.
+    Retrieve a page of the comments of a specific photo, newest first.
+
+    Every comment write moves the photo's `updated_at` forward, so the `ETag` and
+    `Last-Modified` of a page come from that single column and a 304 needs no comment query.
 
     **Request Parameters:**
 
     - `photo_id` (UUID): The ID of the photo to retrieve comments for.
+    - `cursor` (str, optional): The `next_cursor` of the previous page. Omit it to get the first page.
+    - `limit` (int, optional): The maximum number of comments to return, from 1 to 100. Defaults to `20`.
 
     **Dependencies:**
 
-    - `db` (AsyncSession): The database session for async operations.
+    - `db` (AsyncSession): A read-only database session, served by a replica when one is configured.
 
     **Responses:**
 
-    - **200 OK**: A list of comments for the specified photo.
+    - **200 OK**: A `CommentPage` with the comments and the `next_cursor`, which is `null` on the last page.
+    - **304 Not Modified**: If the client's copy is still current.
+    - **400 Bad Request**: If the cursor is invalid.
+    - **404 Not Found**: If the photo does not exist.
 
     """
-	comments = await CommentRepository.get_comment_by_photo_id(db, photo_id)
-	return [CommentResponse.model_validate(comment) for comment in comments]
+	updated_at = await photo_repository.get_photo_version(photo_id, db)
+	not_modified = http_cache.conditional(
+		request, response, http_cache.make_etag("photo-comments", photo_id, updated_at), updated_at
+	)
+	if not_modified:
+		return not_modified
+	comments, next_cursor = await CommentRepository.get_comments_by_photo_id(db, photo_id, cursor, limit)
+	return CommentPage(
+		items=[CommentResponse.model_validate(comment) for comment in comments],
+		next_cursor=next_cursor,
+	)
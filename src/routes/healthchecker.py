@@ -2,7 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
+from src.configuration.cloudinary import cloudinary_executor
+from src.database.db import get_db, sessionmanager
+from src.entity.models import Role
+from src.repository.user import UserRepository, principal_cache
+from src.schemas.user import UserPrincipal
+from src.services.auth import password_executor
+from src.services.decorators import roles_required
+from src.services.qr import qr_renderer
+from src.services.transformation import transform_backend, transform_executor
 
 
 router = APIRouter(prefix="/healthchecker", tags=["healthchecker"])
@@ -26,3 +34,39 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail="Error connecting to the database")
+
+
+@router.get("/db/pool")
+@roles_required((Role.admin,))
+async def db_pool_stats(current_user: UserPrincipal = Depends(UserRepository.get_current_user)):
+    return sessionmanager.pool_stats()
+
+
+@router.get("/cloudinary")
+@roles_required((Role.admin,))
+async def cloudinary_stats(current_user: UserPrincipal = Depends(UserRepository.get_current_user)):
+    return cloudinary_executor.stats()
+
+
+@router.get("/password-hashing")
+@roles_required((Role.admin,))
+async def password_hashing_stats(current_user: UserPrincipal = Depends(UserRepository.get_current_user)):
+    return password_executor.stats()
+
+
+@router.get("/qr")
+@roles_required((Role.admin,))
+async def qr_stats(current_user: UserPrincipal = Depends(UserRepository.get_current_user)):
+    return qr_renderer.stats()
+
+
+@router.get("/transform")
+@roles_required((Role.admin,))
+async def transform_stats(current_user: UserPrincipal = Depends(UserRepository.get_current_user)):
+    return {"backend": transform_backend.name, "executor": transform_executor.stats()}
+
+
+@router.get("/principal-cache")
+@roles_required((Role.admin,))
+async def principal_cache_stats(current_user: UserPrincipal = Depends(UserRepository.get_current_user)):
+    return principal_cache.stats()
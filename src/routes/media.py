@@ -0,0 +1,114 @@
+import os
+import re
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from src.configuration.settings import config
+from src.services import http_cache
+from src.services.storage import LocalStorage, storage
+from src.services.upload import MEDIA_TYPES, sniff_image_format
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Keys are never reused for different content, so a stored file never changes.
+_IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parses a single-range `Range` header into inclusive byte offsets.
+
+    Returns `None` for a header that is not a valid single byte range, which is then ignored
+    and the whole file is sent; that includes a range ending before it starts, such as
+    `bytes=5-3` (RFC 9110, section 14.1.1). Raises 416 for a range that lies outside the file.
+    """
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # A suffix range: the last N bytes.
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range is outside the file",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+@router.get("/{key:path}")
+async def get_media(key: str, request: Request, response: Response):
+    """
+    Serve a file of the local storage (`STORAGE_BACKEND=local`).
+
+    The file is memory-mapped and streamed in `STORAGE_LOCAL_CHUNK_SIZE` chunks. A single
+    byte range is honoured with 206 Partial Content, so clients can resume downloads and
+    seek. Responses carry an `ETag` and `Last-Modified` and can be cached indefinitely.
+
+    **Path Parameters:**
+
+    - `key` (str): The storage key of the file, as in the photo's `cloudinary_id`.
+
+    **Headers:**
+
+    - `Range` (optional): A single byte range, e.g. `bytes=0-1023` or `bytes=-1024`.
+    - `If-Range` (optional): The range is only honoured if the file still has this `ETag`.
+
+    **Responses:**
+
+    - **200 OK**: The whole file.
+    - **206 Partial Content**: The requested range, with a `Content-Range` header.
+    - **304 Not Modified**: If the client's copy is still current.
+    - **404 Not Found**: If the file does not exist or the storage is not local.
+    - **416 Range Not Satisfiable**: If the range lies outside the file. An invalid range
+      header is ignored and the whole file is sent.
+
+    """
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File was not found.")
+    path = storage.path(key)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File was not found.")
+
+    request.state.cache_control = _IMMUTABLE
+    response.headers["Cache-Control"] = _IMMUTABLE
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    etag = http_cache.make_etag("media", key, stat.st_size, stat.st_mtime_ns)
+    not_modified = http_cache.conditional(request, response, etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    size = stat.st_size
+    with open(path, "rb") as file:
+        media_type = MEDIA_TYPES.get(sniff_image_format(file.read(12)), "application/octet-stream")
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.headers.get("If-Range", etag) == etag:
+        byte_range = _parse_range(range_header, size)
+    start, end = byte_range or (0, size - 1)
+
+    headers = {name: response.headers[name] for name in ("Cache-Control", "ETag", "Last-Modified")}
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        storage.open_range(key, start, end, config.STORAGE_LOCAL_CHUNK_SIZE),
+        status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        media_type=media_type,
+        headers=headers,
+    )
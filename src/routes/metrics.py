@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Response
+
+from src.services.metrics import registry
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Expose the metrics of this worker process in the Prometheus text format.
+
+    **Metrics:**
+
+    - `http_request_duration_seconds{method, route, status}`: Request latency by route template.
+    - `http_requests_in_flight{method}`: Requests currently being handled.
+    - `db_statement_duration_seconds{database, operation}`: SQL statement latency; its `_count` is the number of statements.
+    - `db_statement_errors_total{database, operation}`: SQL statements that raised an error.
+    - `cloudinary_request_duration_seconds{operation, outcome}`: Latency of Cloudinary calls.
+
+    **Responses:**
+
+    - **200 OK**: The metrics, empty if `METRICS_ENABLED` is off.
+
+    """
+    return Response(content=registry.render(), media_type=registry.CONTENT_TYPE)
@@ -2,74 +2,92 @@ from datetime import datetime
 from typing import Sequence
 from uuid import UUID
 
-import cloudinary
-from cloudinary import uploader as cloudinary_uploader
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.configuration.settings import config
-from src.database.db import get_db
-from src.entity.models import User, Photo, Role
+from src.database.db import get_db, get_read_db
+from src.entity.models import Photo, Role
+from src.repository.loading import COLUMNS_ONLY, PHOTO_DELETE
 from src.repository.photo import photo_repository
 from src.repository.user import UserRepository
-from src.schemas.photo import PhotoUpdate, PhotoResponse
+from src.schemas.photo import PhotoBatchResponse, PhotoPage, PhotoUpdate, PhotoResponse
+from src.schemas.user import UserPrincipal
+from src.services import http_cache
 from src.services.decorators import roles_required
+from src.services.upload import stage_upload
 
-router = APIRouter(prefix="/photo", tags=["photos"])
-cloudinary.config(
-    cloud_name=config.CLOUDINARY_NAME,
-    api_key=config.CLOUDINARY_API_KEY,
-    api_secret=config.CLOUDINARY_API_SECRET,
-    secure=True,
+router = APIRouter(
+    prefix="/photo",
+    tags=["photos"],
+    dependencies=[Depends(http_cache.cache_control(http_cache.REVALIDATE))],
 )
 
 
-@router.get("/", response_model=list[PhotoResponse])
+@router.get("/", response_model=PhotoPage)
 async def get_all_photos(
-    offset: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)
-) -> Sequence[Photo]:
+    cursor: str | None = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+) -> dict:
     """
-    Retrieve a list of photos with pagination.
+    Retrieve a page of photos, newest first.
 
     **Query Parameters:**
 
-    - `offset` (int, optional): The number of photos to skip before starting to collect the result set. Defaults to `0`.
-    - `limit` (int, optional): The maximum number of photos to return. Defaults to `10`.
+    - `cursor` (str, optional): The `next_cursor` of the previous page. Omit it to get the first page.
+    - `limit` (int, optional): The maximum number of photos to return, from 1 to 100. Defaults to `10`.
 
     **Dependencies:**
 
-    - `db` (AsyncSession): The database session for async operations.
+    - `db` (AsyncSession): A read-only database session, served by a replica when one is configured.
 
     **Responses:**
 
-    - **200 OK**: Returns a list of photos. The response model is a list of `PhotoResponse`.
+    - **200 OK**: Returns a `PhotoPage` with the photos and the `next_cursor`, which is `null` on the last page.
+    - **400 Bad Request**: If the cursor is invalid.
 
 
     """
-    return await photo_repository.get_all_photos(offset, limit, db)
+    photos, next_cursor = await photo_repository.get_all_photos(cursor, limit, db)
+    return {"items": photos, "next_cursor": next_cursor}
 
 
 @router.get("/{photo_id}", response_model=PhotoResponse)
 async def get_photo_by_id(
-    photo_id: UUID, db: AsyncSession = Depends(get_db)
-) -> Photo | None:
+    photo_id: UUID,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+) -> Photo | Response:
     """
     Retrieve a photo by its ID.
 
+    The response carries an `ETag` and `Last-Modified` derived from the photo's `updated_at`.
+    A request with a matching `If-None-Match` or `If-Modified-Since` gets a 304 after a single
+    one-column lookup, without loading tags, transformed images and comments.
+
     **Path Parameters:**
 
     - `photo_id` (UUID): The ID of the photo to retrieve.
 
     **Dependencies:**
 
-    - `db` (AsyncSession): The database session for async operations.
+    - `db` (AsyncSession): A read-only database session, served by a replica when one is configured.
 
     **Responses:**
 
     - **200 OK**: Returns the details of the requested photo. The response model is `PhotoResponse`.
+    - **304 Not Modified**: If the client's copy is still current.
     - **404 Not Found**: If the photo with the specified ID is not found.
 
     """
+    updated_at = await photo_repository.get_photo_version(photo_id, db)
+    not_modified = http_cache.conditional(
+        request, response, http_cache.make_etag("photo", photo_id, updated_at), updated_at
+    )
+    if not_modified:
+        return not_modified
     return await photo_repository.get_photo_by_id_or_404(photo_id, db)
 
 
@@ -81,7 +99,7 @@ async def upload_user_photo(
     description: str = Form(None),
     tags: list[str] = Form(None),
     file: UploadFile = File(),
-    current_user: User = Depends(UserRepository.get_current_user),
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> Photo:
     """
@@ -91,29 +109,112 @@ async def upload_user_photo(
 
     - `description` (str, optional): A description for the photo.
     - `tags` (list[str], optional): A list of tags associated with the photo.
-    - `file` (UploadFile, required): The file of the photo to upload.
+    - `file` (UploadFile, required): The file of the photo to upload: JPEG, PNG, GIF or WebP
+      (see `UPLOAD_ALLOWED_FORMATS`), at most `UPLOAD_MAX_SIZE` bytes.
+
+    The whole request body is limited to `UPLOAD_MAX_SIZE` plus `UPLOAD_FORM_OVERHEAD` bytes and
+    cut off with 413 as soon as it crosses that, before the file is spooled in full.
 
     **Dependencies:**
 
-    - `current_user` (User): The currently logged-in user.
+    - `current_user` (UserPrincipal): The currently logged-in user.
     - `db` (AsyncSession): The database session for async operations.
 
     **Responses:**
 
     - **201 Created**: Returns the details of the uploaded photo. The response model is `PhotoResponse`.
+    - **413 Request Entity Too Large**: If the file or the request body is too large.
+    - **415 Unsupported Media Type**: If the file is not an allowed image format.
 
 
     """
+    staged = await stage_upload(file)
     return await photo_repository.save_photo_to_db(
-        file, description, tags, current_user, db
+        staged, description, tags, current_user, db
     )
 
 
+@router.post("/upload/batch", response_model=PhotoBatchResponse)
+@roles_required((Role.admin, Role.user))
+async def upload_user_photos(
+    files: list[UploadFile] = File(),
+    descriptions: list[str] = Form(None),
+    tags: list[str] = Form(None),
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> dict:
+    """
+    Upload many photos in one request.
+
+    Every file is validated like in `POST /photo/upload`. Files that pass are uploaded to
+    Cloudinary in parallel, identical files only once, and all photos are saved in a single
+    transaction. A file that fails does not fail the batch; it is reported next to the others.
+
+    **Form Parameters:**
+
+    - `files` (list[UploadFile], required): The files of the photos, at most `UPLOAD_BATCH_MAX_FILES`.
+    - `descriptions` (list[str], optional): A description per file, in the order of `files`.
+    - `tags` (list[str], optional): Comma-separated tags per file, in the order of `files`.
+
+    The whole request body is limited to `UPLOAD_BATCH_MAX_FILES` times `UPLOAD_MAX_SIZE` plus
+    `UPLOAD_FORM_OVERHEAD` bytes. Each file is only checked against `UPLOAD_MAX_SIZE` after the
+    body has been spooled, so a batch can spool up to that limit before an oversized file is reported.
+
+    **Dependencies:**
+
+    - `current_user` (UserPrincipal): The currently logged-in user.
+    - `db` (AsyncSession): The database session for async operations.
+
+    **Responses:**
+
+    - **200 OK**: Returns a `PhotoBatchResponse` with the saved photo or an `error` per file, in request order.
+    - **413 Request Entity Too Large**: If the request body is too large.
+    - **422 Unprocessable Entity**: If there are more than `UPLOAD_BATCH_MAX_FILES` files,
+      or more descriptions or tags than files.
+
+    """
+    if len(files) > config.UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"You can upload at most {config.UPLOAD_BATCH_MAX_FILES} files at once",
+        )
+    descriptions = descriptions or []
+    tags = tags or []
+    if len(descriptions) > len(files) or len(tags) > len(files):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="There are more descriptions or tags than files",
+        )
+
+    errors: dict[int, str] = {}
+    uploads, indexes = [], []
+    for index, file in enumerate(files):
+        try:
+            staged = await stage_upload(file)
+        except HTTPException as error:
+            errors[index] = error.detail
+            continue
+        description = descriptions[index] if index < len(descriptions) else None
+        file_tags = tags[index] if index < len(tags) else None
+        uploads.append((staged, description or None, file_tags))
+        indexes.append(index)
+
+    results = dict(zip(indexes, await photo_repository.save_photos_to_db(uploads, current_user, db)))
+    for index, error in errors.items():
+        results[index] = (None, error)
+    items = [
+        {"index": index, "filename": file.filename, "photo": results[index][0], "error": results[index][1]}
+        for index, file in enumerate(files)
+    ]
+    failed = sum(1 for item in items if item["error"])
+    return {"items": items, "uploaded": len(items) - failed, "failed": failed}
+
+
 @router.put("/{photo_id}", response_model=PhotoResponse)
 async def update_photo(
     photo_id: UUID,
     body: PhotoUpdate,
-    current_user: User = Depends(UserRepository.get_current_user),
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> Photo:
     """
@@ -131,7 +232,7 @@ async def update_photo(
 
     **Dependencies:**
 
-    - `current_user` (User): The currently logged-in user.
+    - `current_user` (UserPrincipal): The currently logged-in user.
     - `db` (AsyncSession): The database session for async operations.
 
     **Responses:**
@@ -141,7 +242,7 @@ async def update_photo(
     - **404 Not Found**: If the photo with the specified ID is not found.
 
     """
-    photo = await photo_repository.get_photo_by_id_or_404(photo_id, db)
+    photo = await photo_repository.get_photo_by_id_or_404(photo_id, db, profile=COLUMNS_ONLY)
 
     if not current_user.is_admin and current_user.id != photo.user_id:
         raise HTTPException(
@@ -156,7 +257,7 @@ async def update_photo(
 @router.delete("/{photo_id}")
 async def delete_photo(
     photo_id: UUID,
-    current_user: User = Depends(UserRepository.get_current_user),
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -168,7 +269,7 @@ async def delete_photo(
 
     **Dependencies:**
 
-    - `current_user` (User): The currently logged-in user.
+    - `current_user` (UserPrincipal): The currently logged-in user.
     - `db` (AsyncSession): The database session for async operations.
 
     **Responses:**
@@ -178,14 +279,14 @@ async def delete_photo(
     - **404 Not Found**: If the photo with the specified ID is not found.
 
     """
-    photo = await photo_repository.get_photo_by_id_or_404(photo_id, db)
+    photo = await photo_repository.get_photo_by_id_or_404(
+        photo_id, db, profile=PHOTO_DELETE
+    )
 
     if not current_user.is_admin and current_user.id != photo.user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="You cannot do it"
         )
 
-    cloudinary_uploader.destroy(public_id=photo.cloudinary_id)
-
     await photo_repository.delete_photo(photo, db)
     return {"detail": "Photo was deleted successfully."}
@@ -1,21 +1,28 @@
+import json
+from typing import AsyncIterator
 from uuid import UUID
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from src.database.db import get_db
-from fastapi import APIRouter, Depends, HTTPException
+from src.database.db import get_db, get_read_db, sessionmanager
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from src.entity.models import Photo
 from src.repository.qr_code import QrCode
-from src.schemas.qr_code import QrCreateResponse,QrGetResponse
+from src.schemas.qr_code import QrBatchItem, QrBatchRequest, QrBatchResponse, QrCreateResponse, QrFormat, QrGetResponse
+from src.services.qr import qr_renderer, zip_stream
 
 
 router = APIRouter(prefix="/generate_qr", tags=["generate_qr"])
 
 @router.post("/generate_qr/{photo_id}", response_model=QrCreateResponse)
-async def generate_qr(photo_id: UUID, db: AsyncSession = Depends(get_db)) -> str:
+async def generate_qr(photo_id: UUID, request: Request, db: AsyncSession = Depends(get_db)) -> str:
     """
     Generate a QR code for a specific photo.
 
+    The QR image is rendered locally and cached; the photo keeps a single QR record whose
+    `qr_code_url` points to `GET /generate_qr/image/{photo_id}`, so repeated calls are cheap.
+
     **Path Parameters:**
 
     - `photo_id` (UUID): The ID of the photo for which the QR code is to be generated.
@@ -34,12 +41,98 @@ async def generate_qr(photo_id: UUID, db: AsyncSession = Depends(get_db)) -> str
 
 
     """
-    stmt = select(Photo).filter_by(id=photo_id)
-    photo = await db.execute(stmt)
-    photo = photo.scalar_one_or_none()
-    if not photo:
+    photo_url = await db.scalar(select(Photo.url).filter_by(id=photo_id))
+    if photo_url is None:
         raise HTTPException(status_code=404, detail="Photo not found")
-    return await QrCode.generate_qr_code(photo.url, db, photo.id)
+    await qr_renderer.render(photo_url, QrFormat.png)
+    qr_code_url = request.app.url_path_for("get_qr_image", photo_id=str(photo_id))
+    return await QrCode.get_or_create_qr_code(photo_id, qr_code_url, db)
+
+
+@router.post(
+    "/batch",
+    response_model=QrBatchResponse,
+    responses={200: {"content": {"application/zip": {}}}},
+)
+async def generate_qr_batch(
+    body: QrBatchRequest, request: Request, db: AsyncSession = Depends(get_db)
+) -> QrBatchResponse | StreamingResponse:
+    """
+    Generate QR codes for many photos at once.
+
+    The photos are loaded with one query and their QR images are rendered in parallel
+    across the render pool. A photo that is missing or fails to render does not fail
+    the batch; it is reported next to the others.
+
+    Both outputs record a QR code for every photo that rendered, as `generate_qr` does for
+    one photo. With `zip` the records are written once the last image is rendered, in a
+    session of their own, since the request's session is closed while the archive streams.
+
+    **Request Body:**
+
+    - `photo_ids` (List[UUID]): The photos, at most `QR_BATCH_MAX_SIZE`. Duplicates are ignored.
+    - `format` (QrFormat, optional): `png` or `svg`. Defaults to `png`.
+    - `output` (str, optional): `urls` for a list of image URLs, `zip` for a ZIP archive of the images. Defaults to `urls`.
+
+    **Dependencies:**
+
+    - `db` (AsyncSession): The database session for async operations.
+
+    **Responses:**
+
+    - **200 OK**: With `urls`, a `QrBatchResponse` with a `qr_code_url` or an `error` per photo, in request order.
+      With `zip`, a streamed archive with one `{photo_id}.{format}` file per rendered photo and an
+      `errors.json` mapping the remaining photo IDs to their errors.
+    - **422 Unprocessable Entity**: If the batch is empty or larger than `QR_BATCH_MAX_SIZE`.
+
+    """
+    photo_ids = list(dict.fromkeys(body.photo_ids))
+    result = await db.execute(select(Photo.id, Photo.url).filter(Photo.id.in_(photo_ids)))
+    photo_urls = dict(result.all())
+    errors = {photo_id: "Photo not found" for photo_id in photo_ids if photo_id not in photo_urls}
+    renders = qr_renderer.render_many(photo_urls.items(), body.format)
+
+    if body.output == "zip":
+        return StreamingResponse(
+            zip_stream(_zip_entries(renders, errors, body.format, request)),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="qr-codes.zip"'},
+        )
+
+    async for photo_id, _, error in renders:
+        if error:
+            errors[photo_id] = error
+    qr_codes = await QrCode.get_or_create_qr_codes(
+        _qr_code_urls(request, [photo_id for photo_id in photo_urls if photo_id not in errors]), db
+    )
+    query = "" if body.format is QrFormat.png else f"?format={body.format.value}"
+    return QrBatchResponse(items=[
+        QrBatchItem(photo_id=photo_id, error=errors[photo_id])
+        if photo_id in errors
+        else QrBatchItem(photo_id=photo_id, qr_code_url=qr_codes[photo_id].qr_code_url + query)
+        for photo_id in photo_ids
+    ])
+
+
+def _qr_code_urls(request: Request, photo_ids: list[UUID]) -> dict[UUID, str]:
+    return {photo_id: request.app.url_path_for("get_qr_image", photo_id=str(photo_id)) for photo_id in photo_ids}
+
+
+async def _zip_entries(
+    renders: AsyncIterator, errors: dict[UUID, str], qr_format: QrFormat, request: Request
+) -> AsyncIterator[tuple[str, bytes]]:
+    rendered = []
+    async for photo_id, image, error in renders:
+        if error:
+            errors[photo_id] = error
+        else:
+            rendered.append(photo_id)
+            yield f"{photo_id}.{qr_format.value}", image
+    async with sessionmanager.session() as db:
+        await QrCode.get_or_create_qr_codes(_qr_code_urls(request, rendered), db)
+    if errors:
+        report = {str(photo_id): error for photo_id, error in errors.items()}
+        yield "errors.json", json.dumps(report, indent=2).encode()
 
 
 @router.get("/get_qr/{qr_id}", response_model=QrGetResponse)
@@ -68,3 +161,50 @@ async def get_qr(qr_id: UUID, db: AsyncSession = Depends(get_db)) -> str:
 
     """
     return await QrCode.get_qr_code(qr_id, db)
+
+
+@router.get("/image/{photo_id}", name="get_qr_image")
+async def get_qr_image(
+    photo_id: UUID,
+    request: Request,
+    format: QrFormat = QrFormat.png,
+    db: AsyncSession = Depends(get_read_db),
+) -> Response:
+    """
+    Serve the QR code image of a photo.
+
+    The image encodes the photo URL and is addressed by a hash of it, which doubles as an
+    immutable `ETag`.
+
+    **Path Parameters:**
+
+    - `photo_id` (UUID): The ID of the photo.
+
+    **Query Parameters:**
+
+    - `format` (QrFormat, optional): `png` or `svg`. Defaults to `png`.
+
+    **Dependencies:**
+
+    - `db` (AsyncSession): A read-only database session, served by a replica when one is configured.
+
+    **Responses:**
+
+    - **200 OK**: The QR image.
+    - **304 Not Modified**: If the client's copy is still current.
+
+    **Raises:**
+
+    - `HTTPException` with status code `404 Not Found` if the photo with the given ID does not exist.
+    - `HTTPException` with status code `503 Service Unavailable` or `504 Gateway Timeout` if rendering is overloaded.
+
+    """
+    photo_url = await db.scalar(select(Photo.url).filter_by(id=photo_id))
+    if photo_url is None:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    etag = f'"{qr_renderer.key(photo_url, format)}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers=headers)
+    _, image = await qr_renderer.render(photo_url, format)
+    return Response(content=image, media_type=format.media_type, headers=headers)
@@ -1,24 +1,30 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from typing import List
 
-from src.database.db import get_db
+from src.database.db import get_db, get_read_db
 from src.repository.rating import RatingRepository
 from src.schemas.rating import RatingCreate, RatingResponse, AverageRatingResponse
-from src.entity.models import Role, User
+from src.schemas.user import UserPrincipal
+from src.entity.models import Role
+from src.services import http_cache
 from src.services.decorators import roles_required
 from src.repository.user import UserRepository
 from src.repository.photo import photo_repository
 
-router = APIRouter(prefix="/rating", tags=["rating"])
+router = APIRouter(
+    prefix="/rating",
+    tags=["rating"],
+    dependencies=[Depends(http_cache.cache_control(http_cache.REVALIDATE))],
+)
 
 
 @router.post("/{photo_id}", response_model=RatingResponse)
 async def create_rating(
     photo_id: UUID,
     rating_data: RatingCreate,
-    current_user: User = Depends(UserRepository.get_current_user),
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> RatingResponse:
     """
@@ -34,7 +40,7 @@ async def create_rating(
 
     **Dependencies:**
 
-    - `current_user` (User): The user creating the rating, obtained from the current session.
+    - `current_user` (UserPrincipal): The user creating the rating, obtained from the current session.
     - `db` (AsyncSession): The database session for async operations.
 
     **Responses:**
@@ -60,29 +66,40 @@ async def create_rating(
 @router.get("/average-rating/{photo_id}", response_model=AverageRatingResponse)
 async def get_average_rating(
     photo_id: UUID,
-    db: AsyncSession = Depends(get_db),
-) -> AverageRatingResponse:
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+) -> AverageRatingResponse | Response:
     """
     Retrieve the average rating for a specific photo.
 
+    Rating writes move the photo's `updated_at` forward, so the `ETag` and `Last-Modified`
+    come from that column and a 304 needs no further query.
+
     **Path Parameters:**
 
     - `photo_id` (UUID): The ID of the photo for which the average rating is to be retrieved.
 
     **Dependencies:**
 
-    - `db` (AsyncSession): The database session for async operations.
+    - `db` (AsyncSession): A read-only database session, served by a replica when one is configured.
 
     **Responses:**
 
     - **200 OK**: Returns an `AverageRatingResponse` containing the average rating of the photo.
+    - **304 Not Modified**: If the client's copy is still current.
 
     **Raises:**
 
     - `HTTPException` with status code `404 Not Found` if the photo with the given ID does not exist.
 
     """
-    await photo_repository.get_photo_by_id_or_404(photo_id, db)
+    updated_at = await photo_repository.get_photo_version(photo_id, db)
+    not_modified = http_cache.conditional(
+        request, response, http_cache.make_etag("photo-rating", photo_id, updated_at), updated_at
+    )
+    if not_modified:
+        return not_modified
     avg_rating = await RatingRepository.get_average_rating(db, photo_id)
     avg_rating_rounded = round(avg_rating, 2)
     return AverageRatingResponse(average_rating=avg_rating_rounded)
@@ -93,7 +110,7 @@ async def get_average_rating(
 async def delete_rating(
     rating_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(UserRepository.get_current_user),
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
 ) -> None:
     """
     Delete a rating by its ID.
@@ -104,7 +121,7 @@ async def delete_rating(
 
     **Dependencies:**
 
-    - `current_user` (User): The user requesting the deletion, obtained from the current session.
+    - `current_user` (UserPrincipal): The user requesting the deletion, obtained from the current session.
     - `db` (AsyncSession): The database session for async operations.
 
     **Responses:**
@@ -120,12 +137,16 @@ async def delete_rating(
     await RatingRepository.delete_rating(db, rating_id)
 
 
-@router.get("/{photo_id}", response_model=List[RatingResponse])
+@router.get(
+    "/{photo_id}",
+    response_model=List[RatingResponse],
+    dependencies=[Depends(http_cache.cache_control(http_cache.PRIVATE))],
+)
 @roles_required((Role.admin, Role.moderator))
 async def get_ratings_for_photo(
     photo_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(UserRepository.get_current_user),
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
 ) -> List[RatingResponse]:
     """
     Retrieve all ratings for a specific photo.
@@ -136,7 +157,7 @@ async def get_ratings_for_photo(
 
     **Dependencies:**
 
-    - `current_user` (User): The user requesting the ratings, obtained from the current session.
+    - `current_user` (UserPrincipal): The user requesting the ratings, obtained from the current session.
     - `db` (AsyncSession): The database session for async operations.
 
     **Responses:**
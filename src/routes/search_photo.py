@@ -1,59 +1,74 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.schemas.photo import PhotoResponse, SortBy, Order
+from src.schemas.photo import PhotoPage, PhotoResponse, SortBy, Order
+from src.schemas.user import UserPrincipal
 from src.repository.search_photo import SearchPhotoRepository
-from src.database.db import get_db
-from src.entity.models import Role, User
+from src.database.db import get_read_db
+from src.entity.models import Role
 from src.services.decorators import roles_required
 from src.repository.user import UserRepository
 
 router = APIRouter(prefix='/search_photos', tags=['search_photos'])
 
 
-@router.get("/", response_model=List[PhotoResponse])
+@router.get("/", response_model=PhotoPage)
 async def search_photos(
         description: Optional[str] = None,
         tag: Optional[str] = None,
         username: Optional[str] = None,
         sort_by: SortBy = SortBy.date,
         order: Order = Order.asc,
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(UserRepository.get_current_user),
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_read_db),
+        current_user: UserPrincipal = Depends(UserRepository.get_current_user),
 ):
     """
     Search for photos based on various criteria.
 
     **Query Parameters:**
 
-    - `description` (Optional[str]): A keyword to search in the photo description.
+    - `description` (Optional[str]): A search query, matched against the photo description and tags
+      (full-text, partial and fuzzy matches).
     - `tag` (Optional[str]): A tag to filter photos by.
     - `username` (Optional[str]): A username to filter photos by the owner. This parameter is optional
       and is only required if the current user has an admin or moderator role.
     - `sort_by` (SortBy): The attribute to sort the results by. Defaults to `SortBy.date`.
+      `SortBy.relevance` ranks by how well the photo matches `description` and requires it.
     - `order` (Order): The order of sorting. Defaults to `Order.asc` (ascending). Use `Order.desc` for descending.
+    - `cursor` (Optional[str]): The `next_cursor` of the previous page. Omit it to get the first page.
+    - `limit` (int): The maximum number of photos to return, from 1 to 100. Defaults to `20`.
 
     **Dependencies:**
 
-    - `db` (AsyncSession): The database session for async operations.
-    - `current_user` (User): The user making the request, obtained from the current session.
+    - `db` (AsyncSession): A read-only database session, served by a replica when one is configured.
+    - `current_user` (UserPrincipal): The user making the request, obtained from the current session.
 
     **Responses:**
 
-    - **200 OK**: Returns a list of `PhotoResponse` objects representing the photos matching the search criteria.
+    - **200 OK**: Returns a `PhotoPage` with the photos matching the search criteria and the `next_cursor`,
+      which is `null` on the last page.
 
     **Raises:**
 
+    - `HTTPException` with status code `400 Bad Request` if the cursor is invalid or if sorting by
+      relevance without a `description`.
     - `HTTPException` with status code `403 Forbidden` if the user is not authorized to perform the search.
     
 
     """
-    photos = await SearchPhotoRepository.search_photos(
+    photos, next_cursor = await SearchPhotoRepository.search_photos(
         db=db,
         description=description,
         tag=tag,
         username=username if current_user.role in ["admin", "moderator"] else None,
         sort_by=sort_by,
-        order=order
+        order=order,
+        cursor=cursor,
+        limit=limit
+    )
+    return PhotoPage(
+        items=[PhotoResponse(**photo.__dict__) for photo in photos],
+        next_cursor=next_cursor
     )
-    return [PhotoResponse(**photo.__dict__) for photo in photos]
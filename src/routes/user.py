@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.entity.models import Role
 from src.services.decorators import roles_required
 from src.database.db import get_db
-from src.schemas.user import UserChangeRole, UserSchema, UserDetail, UserLogin, UserUpdate
+from src.schemas.user import UserChangeRole, UserSchema, UserDetail, UserLogin, UserPrincipal, UserUpdate
 from src.services.auth import auth_service
 from src.repository.user import UserRepository, user_repository
 from src.schemas.auth import TokenSchema
@@ -74,13 +74,17 @@ async def login(body: UserLogin, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserDetail)
-async def user_me(current_user: UserDetail = Depends(UserRepository.get_current_user)):
+async def user_me(
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Get details of the currently logged-in user.
 
     **Dependencies:**
 
-    - `current_user` (UserDetail): The currently logged-in user, obtained from the current session.
+    - `current_user` (UserPrincipal): The currently logged-in user, obtained from the current session.
+    - `db` (AsyncSession): The database session for async operations.
 
     **Responses:**
 
@@ -88,7 +92,7 @@ async def user_me(current_user: UserDetail = Depends(UserRepository.get_current_
 
 
     """
-    return current_user
+    return await user_repository.get_user_by_email(current_user.email, db)
 
 
 @roles_required((Role.admin))
@@ -96,7 +100,7 @@ async def user_me(current_user: UserDetail = Depends(UserRepository.get_current_
 async def change_role(
     user_id: UUID,
     role:Role,
-    current_user: UserDetail = Depends(UserRepository.get_current_user),
+    current_user: UserPrincipal = Depends(UserRepository.get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -109,7 +113,7 @@ async def change_role(
 
     **Dependencies:**
 
-    - `current_user` (UserDetail): The currently logged-in user, obtained from the current session.
+    - `current_user` (UserPrincipal): The currently logged-in user, obtained from the current session.
     - `db` (AsyncSession): The database session for async operations.
 
     **Responses:**
@@ -25,4 +25,6 @@ class TransformedImageResponse(BaseModel):
 
 class TransformImageRequest(BaseModel):
 	transformations: List[Transformation]
-	description: str
+	description: Optional[str] = Field(None, description="Description of the transformed photo, with materialize")
+	tags: Optional[List[str]] = Field(None, description="Tags of the transformed photo, with materialize; defaults to the tags of the original")
+	materialize: bool = Field(False, description="Upload the transformed image as a new photo instead of only building its URL")
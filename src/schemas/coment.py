@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
@@ -25,3 +27,8 @@ class CommentResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class CommentPage(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
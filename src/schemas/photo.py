@@ -21,13 +21,35 @@ class PhotoResponse(BaseModel):
 	tags: Optional[List[TagResponse]] = None
 	transformed_images: Optional[List[TransformedImageResponse]] = None
 	comments: Optional[List[CommentResponse]] = None
+	comment_count: int = 0
+	rating_count: int = 0
+	rating_average: float = 0.0
 	created_at: datetime
 	updated_at: datetime
 
 
+class PhotoPage(BaseModel):
+	items: List[PhotoResponse]
+	next_cursor: Optional[str] = None
+
+
+class PhotoBatchItem(BaseModel):
+	index: int
+	filename: Optional[str] = None
+	photo: Optional[PhotoResponse] = None
+	error: Optional[str] = None
+
+
+class PhotoBatchResponse(BaseModel):
+	items: List[PhotoBatchItem]
+	uploaded: int
+	failed: int
+
+
 class SortBy(str, Enum):
 	date = 'date'
 	rating = 'rating'
+	relevance = 'relevance'
 
 
 class Order(str, Enum):
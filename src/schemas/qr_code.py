@@ -1,7 +1,20 @@
-from pydantic import BaseModel
+import enum
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
 from uuid import UUID
+from src.configuration.settings import config
 from src.schemas.photo import PhotoResponse
 
+
+class QrFormat(str, enum.Enum):
+    png = "png"
+    svg = "svg"
+
+    @property
+    def media_type(self) -> str:
+        return "image/png" if self is QrFormat.png else "image/svg+xml"
+
 class QrCreateResponse(BaseModel):
     id: UUID
     photo_id: UUID
@@ -9,3 +22,16 @@ class QrCreateResponse(BaseModel):
 
 class QrGetResponse(BaseModel):
     qr_code_url: str
+
+class QrBatchRequest(BaseModel):
+    photo_ids: List[UUID] = Field(..., min_length=1, max_length=config.QR_BATCH_MAX_SIZE)
+    format: QrFormat = QrFormat.png
+    output: Literal["urls", "zip"] = Field("urls", description="A list of image URLs or a ZIP archive of the images")
+
+class QrBatchItem(BaseModel):
+    photo_id: UUID
+    qr_code_url: Optional[str] = None
+    error: Optional[str] = None
+
+class QrBatchResponse(BaseModel):
+    items: List[QrBatchItem]
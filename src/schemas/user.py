@@ -35,3 +35,21 @@ class UserDetail(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UserPrincipal(BaseModel):
+    id: UUID
+    email: EmailStr
+    role: Role
+
+    @property
+    def is_admin(self):
+        return self.role == Role.admin
+
+    @property
+    def is_moderator(self):
+        return self.role == Role.moderator
+
+    class Config:
+        from_attributes = True
+        frozen = True
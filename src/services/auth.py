@@ -6,6 +6,27 @@ from typing import Optional
 from jose import JWTError, jwt
 
 from src.configuration.settings import config
+from src.services.executor import BoundedExecutor, spawn_process_pool
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt is CPU-bound (~250ms per call), so it runs in its own process pool. The queue
+# limit makes a login storm fail fast with 503 instead of starving the rest of the API.
+password_executor = BoundedExecutor(
+    "Password hashing",
+    spawn_process_pool,
+    max_concurrency=config.AUTH_HASH_WORKERS,
+    max_queue=config.AUTH_HASH_MAX_QUEUE,
+    timeout=config.AUTH_HASH_TIMEOUT,
+)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
 
 
 class Auth:
@@ -20,16 +41,18 @@ class Auth:
     - `SECRET_KEY` (str): Secret key used for encoding JWT tokens.
     - `ALGORITHM` (str): Algorithm used for encoding JWT tokens.
     """
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = pwd_context
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
     SECRET_KEY = config.AUTH_SECRET_KEY
     ALGORITHM = config.AUTH_ALGORITHM
 
-    def verify_password(self, plain_password, hashed_password):
+    async def verify_password(self, plain_password, hashed_password):
         """
         Verifies if the plain password matches the hashed password.
 
+        The check runs in `password_executor`, off the event loop.
+
         **Parameters:**
 
         - `plain_password` (str): The plain text password to verify.
@@ -38,13 +61,19 @@ class Auth:
         **Returns:**
 
         - bool: `True` if the passwords match, `False` otherwise.
+
+        **Raises:**
+
+        - HTTPException: 503 if too many hashing requests are queued, 504 if the check times out.
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await password_executor.run(_verify_password, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
+    async def get_password_hash(self, password: str):
         """
         Hashes a plain text password.
 
+        The hash is computed in `password_executor`, off the event loop.
+
         **Parameters:**
 
         - `password` (str): The plain text password to hash.
@@ -52,8 +81,12 @@ class Auth:
         **Returns:**
 
         - str: The hashed password.
+
+        **Raises:**
+
+        - HTTPException: 503 if too many hashing requests are queued, 504 if hashing times out.
         """
-        return self.pwd_context.hash(password)
+        return await password_executor.run(_hash_password, password)
 
     def create_access_token(
         self, data: dict, expires_delta: Optional[float] = None
@@ -0,0 +1,76 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries also expire after a fixed time to live.
+
+    **Attributes:**
+
+    - `maxsize` (int): Maximum number of entries; the least recently used entry is evicted first.
+    - `ttl` (Optional[float]): Seconds an entry stays valid after it was set; `None` keeps entries until they are evicted.
+    - `hits` (int): Number of lookups that found a valid entry.
+    - `misses` (int): Number of lookups that found no entry or an expired one.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float], clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the value cached under `key`, or `default` if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Caches `value` under `key`, evicting the least recently used entries above `maxsize`.
+        """
+        expires_at = math.inf if self.ttl is None else self._clock() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drops the entry cached under `key`, if any.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Returns the cache limits, its current size and the hit/miss counters.
+        """
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,151 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Callable
+
+from fastapi import HTTPException, status
+
+# Worker processes are spawned rather than forked: forking a process that already runs
+# an event loop and thread pools can copy held locks into the child.
+spawn_process_pool = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn"))
+
+
+class BoundedExecutor:
+    """
+    Runs blocking callables outside the event loop with a cap on concurrency, on the number
+    of callers waiting for a slot, and on how long a caller waits for a result.
+
+    A slot is held until the underlying call really finishes, even if the caller has already
+    given up on it, so a backlog of slow calls is visible in `stats()` instead of piling up
+    unbounded inside the pool.
+
+    **Attributes:**
+
+    - `name` (str): Name used in error messages and metrics.
+    - `max_concurrency` (int): Maximum number of calls running at the same time.
+    - `max_queue` (int): Maximum number of callers waiting for a slot; further callers are rejected with 503.
+    - `timeout` (float): Seconds a caller waits for a result before getting a 504.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        executor_factory: Callable[..., Executor],
+        max_concurrency: int,
+        max_queue: int,
+        timeout: float,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor_factory = executor_factory
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._executor_factory(max_workers=self.max_concurrency)
+        return self._executor
+
+    async def run(self, function: Callable, *args, **kwargs):
+        """
+        Runs `function(*args, **kwargs)` in the pool and waits for its result.
+
+        **Parameters:**
+
+        - `function` (Callable): The blocking callable. It must be picklable for a process pool.
+        - `args`, `kwargs`: Arguments passed to the callable.
+
+        **Returns:**
+
+        - The value returned by the callable.
+
+        **Raises:**
+
+        - HTTPException: 503 Service Unavailable if too many callers are already waiting,
+          504 Gateway Timeout if the call does not finish within `timeout`.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"{self.name} is busy, try again later",
+            )
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            future = self.executor.submit(partial(function, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release_threadsafe(loop))
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"{self.name} did not respond in time",
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The event loop is already closed, nobody is left to wait for the slot.
+            pass
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the executor counters.
+
+        **Returns:**
+
+        - dict: Limits, current queue depth and in-flight calls, and cumulative outcome counters.
+        """
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def shutdown(self) -> None:
+        """
+        Shuts the underlying pool down without waiting for running calls.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,112 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+SAFE_METHODS = frozenset({"GET", "HEAD"})
+
+# Cache-Control policies for routers. Representations carry validators, so "no-cache"
+# lets clients and the CDN keep a copy but revalidate it with a cheap 304 round trip.
+REVALIDATE = "public, no-cache"
+PRIVATE = "private, no-cache"
+NO_STORE = "no-store"
+
+
+def cache_control(policy: str):
+    """
+    Builds a router dependency that applies a `Cache-Control` policy to safe requests.
+
+    Unsafe requests get `no-store`. The policy is also kept on `request.state`, so a
+    304 response returned directly by an endpoint carries the same header.
+
+    **Parameters:**
+
+    - `policy` (str): The `Cache-Control` value, e.g. `REVALIDATE`.
+
+    **Returns:**
+
+    - Callable: A dependency to put into the router's `dependencies`.
+    """
+
+    async def apply_policy(request: Request, response: Response) -> None:
+        value = policy if request.method in SAFE_METHODS else NO_STORE
+        request.state.cache_control = value
+        response.headers["Cache-Control"] = value
+
+    return apply_policy
+
+
+def make_etag(*parts) -> str:
+    """
+    Builds a weak ETag from the parts that identify a representation and its version,
+    e.g. `make_etag("photo", photo_id, updated_at)`.
+    """
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps are stored without a time zone, as written by a database running in UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same validator.
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have a resolution of one second.
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def conditional(
+    request: Request, response: Response, etag: str, last_modified: datetime
+) -> Response | None:
+    """
+    Evaluates `If-None-Match` and `If-Modified-Since` against the current validators.
+
+    The validators are set on `response`, so a full response carries them too.
+    `If-None-Match` takes precedence; `If-Modified-Since` is only used without it.
+
+    **Parameters:**
+
+    - `request` (Request): The incoming request.
+    - `response` (Response): The response FastAPI will send if the endpoint returns a body.
+    - `etag` (str): The current ETag, from `make_etag`.
+    - `last_modified` (datetime): The time the representation last changed.
+
+    **Returns:**
+
+    - `Response | None`: A 304 Not Modified response to return as is, or `None` if the
+      client has no current copy and the full representation has to be sent.
+    """
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(_as_utc(last_modified).replace(microsecond=0), usegmt=True),
+    }
+    cache_control_value = getattr(request.state, "cache_control", None)
+    if cache_control_value:
+        headers["Cache-Control"] = cache_control_value
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("If-Modified-Since")
+        fresh = if_modified_since is not None and _not_modified_since(if_modified_since, last_modified)
+
+    if not fresh:
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
@@ -0,0 +1,193 @@
+import io
+import re
+import warnings
+
+import numpy as np
+from PIL import Image, ImageChops, ImageColor, ImageDraw, ImageFilter, ImageOps
+
+# Pillow and NumPy are optional dependencies (`poetry install -E local-transforms`).
+# This module is only imported by the local transform backend and its worker processes.
+
+# Where the kept region sits for `gravity`, as (x, y) fractions of the image.
+# Detection-based gravities such as `face` or `auto` fall back to the center.
+_CENTERING = {
+    "center": (0.5, 0.5),
+    "north": (0.5, 0.0),
+    "south": (0.5, 1.0),
+    "east": (1.0, 0.5),
+    "west": (0.0, 0.5),
+    "north_east": (1.0, 0.0),
+    "north_west": (0.0, 0.0),
+    "south_east": (1.0, 1.0),
+    "south_west": (0.0, 1.0),
+}
+
+# ITU-R BT.601 luma and the classic sepia tone matrix, applied to RGB rows.
+_GRAYSCALE = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+_SEPIA = np.array(
+    [
+        [0.393, 0.769, 0.189],
+        [0.349, 0.686, 0.168],
+        [0.272, 0.534, 0.131],
+    ],
+    dtype=np.float32,
+)
+
+_BORDER = re.compile(r"^(\d+)px_solid_(.+)$")
+_JPEG_QUALITY = 90
+
+
+class ImageTooLargeError(ValueError):
+    """
+    Raised when an image has more pixels than Pillow's decompression bomb limit.
+    """
+
+
+def transform(source: bytes, params: dict) -> tuple[bytes, str]:
+    """
+    Applies canonical transformation parameters to an image, the way Cloudinary would.
+
+    The output depends only on `source` and `params`: no metadata, timestamps or encoder
+    defaults that vary between runs end up in it, so the same input always gives the same
+    bytes. Runs in a worker process.
+
+    **Parameters:**
+
+    - `source` (bytes): The original image.
+    - `params` (dict): Parameters from `src.services.transformation.canonicalize`.
+
+    **Returns:**
+
+    - `tuple[bytes, str]`: The encoded image and its format, `jpeg` or `png`. JPEG sources
+      stay JPEG unless the result has transparency; everything else is PNG.
+
+    **Raises:**
+
+    - ImageTooLargeError: If `source` has more pixels than `Image.MAX_IMAGE_PIXELS`.
+    - ValueError: If `source` is not a readable image or a crop mode, effect or border is
+      not supported.
+    """
+    try:
+        with warnings.catch_warnings():
+            # Pillow only warns up to twice the limit; a worker should not decode such an image at all.
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(source)) as opened:
+                source_format = opened.format
+                image = ImageOps.exif_transpose(opened)
+                image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as error:
+        raise ImageTooLargeError(str(error)) from None
+    except OSError as error:
+        # Includes `UnidentifiedImageError` and truncated or corrupt image data.
+        raise ValueError(f"The source is not a readable image: {error}") from None
+
+    image = _resize(image, params.get("width"), params.get("height"), params.get("crop"), params.get("gravity"))
+    if "effect" in params:
+        image = _effect(image, params["effect"])
+    if params.get("radius"):
+        image = _round_corners(image, params["radius"])
+    if params.get("angle"):
+        image = _rotate(image, params["angle"])
+    if "border" in params:
+        image = _border(image, params["border"])
+
+    buffer = io.BytesIO()
+    if source_format == "JPEG" and image.mode == "RGB":
+        image.save(buffer, "JPEG", quality=_JPEG_QUALITY, optimize=False, progressive=False)
+        return buffer.getvalue(), "jpeg"
+    image.save(buffer, "PNG", optimize=False, compress_level=6)
+    return buffer.getvalue(), "png"
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _resize(image: Image.Image, width, height, crop, gravity) -> Image.Image:
+    if width is None and height is None:
+        return image
+    source_width, source_height = image.size
+    # A single dimension keeps the aspect ratio.
+    if width is None:
+        width = max(1, round(source_width * height / source_height))
+    if height is None:
+        height = max(1, round(source_height * width / source_width))
+    size = (width, height)
+    centering = _CENTERING.get(gravity or "center", _CENTERING["center"])
+
+    crop = crop or "scale"
+    if crop == "scale":
+        return image.resize(size, Image.Resampling.LANCZOS)
+    if crop in ("fill", "lfill", "thumb"):
+        return ImageOps.fit(image, size, Image.Resampling.LANCZOS, centering=centering)
+    if crop == "fit":
+        return ImageOps.contain(image, size, Image.Resampling.LANCZOS)
+    if crop == "limit":
+        if source_width <= width and source_height <= height:
+            return image
+        return ImageOps.contain(image, size, Image.Resampling.LANCZOS)
+    if crop == "pad":
+        color = (0, 0, 0, 0) if image.mode == "RGBA" else (255, 255, 255)
+        return ImageOps.pad(image, size, Image.Resampling.LANCZOS, color=color, centering=centering)
+    if crop == "crop":
+        width, height = min(width, source_width), min(height, source_height)
+        left = round((source_width - width) * centering[0])
+        top = round((source_height - height) * centering[1])
+        return image.crop((left, top, left + width, top + height))
+    raise ValueError(f"Unsupported crop mode: {crop}")
+
+
+def _effect(image: Image.Image, effect: str) -> Image.Image:
+    name, _, value = effect.partition(":")
+    if name in ("blur", "sharpen"):
+        if name == "blur":
+            return image.filter(ImageFilter.GaussianBlur(int(value or 100) / 20))
+        return image.filter(ImageFilter.SHARPEN)
+
+    alpha = image.getchannel("A") if image.mode == "RGBA" else None
+    pixels = np.asarray(image.convert("RGB"), dtype=np.float32)
+    if name in ("grayscale", "greyscale"):
+        luma = pixels @ _GRAYSCALE
+        pixels = np.repeat(luma[..., np.newaxis], 3, axis=2)
+    elif name == "sepia":
+        level = min(max(int(value or 100), 0), 100) / 100
+        pixels = pixels + (pixels @ _SEPIA.T - pixels) * level
+    elif name == "negate":
+        pixels = 255 - pixels
+    else:
+        raise ValueError(f"Unsupported effect: {effect}")
+
+    result = Image.fromarray(np.clip(np.rint(pixels), 0, 255).astype(np.uint8), "RGB")
+    if alpha is not None:
+        result.putalpha(alpha)
+    return result
+
+
+def _round_corners(image: Image.Image, radius: int) -> Image.Image:
+    mask = Image.new("L", image.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, image.width - 1, image.height - 1), radius=radius, fill=255)
+    image = image.convert("RGBA")
+    image.putalpha(ImageChops.multiply(image.getchannel("A"), mask))
+    return image
+
+
+def _rotate(image: Image.Image, angle: int) -> Image.Image:
+    # Cloudinary rotates clockwise, Pillow counterclockwise.
+    angle %= 360
+    exact = {90: Image.Transpose.ROTATE_270, 180: Image.Transpose.ROTATE_180, 270: Image.Transpose.ROTATE_90}
+    if angle in exact:
+        return image.transpose(exact[angle])
+    return image.convert("RGBA").rotate(
+        -angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=(0, 0, 0, 0)
+    )
+
+
+def _border(image: Image.Image, border: str) -> Image.Image:
+    match = _BORDER.match(border)
+    if not match:
+        raise ValueError(f"Unsupported border: {border}, expected e.g. 5px_solid_red")
+    width, color = int(match.group(1)), match.group(2)
+    if color.startswith("rgb:"):
+        color = "#" + color.removeprefix("rgb:")
+    fill = ImageColor.getcolor(color, image.mode)
+    return ImageOps.expand(image, border=width, fill=fill)
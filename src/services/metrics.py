@@ -0,0 +1,277 @@
+import bisect
+import time
+from typing import Sequence
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observed values, typically latencies in seconds.
+
+    **Attributes:**
+
+    - `buckets` (tuple[float, ...]): Sorted upper bounds of the buckets; values above the last one land in `+Inf`.
+    - `count` (int): Number of observed values.
+    - `sum` (float): Sum of observed values.
+    - `max` (float): Largest observed value.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> dict:
+        """
+        Returns the cumulative bucket counts together with count, sum and max.
+
+        **Returns:**
+
+        - dict: `buckets` maps each upper bound (and `+Inf`) to the number of values less than or equal to it.
+        """
+        cumulative = {}
+        total = 0
+        for bound, bucket_count in zip((*map(str, self.buckets), "+Inf"), self._counts):
+            total += bucket_count
+            cumulative[bound] = total
+        return {
+            "buckets": cumulative,
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+        }
+
+
+class Counter:
+    """
+    Monotonically increasing count.
+    """
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """
+    Value that goes up and down, e.g. the number of requests in flight.
+    """
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class MetricFamily:
+    """
+    A named metric with one child `Counter`, `Gauge` or `Histogram` per combination of label values.
+
+    Children are created on first use and kept for the lifetime of the process, so label
+    values must come from a small, fixed set (route templates, not raw paths).
+
+    **Attributes:**
+
+    - `name` (str): Metric name, e.g. `http_request_duration_seconds`.
+    - `documentation` (str): The `# HELP` text.
+    - `kind` (str): `counter`, `gauge` or `histogram`.
+    - `labelnames` (tuple[str, ...]): Names of the labels, in the order `labels()` takes their values.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str], factory):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: dict[tuple, object] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._factory()
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {child.value}")
+                continue
+            snapshot = child.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                labels = _format_labels((*self.labelnames, "le"), (*values, bound))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {snapshot['sum']}")
+            lines.append(f"{self.name}_count{labels} {snapshot['count']}")
+        return lines
+
+
+class Registry:
+    """
+    The metric families of the process, rendered together in the Prometheus text format.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.families: list[MetricFamily] = []
+
+    def _add(self, family: MetricFamily) -> MetricFamily:
+        self.families.append(family)
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._add(MetricFamily(name, documentation, "counter", labelnames, Counter))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._add(MetricFamily(name, documentation, "gauge", labelnames, Gauge))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> MetricFamily:
+        return self._add(MetricFamily(name, documentation, "histogram", labelnames, lambda: Histogram(buckets)))
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Metrics are kept per worker process; with several uvicorn workers each one reports its own.
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled.", ("method",)
+)
+db_statement_duration = registry.histogram(
+    "db_statement_duration_seconds",
+    "Execution time of SQL statements, by database and statement type.",
+    ("database", "operation"),
+)
+db_statement_errors = registry.counter(
+    "db_statement_errors_total", "SQL statements that raised an error.", ("database", "operation")
+)
+cloudinary_request_duration = registry.histogram(
+    "cloudinary_request_duration_seconds",
+    "Duration of calls to Cloudinary, including the wait for a free executor slot.",
+    ("operation", "outcome"),
+)
+
+_OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE"})
+
+
+def _operation(statement: str) -> str:
+    # The leading keyword only: the statement text itself would be an unbounded label.
+    keyword = statement.lstrip()[:6].upper()
+    if keyword in _OPERATIONS:
+        return keyword
+    return "WITH" if keyword.startswith("WITH") else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, database: str) -> None:
+    """
+    Records the latency and errors of every statement `engine` executes in
+    `db_statement_duration` and `db_statement_errors`.
+
+    **Parameters:**
+
+    - `engine` (AsyncEngine): The engine to instrument.
+    - `database` (str): The `database` label, e.g. `primary` or `replica`.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.metrics_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_statement_duration.labels(database, _operation(statement)).observe(
+            time.perf_counter() - context.metrics_start
+        )
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        statement = exception_context.statement or ""
+        db_statement_errors.labels(database, _operation(statement)).inc()
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request by method, route template and status code,
+    and the number of requests in flight.
+
+    The route template (e.g. `/photo/{photo_id}`) is read from the scope after routing, so
+    requests for different IDs share one series; requests that match no route are labelled
+    `unmatched`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def recording_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = http_requests_in_flight.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            in_flight.dec()
+            route = scope.get("route")
+            http_request_duration.labels(
+                method, route.path if route is not None else "unmatched", str(status_code)
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(sort: str, order: str, *values) -> str:
+    """
+    Encodes the sort key of the last row of a page into an opaque cursor.
+
+    **Parameters:**
+
+    - `sort` (str): The name of the ordering the cursor belongs to (e.g. `date`, `rating`).
+    - `order` (str): The direction of that ordering, `asc` or `desc`.
+    - `values`: The values of the ordering columns of the last row, most significant first.
+
+    **Returns:**
+
+    - str: A URL-safe cursor string.
+    """
+    payload = json.dumps({"s": sort, "o": order, "v": [str(value) for value in values]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str, *types) -> list:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    **Parameters:**
+
+    - `cursor` (str): The cursor received from the client.
+    - `sort` (str): The ordering of the current request; a cursor issued for another ordering is rejected.
+    - `order` (str): The direction of the current request; a cursor issued for the other direction
+      would resume at the wrong row, so it is rejected too.
+    - `types`: One converter per encoded value (e.g. `datetime.fromisoformat`, `UUID`).
+
+    **Returns:**
+
+    - list: The converted values of the ordering columns, in the order they were encoded.
+
+    **Raises:**
+
+    - HTTPException: 400 Bad Request if the cursor is malformed or belongs to another ordering or direction.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["v"]
+        if payload["s"] == sort and payload["o"] == order and len(values) == len(types):
+            return [convert(value) for convert, value in zip(types, values)]
+    except (binascii.Error, ArithmeticError, ValueError, KeyError, TypeError):
+        pass
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
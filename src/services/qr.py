@@ -0,0 +1,306 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from typing import AsyncIterator, Hashable, Iterable
+
+import qrcode
+import qrcode.image.pure
+import qrcode.image.svg
+
+from fastapi import HTTPException
+
+from src.configuration.settings import config
+from src.schemas.qr_code import QrFormat
+from src.services.cache import TTLCache
+from src.services.executor import BoundedExecutor, spawn_process_pool
+
+
+_IMAGE_FACTORIES = {
+    QrFormat.png: qrcode.image.pure.PyPNGImage,
+    QrFormat.svg: qrcode.image.svg.SvgPathImage,
+}
+
+
+def _render(data: str, qr_format: QrFormat) -> bytes:
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+        image_factory=_IMAGE_FACTORIES[qr_format],
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image().save(buffer)
+    return buffer.getvalue()
+
+
+class QrRenderer:
+    """
+    Renders QR codes locally and caches them by content.
+
+    An image is addressed by a hash of its format and encoded data, so the same URL is
+    rendered once: later requests are served from an in-memory LRU, then from files in
+    `cache_dir` that survive eviction and restarts. Concurrent requests for an image that
+    is being rendered wait for that render instead of starting their own.
+
+    The on-disk cache is an LRU as well: a file's modification time is bumped whenever it is
+    read, and once there are more than `disk_max_files` files the least recently used are
+    deleted, down to 90% of the limit so that the directory is not scanned on every write.
+    The cache directory can be shared by several workers; each counts the files it wrote
+    since its last scan, so the limit can be overshot by a few files per worker.
+
+    **Attributes:**
+
+    - `cache_dir` (str): Directory of the on-disk cache.
+    - `disk_max_files` (int): Maximum number of files in `cache_dir`.
+    - `disk_hits` (int): Number of images read back from `cache_dir`.
+    - `disk_evictions` (int): Number of files deleted from `cache_dir` to stay within the limit.
+    - `renders` (int): Number of images rendered.
+    """
+
+    def __init__(self, executor: BoundedExecutor, cache_dir: str, cache_size: int, disk_max_files: int):
+        self._executor = executor
+        self._memory = TTLCache(maxsize=cache_size, ttl=None)
+        self._pending: dict[str, asyncio.Future] = {}
+        self.cache_dir = cache_dir
+        self.disk_max_files = disk_max_files
+        # Files in `cache_dir`, counted on the first write and recounted on every prune.
+        self._disk_files: int | None = None
+        self._disk_lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self.renders = 0
+
+    @staticmethod
+    def key(data: str, qr_format: QrFormat) -> str:
+        """
+        Returns the content address of the QR image for `data` in `qr_format`.
+        """
+        return hashlib.sha256(f"{qr_format.value}:{data}".encode()).hexdigest()
+
+    def _path(self, key: str, qr_format: QrFormat) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{qr_format.value}")
+
+    async def render(self, data: str, qr_format: QrFormat) -> tuple[str, bytes]:
+        """
+        Returns the QR image for `data`, rendering it only if no cache has it.
+
+        **Parameters:**
+
+        - `data` (str): The text to encode, e.g. the photo URL.
+        - `qr_format` (QrFormat): PNG or SVG.
+
+        **Returns:**
+
+        - `tuple[str, bytes]`: The content address of the image and the image itself.
+
+        **Raises:**
+
+        - HTTPException: 503 if the render pool is saturated, 504 if rendering times out.
+        """
+        key = self.key(data, qr_format)
+        image = self._memory.get(key)
+        if image is not None:
+            return key, image
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return key, await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            image = await self._load_or_render(key, data, qr_format)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(image)
+        finally:
+            del self._pending[key]
+
+        self._memory.set(key, image)
+        return key, image
+
+    async def render_many(
+        self, items: Iterable[tuple[Hashable, str]], qr_format: QrFormat
+    ) -> AsyncIterator[tuple[Hashable, bytes | None, str | None]]:
+        """
+        Renders many QR images in parallel and yields them as they are ready.
+
+        At most as many renders as the pool has workers are submitted at a time, so a large
+        batch keeps every core busy without filling the pool queue that single requests use.
+
+        **Parameters:**
+
+        - `items` (Iterable[tuple[Hashable, str]]): Pairs of an identifier and the text to encode.
+        - `qr_format` (QrFormat): PNG or SVG.
+
+        **Returns:**
+
+        - `AsyncIterator[tuple[Hashable, bytes | None, str | None]]`: The identifier with either
+          the image or an error message, in completion order.
+        """
+        slots = asyncio.Semaphore(self._executor.max_concurrency)
+
+        async def render_one(identifier: Hashable, data: str):
+            async with slots:
+                try:
+                    _, image = await self.render(data, qr_format)
+                except HTTPException as error:
+                    return identifier, None, error.detail
+                except Exception as error:
+                    return identifier, None, f"Rendering failed: {error}"
+            return identifier, image, None
+
+        tasks = [asyncio.create_task(render_one(identifier, data)) for identifier, data in items]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _load_or_render(self, key: str, data: str, qr_format: QrFormat) -> bytes:
+        path = self._path(key, qr_format)
+        image = await asyncio.to_thread(self._read, path)
+        if image is not None:
+            self.disk_hits += 1
+            return image
+        image = await self._executor.run(_render, data, qr_format)
+        self.renders += 1
+        await asyncio.to_thread(self._spill, path, image)
+        return image
+
+    @staticmethod
+    def _read(path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as file:
+                image = file.read()
+            # Marks the file as recently used for `_prune`.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return image
+
+    def _spill(self, path: str, image: bytes) -> None:
+        self._write(path, image)
+        with self._disk_lock:
+            if self._disk_files is None:
+                self._disk_files = len(self._cached_files())
+            else:
+                self._disk_files += 1
+            if self._disk_files > self.disk_max_files:
+                self._prune()
+
+    def _cached_files(self) -> list[tuple[float, str]]:
+        # Modification time and path of every cached image; temporary files of writes in
+        # progress are named `tmp...` and are left alone.
+        files = []
+        try:
+            shards = list(os.scandir(self.cache_dir))
+        except FileNotFoundError:
+            return files
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith("tmp"):
+                    continue
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        return files
+
+    def _prune(self) -> None:
+        files = sorted(self._cached_files())
+        excess = max(0, len(files) - self.disk_max_files * 9 // 10)
+        for _, path in files[:excess]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            self.disk_evictions += 1
+        self._disk_files = len(files) - excess
+
+    @staticmethod
+    def _write(path: str, image: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so a reader never sees a partial image.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(image)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "memory": self._memory.stats(),
+            "disk": {
+                "files": self._disk_files,
+                "max_files": self.disk_max_files,
+                "evictions": self.disk_evictions,
+            },
+            "disk_hits": self.disk_hits,
+            "renders": self.renders,
+            "executor": self._executor.stats(),
+        }
+
+
+class _ZipBuffer(io.RawIOBase):
+    # Write-only sink for zipfile; the written bytes are drained after every entry.
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def zip_stream(entries: AsyncIterator[tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """
+    Streams a ZIP archive of `entries` (file name, content) without buffering the archive.
+
+    PNG data is already compressed, so PNG entries are stored as is; others are deflated.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, mode="w") as archive:
+        async for name, content in entries:
+            compression = zipfile.ZIP_STORED if name.endswith(".png") else zipfile.ZIP_DEFLATED
+            archive.writestr(zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0)), content, compress_type=compression)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+qr_executor = BoundedExecutor(
+    "QR rendering",
+    spawn_process_pool,
+    max_concurrency=config.QR_RENDER_WORKERS,
+    max_queue=config.QR_RENDER_MAX_QUEUE,
+    timeout=config.QR_RENDER_TIMEOUT,
+)
+
+qr_renderer = QrRenderer(qr_executor, config.QR_CACHE_DIR, config.QR_CACHE_SIZE, config.QR_CACHE_DISK_MAX_FILES)
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import urllib.request
+from typing import BinaryIO, Iterator, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, status
+
+from src.configuration import cloudinary
+from src.configuration.settings import config
+
+
+def _download(url: str) -> bytes:
+    """
+    Downloads a stored image of at most `UPLOAD_MAX_SIZE` bytes.
+
+    A transformed copy can be larger than the upload it was made from; such an image is
+    rejected with 413 rather than cut short, which would leave an image no decoder can read.
+    """
+    with urllib.request.urlopen(url, timeout=config.CLOUDINARY_TIMEOUT) as response:
+        content = response.read(config.UPLOAD_MAX_SIZE + 1)
+    if len(content) > config.UPLOAD_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Stored image is larger than {config.UPLOAD_MAX_SIZE} bytes",
+        )
+    return content
+
+
+class CloudinaryStorage:
+    """
+    Stores images on Cloudinary. Keys are Cloudinary public IDs.
+    """
+
+    name = "cloudinary"
+
+    async def put(self, file: BinaryIO, key: str) -> str:
+        """
+        Stores `file` under `key` and returns its delivery URL.
+        """
+        response = await cloudinary.upload(file, public_id=key)
+        return response["secure_url"]
+
+    async def get(self, key: str, url: Optional[str] = None) -> bytes:
+        """
+        Downloads the image stored under `key` from `url`, the URL `put` returned for it.
+        """
+        return await cloudinary.call("download", _download, url or self.url(key))
+
+    async def delete(self, key: str) -> None:
+        await cloudinary.destroy(key)
+
+    def url(self, key: str, image_format: Optional[str] = None) -> str:
+        return cloudinary.delivery_url(key, image_format)
+
+    def transform(self, key: str, params: dict, url: Optional[str] = None) -> Optional[str]:
+        """
+        Returns a signed URL that Cloudinary renders the transformation of `key` at, built
+        without calling Cloudinary. `url`, the URL `put` returned for `key`, gives the format.
+        """
+        image_format = cloudinary.url_format(url, key) if url else None
+        return cloudinary.transformed_url(key, params, image_format)
+
+
+class LocalStorage:
+    """
+    Stores images as files in a directory tree on local disk, so the app can run, be
+    benchmarked and serve hot images without Cloudinary.
+
+    A file is named after the SHA-256 of its key and sharded by the first two byte pairs of
+    that hash (`ab/cd/abcd...`), which keeps directories small and makes any key a safe name.
+    Files are written to a temporary file and renamed, so a reader never sees a partial image.
+    They are served by `src.routes.media`, memory-mapped and with range requests.
+
+    **Attributes:**
+
+    - `root` (str): The directory the files are stored in.
+    - `base_url` (str): The URL prefix the files are served at.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    async def put(self, file: BinaryIO, key: str) -> str:
+        """
+        Stores `file` under `key` and returns its URL.
+        """
+        await asyncio.to_thread(self._write, self.path(key), file)
+        return self.url(key)
+
+    async def get(self, key: str, url: Optional[str] = None) -> bytes:
+        return await asyncio.to_thread(self._read, self.path(key))
+
+    async def delete(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(os.unlink, self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key: str, image_format: Optional[str] = None) -> str:
+        return f"{self.base_url}/{quote(key, safe='')}"
+
+    def transform(self, key: str, params: dict, url: Optional[str] = None) -> Optional[str]:
+        # Files are served as stored; transformations are rendered by the local transform backend.
+        return None
+
+    def open_range(self, key: str, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        """
+        Yields the bytes `start` to `end` (inclusive) of the file stored under `key` in chunks.
+
+        The file is memory-mapped, so chunks are sliced straight from the page cache without
+        a read into a Python buffer per request. The generator is synchronous; a streaming
+        response runs it in a worker thread, where page faults do not block the event loop.
+        """
+        with open(self.path(key), "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = start
+            while position <= end:
+                chunk_end = min(position + chunk_size, end + 1)
+                yield mapped[position:chunk_end]
+                position = chunk_end
+
+    @staticmethod
+    def _write(path: str, file: BinaryIO) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as target:
+                shutil.copyfileobj(file, target, config.UPLOAD_CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as file:
+            return file.read()
+
+
+if config.STORAGE_BACKEND == "local":
+    storage = LocalStorage(config.STORAGE_LOCAL_ROOT, config.STORAGE_LOCAL_BASE_URL)
+else:
+    storage = CloudinaryStorage()
@@ -0,0 +1,155 @@
+import hashlib
+import io
+import json
+from typing import Iterable
+
+from fastapi import HTTPException, status
+
+from src.configuration import cloudinary
+from src.configuration.settings import config
+from src.entity.models import Photo
+from src.schemas.cloudinary_func import Transformation
+from src.services.executor import BoundedExecutor, spawn_process_pool
+from src.services.storage import storage
+
+
+# Parameters whose values are keywords. Other strings can hold colours, text or public IDs,
+# which are case-sensitive, so they keep their case.
+_KEYWORD_PARAMS = frozenset({"crop", "gravity"})
+
+
+def _normalize(name: str, value: str) -> str:
+    value = value.strip()
+    if name in _KEYWORD_PARAMS:
+        return value.lower()
+    if name == "effect":
+        # The effect name is a keyword, its argument (e.g. a colour) is not.
+        effect, colon, argument = value.partition(":")
+        return effect.lower() + colon + argument
+    return value
+
+
+def canonicalize(transformations: Iterable[Transformation]) -> dict:
+    """
+    Merges a list of transformations into one set of parameters with a single spelling.
+
+    Later transformations override earlier ones, unset and empty values are dropped, string
+    values are stripped and keywords (crop mode, gravity, effect name) are lowercased, so every
+    way of writing the same transformation gives the same parameters, in sorted order.
+
+    **Parameters:**
+
+    - `transformations` (Iterable[Transformation]): The transformations, in request order.
+
+    **Returns:**
+
+    - `dict`: The merged parameters, sorted by name.
+    """
+    params = {}
+    for transformation in transformations:
+        for name, value in transformation.model_dump(exclude_none=True).items():
+            if isinstance(value, str):
+                value = _normalize(name, value)
+                if not value:
+                    continue
+            params[name] = value
+    return dict(sorted(params.items()))
+
+
+def transform_key(params: dict, materialize: bool) -> str:
+    """
+    Returns the stable key of a derivative: a SHA-256 of its canonical parameters and of
+    whether it is a materialized copy or a delivery URL.
+    """
+    mode = "upload" if materialize else "url"
+    payload = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{mode}:{payload}".encode()).hexdigest()
+
+
+class CloudinaryTransformBackend:
+    """
+    Transforms images on Cloudinary: derivatives are signed delivery URLs that Cloudinary
+    renders on first request, or copies Cloudinary renders while storing them.
+    """
+
+    name = "cloudinary"
+    builds_urls = True
+
+    def __init__(self):
+        if storage.name != "cloudinary":
+            raise RuntimeError("TRANSFORM_BACKEND=cloudinary needs STORAGE_BACKEND=cloudinary")
+
+    def url(self, photo: Photo, params: dict) -> str:
+        return storage.transform(photo.cloudinary_id, params, photo.url)
+
+    async def materialize(self, photo: Photo, params: dict) -> tuple[str, str, None]:
+        """
+        Stores a transformed copy of `photo` and returns its URL and Cloudinary public ID.
+        Cloudinary renders the copy, so its content hash is not known.
+        """
+        response = await cloudinary.upload(photo.url, transformation=params)
+        return response["url"], response["public_id"], None
+
+
+class LocalTransformBackend:
+    """
+    Transforms images in a local process pool with Pillow and NumPy, see
+    `src.services.image_processing`, so transforms run without Cloudinary's image processing.
+    Sources are read from and copies written to the configured storage.
+
+    There is no delivery URL to build for a local transform, so every derivative is rendered
+    here and stored as a copy. The same source and parameters always render the same bytes,
+    and copies are stored under the SHA-256 of those bytes, so repeating a transform writes
+    the same object again instead of a new one.
+    """
+
+    name = "local"
+    builds_urls = False
+
+    def __init__(self, executor: BoundedExecutor):
+        try:
+            from src.services import image_processing
+        except ImportError as error:
+            raise RuntimeError(
+                "TRANSFORM_BACKEND=local needs Pillow and NumPy, install them with `poetry install -E local-transforms`"
+            ) from error
+        self._transform = image_processing.transform
+        self._too_large_error = image_processing.ImageTooLargeError
+        self._executor = executor
+
+    async def materialize(self, photo: Photo, params: dict) -> tuple[str, str, str]:
+        """
+        Renders a transformed copy of `photo`, stores it and returns its URL, storage key and
+        content hash. The key is `transformed/<sha256>.<format>`.
+
+        **Raises:**
+
+        - HTTPException: 400 Bad Request if a parameter is not supported locally or the source
+          is not a readable image, 413 Request Entity Too Large if the stored source is larger
+          than `UPLOAD_MAX_SIZE` or has more pixels than Pillow decodes,
+          503 or 504 if the transform pool is saturated or too slow.
+        """
+        source = await storage.get(photo.cloudinary_id, photo.url)
+        try:
+            image, image_format = await self._executor.run(self._transform, source, params)
+        except self._too_large_error as error:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(error))
+        except ValueError as error:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+        content_hash = hashlib.sha256(image).hexdigest()
+        key = f"transformed/{content_hash}.{image_format}"
+        return await storage.put(io.BytesIO(image), key), key, content_hash
+
+
+transform_executor = BoundedExecutor(
+    "Image transforms",
+    spawn_process_pool,
+    max_concurrency=config.TRANSFORM_WORKERS,
+    max_queue=config.TRANSFORM_MAX_QUEUE,
+    timeout=config.TRANSFORM_TIMEOUT,
+)
+
+if config.TRANSFORM_BACKEND == "local":
+    transform_backend = LocalTransformBackend(transform_executor)
+else:
+    transform_backend = CloudinaryTransformBackend()
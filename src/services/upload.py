@@ -0,0 +1,178 @@
+import hashlib
+from typing import BinaryIO, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.configuration.settings import config
+
+# Leading bytes of every accepted image format. WebP is a RIFF container,
+# so it is recognized by the "WEBP" tag after the 4-byte chunk size.
+_SIGNATURES = {
+    "jpeg": (b"\xff\xd8\xff",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "gif": (b"GIF87a", b"GIF89a"),
+}
+MEDIA_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """
+    Detects the image format from the first bytes of a file.
+
+    **Parameters:**
+
+    - `head` (bytes): At least the first 12 bytes of the file.
+
+    **Returns:**
+
+    - `Optional[str]`: `jpeg`, `png`, `gif` or `webp`, or `None` if the bytes match none of them.
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for image_format, signatures in _SIGNATURES.items():
+        if head.startswith(signatures):
+            return image_format
+    return None
+
+
+class StagedUpload:
+    """
+    An uploaded image that passed the upload stage.
+
+    **Attributes:**
+
+    - `file` (BinaryIO): The file, rewound to its start.
+    - `filename` (Optional[str]): The client-side file name.
+    - `size` (int): Size in bytes.
+    - `sha256` (str): Hex SHA-256 of the content.
+    - `image_format` (str): The format detected from the content, e.g. `jpeg`.
+    """
+
+    def __init__(self, file: BinaryIO, filename: Optional[str], size: int, sha256: str, image_format: str):
+        self.file = file
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.image_format = image_format
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.image_format]
+
+
+async def stage_upload(upload: UploadFile) -> StagedUpload:
+    """
+    Validates an uploaded image and fingerprints it in a single pass.
+
+    The file is read in `UPLOAD_CHUNK_SIZE` chunks from the spool the multipart parser
+    wrote it to (memory up to 1 MB, then a temporary file), so memory stays bounded no
+    matter how large the upload is. The format is checked on the first chunk and the size
+    after every chunk, so a wrong or oversized file is rejected without reading the rest.
+
+    **Parameters:**
+
+    - `upload` (UploadFile): The uploaded file.
+
+    **Returns:**
+
+    - `StagedUpload`: The rewound file with its size, checksum and format.
+
+    **Raises:**
+
+    - HTTPException: 415 Unsupported Media Type if the content is not an allowed image format,
+      413 Request Entity Too Large if it is larger than `UPLOAD_MAX_SIZE`,
+      400 Bad Request if it is empty.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    image_format = None
+    await upload.seek(0)
+    while chunk := await upload.read(config.UPLOAD_CHUNK_SIZE):
+        if image_format is None:
+            image_format = sniff_image_format(chunk)
+            if image_format not in config.UPLOAD_ALLOWED_FORMATS:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail=f"Unsupported image format, allowed: {', '.join(config.UPLOAD_ALLOWED_FORMATS)}",
+                )
+        size += len(chunk)
+        if size > config.UPLOAD_MAX_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File is larger than {config.UPLOAD_MAX_SIZE} bytes",
+            )
+        digest.update(chunk)
+
+    if size == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is empty")
+    await upload.seek(0)
+    return StagedUpload(upload.file, upload.filename, size, digest.hexdigest(), image_format)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies larger than the limit of their path with 413 while they are still arriving.
+
+    A declared `Content-Length` above the limit is rejected before any of the body is read;
+    a chunked body is counted as it streams in and cut off as soon as it crosses the limit,
+    so an oversized upload is never spooled to disk in full.
+
+    The multipart parser spools the whole body before `stage_upload` can check a single file,
+    so the limit is what bounds the spool. It is kept close to what a valid request can be:
+    `max_body_size` for every path, except those listed in `path_limits` (e.g. batch uploads).
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int, path_limits: Optional[dict[str, int]] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_body_size = self.path_limits.get(scope["path"], self.max_body_size)
+        too_large = HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request body is larger than {max_body_size} bytes",
+        )
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body_size:
+            response = JSONResponse({"detail": too_large.detail}, status_code=too_large.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    # Raised inside body parsing, so FastAPI turns it into the 413 response.
+                    raise too_large
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as error:
+            if error is not too_large or response_started:
+                raise
+            response = JSONResponse({"detail": too_large.detail}, status_code=too_large.status_code)
+            await response(scope, receive, send)
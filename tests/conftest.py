@@ -0,0 +1,186 @@
+"""
+The tests run the app in-process against the database it is configured for (`.env` or the
+`POSTGRES_*` environment variables). That database must be migrated with `alembic upgrade head`
+and is emptied before the run, so its name has to end with `_test`.
+"""
+from datetime import datetime, timedelta
+from functools import partial
+
+import pytest
+from anyio.from_thread import BlockingPortal, start_blocking_portal
+from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from main import app
+from src.configuration.settings import config
+from src.database.db import sessionmanager
+from src.repository import photo as photo_repository_module
+from src.entity.models import Base, Comment, Photo, Rating, Role, Tag, TransformedImage, User
+from src.services.auth import auth_service
+
+PHOTOS = 30
+TAGS = 10
+TAGS_PER_PHOTO = 5
+COMMENTS_PER_PHOTO = 10
+
+
+class Client:
+    """
+    Calls the app in-process from synchronous tests.
+
+    All requests run on the event loop of one portal thread, which the connections in the
+    app's pool are bound to.
+    """
+
+    def __init__(self, portal: BlockingPortal, client: AsyncClient):
+        self.portal = portal
+        self.client = client
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        return self.portal.call(partial(self.client.request, method, url, **kwargs))
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request("GET", url, **kwargs)
+
+
+class StatementCounter:
+    """Collects the SQL statements the app sends while a request is handled."""
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.statements: list[str] = []
+
+    def _record(self, connection, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def request(self, method: str, url: str, warm: bool = True, **kwargs) -> tuple[Response, list[str]]:
+        """
+        Sends the request and returns the response and the statements it ran.
+
+        With `warm`, the request is sent once beforehand and only the second one is counted,
+        so a cold principal cache does not count towards the endpoint.
+        """
+        if warm:
+            self.client.request(method, url, **kwargs)
+        self.statements = []
+        event.listen(Engine, "before_cursor_execute", self._record)
+        try:
+            response = self.client.request(method, url, **kwargs)
+        finally:
+            event.remove(Engine, "before_cursor_execute", self._record)
+        return response, self.statements
+
+
+class RecordingStorage:
+    """Stands in for the storage backend and records how many connections are checked out during each upload."""
+
+    name = "recording"
+
+    def __init__(self):
+        self.checked_out: list[int] = []
+        self.deleted: list[str] = []
+
+    async def put(self, file, key: str) -> str:
+        self.checked_out.append(sessionmanager.pool_stats()["primary"]["checked_out"])
+        return f"https://storage.test/{key}.jpg"
+
+    async def delete(self, key: str) -> None:
+        self.deleted.append(key)
+
+
+@pytest.fixture
+def storage(monkeypatch) -> RecordingStorage:
+    storage = RecordingStorage()
+    monkeypatch.setattr(photo_repository_module, "storage", storage)
+    return storage
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    # The app and its executors run on asyncio only.
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def data() -> dict:
+    if not config.POSTGRES_DB.endswith("_test"):
+        pytest.exit(f"Refusing to empty the database {config.POSTGRES_DB!r}: its name must end with _test")
+    engine = create_engine(config.SYNC_DATABASE_URL)
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with Session(engine) as db:
+        db.execute(text(f"TRUNCATE {tables} CASCADE"))
+        admin = User(username="admin", email="admin@example.com", password="-", role=Role.admin)
+        users = [User(username=f"user{index}", email=f"user{index}@example.com", password="-") for index in range(3)]
+        tags = [Tag(name=f"tag{index}") for index in range(TAGS)]
+        db.add_all([admin, *users, *tags])
+        db.flush()
+
+        created_at = datetime(2024, 1, 1)
+        photos = []
+        for index in range(PHOTOS):
+            photo = Photo(
+                cloudinary_id=f"photo_{index}",
+                url=f"https://res.cloudinary.com/demo/image/upload/v1/photo_{index}.jpg",
+                description=f"Sunset over the sea number {index}",
+                user_id=(admin if index == 0 else users[index % len(users)]).id,
+                created_at=created_at + timedelta(minutes=index),
+                updated_at=created_at + timedelta(minutes=index),
+                comment_count=COMMENTS_PER_PHOTO,
+                rating_count=len(users),
+                rating_sum=len(users) * 4,
+            )
+            photo.tags = [tags[(index + offset) % TAGS] for offset in range(TAGS_PER_PHOTO)]
+            photo.transformed_images = [TransformedImage(transformed_url=f"{photo.url}?w=100")]
+            photo.comments = [
+                Comment(
+                    text=f"Comment {number}",
+                    user_id=users[number % len(users)].id,
+                    created_at=photo.created_at + timedelta(seconds=number),
+                    updated_at=photo.created_at + timedelta(seconds=number),
+                )
+                for number in range(COMMENTS_PER_PHOTO)
+            ]
+            photo.ratings = [Rating(user_id=user.id, rating=4) for user in users]
+            photos.append(photo)
+        db.add_all(photos)
+        db.flush()
+        result = {
+            "admin": admin.email,
+            "user": users[0].email,
+            "photo_id": str(photos[0].id),
+            "comment_id": str(photos[0].comments[0].id),
+        }
+        db.commit()
+    engine.dispose()
+    return result
+
+
+@pytest.fixture(scope="session")
+def client(data) -> Client:
+    with start_blocking_portal() as portal:
+        async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+        yield Client(portal, async_client)
+        portal.call(async_client.aclose)
+        portal.call(sessionmanager.close)
+
+
+@pytest.fixture
+def counter(client) -> StatementCounter:
+    return StatementCounter(client)
+
+
+def _headers(email: str) -> dict:
+    token = auth_service.create_access_token(data={"sub": email}, expires_delta=3600)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(data) -> dict:
+    return _headers(data["admin"])
+
+
+@pytest.fixture(scope="session")
+def user_headers(data) -> dict:
+    return _headers(data["user"])
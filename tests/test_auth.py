@@ -0,0 +1,22 @@
+import pytest
+
+from src.services.auth import auth_service, password_executor
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def executor():
+    yield password_executor
+    password_executor.shutdown()
+
+
+async def test_passwords_are_hashed_and_verified_in_the_process_pool(executor):
+    completed = executor.stats()["completed"]
+
+    hashed = await auth_service.get_password_hash("secret")
+
+    assert hashed != "secret"
+    assert await auth_service.verify_password("secret", hashed)
+    assert not await auth_service.verify_password("wrong", hashed)
+    assert executor.stats()["completed"] == completed + 3
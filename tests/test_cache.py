@@ -0,0 +1,70 @@
+from src.services.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entry_expires_after_its_ttl():
+    clock = Clock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("key", "value")
+
+    clock.now = 59.9
+    assert cache.get("key") == "value"
+    clock.now = 60
+    assert cache.get("key", "expired") == "expired"
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_setting_an_entry_again_restarts_its_ttl():
+    clock = Clock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("key", "old")
+    clock.now = 50
+    cache.set("key", "new")
+
+    clock.now = 100
+    assert cache.get("key") == "new"
+
+
+def test_entry_without_ttl_never_expires():
+    clock = Clock()
+    cache = TTLCache(maxsize=10, ttl=None, clock=clock)
+    cache.set("key", "value")
+
+    clock.now = 10 ** 9
+    assert cache.get("key") == "value"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+
+
+def test_invalidate_and_clear_drop_entries():
+    cache = TTLCache(maxsize=10, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,25 @@
+import pytest
+
+from src.configuration import cloudinary
+
+
+@pytest.mark.parametrize(
+    "url, public_id, expected",
+    [
+        ("https://res.cloudinary.com/demo/image/upload/v1/1700000000.5_user@example.com.jpg", "1700000000.5_user@example.com", "jpg"),
+        ("https://res.cloudinary.com/demo/image/upload/v1/1700000000.5_user%40example.com.png", "1700000000.5_user@example.com", "png"),
+        ("http://127.0.0.1:8900/demo/image/upload/v1/1700000000.5_user@example.com", "1700000000.5_user@example.com", None),
+        ("https://res.cloudinary.com/demo/image/upload/v1/0f1e2d.webp", "0f1e2d", "webp"),
+    ],
+    ids=["dotted_id", "quoted_id", "no_format", "plain_id"],
+)
+def test_url_format_is_taken_after_the_public_id(url, public_id, expected):
+    assert cloudinary.url_format(url, public_id) == expected
+
+
+def test_transformed_url_keeps_the_original_format():
+    public_id = "1700000000.5_user@example.com"
+
+    url = cloudinary.transformed_url(public_id, {"width": 100}, "jpg")
+
+    assert cloudinary.url_format(url, public_id) == "jpg"
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from src.services.executor import BoundedExecutor
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor("Test", ThreadPoolExecutor, max_concurrency=1, max_queue=1, timeout=5)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def release():
+    # Blocks the calls that wait on it; set at teardown so no worker thread outlives the test.
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+async def _until(condition) -> None:
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+async def test_run_returns_the_result(executor):
+    assert await executor.run(pow, 2, 10) == 1024
+    await _until(lambda: executor.in_flight == 0)
+    assert executor.stats()["completed"] == 1
+
+
+async def test_exception_of_the_call_is_raised_and_counted(executor):
+    with pytest.raises(ValueError):
+        await executor.run(int, "not a number")
+
+    await _until(lambda: executor.in_flight == 0)
+    assert executor.stats()["failed"] == 1
+
+
+async def test_caller_beyond_the_queue_is_rejected_with_503(executor, release):
+    running = asyncio.create_task(executor.run(release.wait))
+    queued = asyncio.create_task(executor.run(release.wait))
+    await _until(lambda: executor.in_flight == 1 and executor.waiting == 1)
+
+    with pytest.raises(HTTPException) as error:
+        await executor.run(release.wait)
+
+    assert error.value.status_code == 503
+    assert executor.stats()["rejected"] == 1
+    release.set()
+    assert await asyncio.gather(running, queued) == [True, True]
+
+
+async def test_slow_call_times_out_with_504_and_keeps_its_slot(executor, release):
+    executor.timeout = 0.05
+
+    with pytest.raises(HTTPException) as error:
+        await executor.run(release.wait)
+
+    assert error.value.status_code == 504
+    # The call still runs in the pool, so its slot stays taken until it finishes.
+    assert executor.stats()["timed_out"] == 1
+    assert executor.in_flight == 1
+    release.set()
+    await _until(lambda: executor.in_flight == 0)
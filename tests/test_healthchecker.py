@@ -0,0 +1,13 @@
+import pytest
+
+STATS = ["db/pool", "cloudinary", "password-hashing", "qr", "transform", "principal-cache"]
+
+
+@pytest.mark.parametrize("path", STATS)
+def test_stats_are_for_admins_only(client, admin_headers, user_headers, path):
+    url = f"/healthchecker/{path}"
+
+    # HTTPBearer answers a request without credentials with 403 as well.
+    assert client.get(url).status_code == 403
+    assert client.get(url, headers=user_headers).status_code == 403
+    assert client.get(url, headers=admin_headers).status_code == 200
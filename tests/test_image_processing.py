@@ -0,0 +1,109 @@
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("numpy")
+
+from src.services import image_processing, transformation  # noqa: E402
+from src.services.executor import BoundedExecutor  # noqa: E402
+from src.services.transformation import LocalTransformBackend  # noqa: E402
+
+PARAMS = {"angle": 15, "border": "2px_solid_red", "crop": "fill", "effect": "sepia", "height": 40, "width": 60}
+
+
+def _image(image_format: str, size: tuple[int, int] = (120, 80)) -> bytes:
+    image = Image.new("RGB", size)
+    for x in range(size[0]):
+        image.putpixel((x, x * size[1] // size[0]), (x * 2 % 256, 90, 255 - x % 256))
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class SourceStorage:
+    """Stands in for the storage backend: serves one source image and keeps what is stored."""
+
+    def __init__(self, source: bytes):
+        self.source = source
+        self.stored: dict[str, bytes] = {}
+
+    async def get(self, key: str, url=None) -> bytes:
+        return self.source
+
+    async def put(self, file, key: str) -> str:
+        self.stored[key] = file.read()
+        return f"https://storage.test/{key}"
+
+
+@pytest.fixture
+def backend():
+    executor = BoundedExecutor("Test transforms", ThreadPoolExecutor, max_concurrency=1, max_queue=1, timeout=5)
+    yield LocalTransformBackend(executor)
+    executor.shutdown()
+
+
+def _photo():
+    return SimpleNamespace(cloudinary_id="source", url="https://storage.test/source")
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG"])
+def test_same_input_and_params_give_identical_bytes(image_format):
+    source = _image(image_format)
+
+    first = image_processing.transform(source, PARAMS)
+    second = image_processing.transform(source, dict(reversed(PARAMS.items())))
+
+    assert first == second
+
+
+def test_unreadable_source_is_a_value_error():
+    with pytest.raises(ValueError, match="not a readable image") as error:
+        image_processing.transform(b"not an image", PARAMS)
+
+    assert not isinstance(error.value, image_processing.ImageTooLargeError)
+
+
+@pytest.mark.parametrize("pixels", [120 * 80 - 1, 120 * 80 // 2 - 1], ids=["warning", "error"])
+def test_decompression_bomb_is_too_large(monkeypatch, pixels):
+    # Pillow warns above MAX_IMAGE_PIXELS and raises above twice that; both are refused.
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", pixels)
+
+    with pytest.raises(image_processing.ImageTooLargeError):
+        image_processing.transform(_image("PNG"), PARAMS)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "source, max_pixels, status_code",
+    [(b"not an image", None, 400), (_image("PNG"), 100, 413)],
+    ids=["unreadable", "too_large"],
+)
+async def test_materialize_rejects_bad_sources(monkeypatch, backend, source, max_pixels, status_code):
+    monkeypatch.setattr(transformation, "storage", SourceStorage(source))
+    if max_pixels is not None:
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", max_pixels)
+
+    with pytest.raises(HTTPException) as error:
+        await backend.materialize(_photo(), PARAMS)
+
+    assert error.value.status_code == status_code
+
+
+@pytest.mark.anyio
+async def test_materialize_stores_copies_by_content(monkeypatch, backend):
+    storage = SourceStorage(_image("JPEG"))
+    monkeypatch.setattr(transformation, "storage", storage)
+
+    first = await backend.materialize(_photo(), PARAMS)
+    second = await backend.materialize(_photo(), PARAMS)
+
+    url, key, content_hash = first
+    assert second == first
+    assert key == f"transformed/{content_hash}.{image_processing.transform(storage.source, PARAMS)[1]}"
+    assert hashlib.sha256(storage.stored[key]).hexdigest() == content_hash
+    assert list(storage.stored) == [key]
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from src.routes import media
+from src.services.storage import LocalStorage
+
+KEY = "1700000000.5_user@example.com"
+CONTENT = bytes(range(100))
+
+
+@pytest.fixture
+def stored(monkeypatch, tmp_path) -> LocalStorage:
+    storage = LocalStorage(str(tmp_path), "/media")
+    path = storage.path(KEY)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as file:
+        file.write(CONTENT)
+    monkeypatch.setattr(media, "storage", storage)
+    return storage
+
+
+def _get(client, **headers):
+    return client.get(f"/media/{KEY}", headers=headers)
+
+
+@pytest.mark.parametrize(
+    "header, start, end",
+    [("bytes=10-19", 10, 19), ("bytes=90-", 90, 99), ("bytes=-5", 95, 99), ("bytes=95-500", 95, 99)],
+    ids=["first_last", "open_ended", "suffix", "last_past_the_end"],
+)
+def test_range_is_served_as_partial_content(client, stored, header, start, end):
+    response = _get(client, Range=header)
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["Content-Range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.headers["Content-Length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=100-200", "bytes=-0"])
+def test_unsatisfiable_range_is_416(client, stored, header):
+    response = _get(client, Range=header)
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+@pytest.mark.parametrize("header", ["bytes=5-3", "bytes=-", "bytes=0-1,5-6", "items=0-1"])
+def test_invalid_range_is_ignored(client, stored, header):
+    response = _get(client, Range=header)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert "Content-Range" not in response.headers
+
+
+def test_range_is_honoured_if_the_file_is_unchanged(client, stored):
+    etag = _get(client).headers["ETag"]
+
+    response = _get(client, Range="bytes=0-9", **{"If-Range": etag})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+
+def test_range_is_ignored_if_the_file_changed(client, stored):
+    response = _get(client, Range="bytes=0-9", **{"If-Range": '"outdated"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
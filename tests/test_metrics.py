@@ -0,0 +1,58 @@
+from src.services.metrics import Registry, _operation
+
+
+def _registry() -> Registry:
+    registry = Registry()
+    latency = registry.histogram("request_seconds", "Request latency.", ("route",), buckets=(0.5, 0.1, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.3, 2.0):
+        latency.labels("/photo").observe(value)
+    errors = registry.counter("errors_total", "Errors.", ("path",))
+    errors.labels('C:\\photos\n"raw"').inc(2)
+    in_flight = registry.gauge("in_flight", "Requests in flight.")
+    in_flight.labels().inc(3)
+    in_flight.labels().dec()
+    return registry
+
+
+def test_render_declares_every_family():
+    lines = _registry().render().splitlines()
+
+    assert [line for line in lines if line.startswith("#")] == [
+        "# HELP request_seconds Request latency.",
+        "# TYPE request_seconds histogram",
+        "# HELP errors_total Errors.",
+        "# TYPE errors_total counter",
+        "# HELP in_flight Requests in flight.",
+        "# TYPE in_flight gauge",
+    ]
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    lines = _registry().render().splitlines()
+
+    # Buckets are sorted, a value on a bound counts in its bucket and the counts are cumulative.
+    assert [line for line in lines if line.startswith("request_seconds")] == [
+        'request_seconds_bucket{route="/photo",le="0.1"} 2',
+        'request_seconds_bucket{route="/photo",le="0.5"} 4',
+        'request_seconds_bucket{route="/photo",le="1.0"} 4',
+        'request_seconds_bucket{route="/photo",le="+Inf"} 5',
+        'request_seconds_sum{route="/photo"} 2.75',
+        'request_seconds_count{route="/photo"} 5',
+    ]
+
+
+def test_label_values_are_escaped():
+    assert 'errors_total{path="C:\\\\photos\\n\\"raw\\""} 2.0' in _registry().render().splitlines()
+
+
+def test_counter_and_gauge_render_their_value_and_render_ends_with_a_newline():
+    text = _registry().render()
+
+    assert "in_flight 2.0" in text.splitlines()
+    assert text.endswith("\n")
+
+
+def test_operation_label_is_the_leading_keyword():
+    assert _operation("  select 1") == "SELECT"
+    assert _operation("WITH ranked AS (SELECT 1) SELECT * FROM ranked") == "WITH"
+    assert _operation("SAVEPOINT sa_1") == "OTHER"
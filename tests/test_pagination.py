@@ -0,0 +1,34 @@
+import pytest
+
+
+def _next_cursor(client, url: str, **kwargs) -> str:
+    response = client.get(url, **kwargs)
+    assert response.status_code == 200
+    return response.json()["next_cursor"]
+
+
+@pytest.mark.parametrize("sort_by", ["date", "rating"])
+def test_search_cursor_resumes_in_the_same_order(client, admin_headers, sort_by):
+    params = {"sort_by": sort_by, "order": "asc", "limit": 5}
+    first = client.get("/search_photos/", params={**params, "limit": 10}, headers=admin_headers).json()["items"]
+    cursor = _next_cursor(client, "/search_photos/", params=params, headers=admin_headers)
+
+    response = client.get("/search_photos/", params={**params, "cursor": cursor}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert [photo["id"] for photo in response.json()["items"]] == [photo["id"] for photo in first[5:]]
+
+
+@pytest.mark.parametrize(
+    "replay",
+    [{"order": "desc"}, {"sort_by": "rating"}],
+    ids=["other_order", "other_sort"],
+)
+def test_search_cursor_of_another_ordering_is_rejected(client, admin_headers, replay):
+    params = {"sort_by": "date", "order": "asc", "limit": 5}
+    cursor = _next_cursor(client, "/search_photos/", params=params, headers=admin_headers)
+
+    response = client.get("/search_photos/", params={**params, **replay, "cursor": cursor}, headers=admin_headers)
+
+    assert response.status_code == 400
+
@@ -0,0 +1,91 @@
+import asyncio
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.schemas.qr_code import QrFormat
+from src.services.executor import BoundedExecutor
+from src.services.qr import QrRenderer, zip_stream
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def executor():
+    # Threads instead of spawned processes keep the tests fast; the renderer does not care.
+    executor = BoundedExecutor("QR rendering", ThreadPoolExecutor, max_concurrency=2, max_queue=64, timeout=10)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def renderer(executor, tmp_path):
+    return QrRenderer(executor, str(tmp_path), cache_size=2, disk_max_files=10)
+
+
+def _disk_files(renderer: QrRenderer) -> set[str]:
+    return {name for _, _, names in os.walk(renderer.cache_dir) for name in names}
+
+
+async def test_image_is_rendered_once_and_then_served_from_memory(renderer):
+    key, image = await renderer.render("https://example.com/a.jpg", QrFormat.png)
+
+    assert image.startswith(b"\x89PNG")
+    assert await renderer.render("https://example.com/a.jpg", QrFormat.png) == (key, image)
+    assert (renderer.renders, renderer.disk_hits) == (1, 0)
+    assert _disk_files(renderer) == {f"{key}.png"}
+
+
+async def test_image_evicted_from_memory_is_read_back_from_disk(renderer, executor):
+    key, image = await renderer.render("https://example.com/a.jpg", QrFormat.svg)
+    restarted = QrRenderer(executor, renderer.cache_dir, cache_size=2, disk_max_files=10)
+
+    assert await restarted.render("https://example.com/a.jpg", QrFormat.svg) == (key, image)
+    assert (restarted.renders, restarted.disk_hits) == (0, 1)
+
+
+async def test_concurrent_requests_for_one_image_share_its_render(renderer):
+    results = await asyncio.gather(*(renderer.render("https://example.com/a.jpg", QrFormat.png) for _ in range(5)))
+
+    assert len(set(results)) == 1
+    assert renderer.renders == 1
+
+
+async def test_least_recently_used_files_are_deleted_above_the_limit(renderer):
+    renderer.disk_max_files = 3
+    keys = []
+    for index in range(3):
+        key, _ = await renderer.render(f"https://example.com/{index}.jpg", QrFormat.png)
+        keys.append(key)
+        # Distinct modification times, whatever the file system's timestamp resolution.
+        os.utime(renderer._path(key, QrFormat.png), (index, index))
+    # Reading the oldest file from disk makes it the most recently used.
+    renderer._memory.clear()
+    await renderer.render("https://example.com/0.jpg", QrFormat.png)
+
+    last, _ = await renderer.render("https://example.com/3.jpg", QrFormat.png)
+
+    # Four files are over the limit of three, so the two least recently used go.
+    assert _disk_files(renderer) == {f"{keys[0]}.png", f"{last}.png"}
+    assert renderer.stats()["disk"] == {"files": 2, "max_files": 3, "evictions": 2}
+
+
+async def test_zip_stream_writes_every_entry_as_it_comes():
+    async def entries():
+        yield "a.png", b"\x89PNG image"
+        yield "errors.json", b'{"b": "Photo not found"}'
+
+    chunks = [chunk async for chunk in zip_stream(entries())]
+
+    # The first entry is flushed before the second is produced.
+    assert len(chunks) == 3 and chunks[0]
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["a.png", "errors.json"]
+        assert archive.getinfo("a.png").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("errors.json").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.read("a.png") == b"\x89PNG image"
+        assert json.loads(archive.read("errors.json")) == {"b": "Photo not found"}
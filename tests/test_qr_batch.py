@@ -0,0 +1,44 @@
+import io
+import json
+import uuid
+import zipfile
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from src.configuration.settings import config
+from src.entity.models import QrCode
+
+
+@pytest.fixture(scope="module")
+def photo_ids(client, admin_headers) -> list[str]:
+    response = client.get("/photo/", params={"limit": 6}, headers=admin_headers)
+    return [photo["id"] for photo in response.json()["items"]]
+
+
+def _qr_code_photo_ids(photo_ids: list[str]) -> set[str]:
+    engine = create_engine(config.SYNC_DATABASE_URL)
+    with engine.connect() as connection:
+        result = connection.scalars(select(QrCode.photo_id).where(QrCode.photo_id.in_(photo_ids)))
+        recorded = {str(photo_id) for photo_id in result}
+    engine.dispose()
+    return recorded
+
+
+@pytest.mark.parametrize("output, batch", [("urls", slice(0, 3)), ("zip", slice(3, 6))])
+def test_both_outputs_record_qr_codes_of_the_rendered_photos(client, photo_ids, output, batch):
+    photo_ids = photo_ids[batch]
+    missing = str(uuid.uuid4())
+
+    response = client.request("POST", "/generate_qr/batch", json={"photo_ids": [*photo_ids, missing], "output": output})
+
+    assert response.status_code == 200
+    assert _qr_code_photo_ids(photo_ids) == set(photo_ids)
+    if output == "urls":
+        errors = {item["photo_id"]: item["error"] for item in response.json()["items"] if item["error"]}
+    else:
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            assert sorted(archive.namelist()) == sorted([*(f"{photo_id}.png" for photo_id in photo_ids), "errors.json"])
+            assert all(archive.read(f"{photo_id}.png").startswith(b"\x89PNG") for photo_id in photo_ids)
+            errors = json.loads(archive.read("errors.json"))
+    assert errors == {missing: "Photo not found"}
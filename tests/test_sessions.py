@@ -0,0 +1,11 @@
+import logging
+
+
+def test_validation_error_is_not_logged_as_an_error(client, admin_headers, caplog):
+    caplog.set_level(logging.DEBUG, logger="src.database.db")
+
+    response = client.get("/photo/not-a-uuid", headers=admin_headers)
+
+    assert response.status_code == 422
+    records = [record for record in caplog.records if record.name == "src.database.db"]
+    assert [record.levelname for record in records] == ["DEBUG"]
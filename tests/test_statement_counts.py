@@ -0,0 +1,168 @@
+"""
+Statement-count regression tests.
+
+Each endpoint must send a fixed number of SQL statements however many photos, tags and
+comments it returns. A relationship that goes back to being loaded per row, or a query
+added to a hot path, changes these numbers; update them only together with the change
+that explains the new count.
+"""
+import os
+
+import pytest
+
+
+@pytest.mark.parametrize("limit", [2, 20])
+def test_list_photos(counter, limit):
+    response, statements = counter.request("GET", "/photo/", params={"limit": limit})
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == limit
+    # photos, tags, transformed images, latest comments
+    assert len(statements) == 4, statements
+
+
+def test_list_photos_next_page(counter):
+    first, _ = counter.request("GET", "/photo/", params={"limit": 5})
+    response, statements = counter.request(
+        "GET", "/photo/", params={"limit": 5, "cursor": first.json()["next_cursor"]}
+    )
+
+    assert response.status_code == 200
+    assert len(statements) == 4, statements
+
+
+def test_get_photo(counter, data):
+    response, statements = counter.request("GET", f"/photo/{data['photo_id']}")
+
+    assert response.status_code == 200
+    # version for the ETag, photo, tags, transformed images, latest comments
+    assert len(statements) == 5, statements
+
+
+def test_get_photo_not_modified(counter, data):
+    etag = counter.client.get(f"/photo/{data['photo_id']}").headers["ETag"]
+    response, statements = counter.request("GET", f"/photo/{data['photo_id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert len(statements) == 1, statements
+
+
+@pytest.mark.parametrize("limit", [2, 20])
+@pytest.mark.parametrize(
+    "params",
+    [{}, {"description": "sunset"}, {"tag": "tag1"}, {"username": "user1"}],
+    ids=["no_filter", "description", "tag", "username"],
+)
+def test_search_photos(counter, admin_headers, params, limit):
+    response, statements = counter.request(
+        "GET", "/search_photos/", params={**params, "limit": limit}, headers=admin_headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["items"]
+    # photos, tags, transformed images, latest comments
+    assert len(statements) == 4, statements
+
+
+@pytest.mark.parametrize("limit", [2, 10])
+def test_list_comments(counter, data, limit):
+    response, statements = counter.request("GET", f"/comments/photos/{data['photo_id']}", params={"limit": limit})
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == limit
+    # version for the ETag, comments
+    assert len(statements) == 2, statements
+
+
+def test_get_comment(counter, data):
+    response, statements = counter.request("GET", f"/comments/{data['comment_id']}")
+
+    assert response.status_code == 200
+    assert len(statements) == 1, statements
+
+
+def test_create_comment(counter, data, admin_headers):
+    response, statements = counter.request(
+        "POST", "/comments/", params={"photo_id": data["photo_id"]}, json={"text": "Nice"}, headers=admin_headers
+    )
+
+    assert response.status_code == 201
+    # photo lookup, comment counter update, comment insert, reload
+    assert len(statements) == 4, statements
+
+
+def test_average_rating(counter, data):
+    response, statements = counter.request("GET", f"/rating/average-rating/{data['photo_id']}")
+
+    assert response.status_code == 200
+    # version for the ETag, stored average
+    assert len(statements) == 2, statements
+
+
+def test_ratings_for_photo(counter, data, admin_headers):
+    response, statements = counter.request("GET", f"/rating/{data['photo_id']}", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert len(statements) == 1, statements
+
+
+def test_update_photo(counter, data, admin_headers):
+    # Warms the principal cache; sending the same update twice would skip the UPDATE.
+    counter.client.get("/auth/me", headers=admin_headers)
+    response, statements = counter.request(
+        "PUT",
+        f"/photo/{data['photo_id']}",
+        warm=False,
+        json={"description": "Sunrise"},
+        headers=admin_headers,
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()["tags"]) == 5
+    # photo columns for the ownership check; update; photo with tags, transformed images and latest comments
+    assert len(statements) == 6, statements
+
+
+def test_me(counter, admin_headers):
+    response, statements = counter.request("GET", "/auth/me", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert len(statements) == 1, statements
+
+
+def test_delete_photo(client, counter, admin_headers, user_headers, storage):
+    image = b"\xff\xd8\xff" + os.urandom(1024)
+    upload = client.request("POST", "/photo/upload", files={"file": ("a.jpg", image, "image/jpeg")}, headers=admin_headers)
+    photo_id = upload.json()["id"]
+    comments = [
+        client.request("POST", "/comments/", params={"photo_id": photo_id}, json={"text": f"Comment {index}"}, headers=user_headers)
+        for index in range(3)
+    ]
+    client.request("POST", f"/rating/{photo_id}", json={"rating": 5}, headers=user_headers)
+    client.get("/auth/me", headers=admin_headers)
+
+    response, statements = counter.request("DELETE", f"/photo/{photo_id}", warm=False, headers=admin_headers)
+
+    assert response.status_code == 200
+    # photo, tags, transformed images, QR code; asset release and its delete; comments, ratings
+    # and the photo, one DELETE each however many comments and ratings there are
+    assert len(statements) == 9, statements
+    assert client.get(f"/comments/{comments[0].json()['id']}").status_code == 404
+    assert storage.deleted == [upload.json()["cloudinary_id"]]
+
+
+def test_transform_image_url(counter, data, admin_headers):
+    counter.client.get("/auth/me", headers=admin_headers)
+    response, statements = counter.request(
+        "POST",
+        "/transform-image/",
+        warm=False,
+        params={"photo_id": data["photo_id"]},
+        json={"transformations": [{"width": 401, "crop": "fill"}]},
+        headers=admin_headers,
+    )
+
+    assert response.status_code == 200
+    # photo and tags, loaded once; existing derivative; insert; photo version bump
+    assert len(statements) == 5, statements
@@ -0,0 +1,34 @@
+import pytest
+from fastapi import HTTPException
+
+from src.configuration.settings import config
+from src.services.storage import CloudinaryStorage, _download
+
+
+@pytest.fixture
+def stored_image(tmp_path):
+    def write(size: int) -> str:
+        path = tmp_path / "image"
+        path.write_bytes(b"\0" * size)
+        return path.as_uri()
+
+    return write
+
+
+def test_download_reads_an_image_of_the_maximum_size(stored_image):
+    assert len(_download(stored_image(config.UPLOAD_MAX_SIZE))) == config.UPLOAD_MAX_SIZE
+
+
+def test_download_rejects_a_larger_image_instead_of_truncating_it(stored_image):
+    with pytest.raises(HTTPException) as error:
+        _download(stored_image(config.UPLOAD_MAX_SIZE + 1))
+
+    assert error.value.status_code == 413
+
+
+@pytest.mark.anyio
+async def test_cloudinary_get_downloads_from_the_stored_url(stored_image):
+    url = stored_image(16)
+
+    # The key alone would build a URL that ends in ".com", the format Cloudinary would deliver.
+    assert await CloudinaryStorage().get("1700000000.5_user@example.com", url) == b"\0" * 16
@@ -0,0 +1,146 @@
+from hashlib import sha256
+from uuid import uuid4
+
+import pytest
+
+from src.database.db import sessionmanager
+from src.repository import cloudinary_func as cloudinary_func_module
+from src.repository.photo import photo_repository
+from src.schemas.cloudinary_func import Transformation
+from src.services.transformation import canonicalize, transform_key
+
+
+class RecordingBackend:
+    """Stands in for the transform backend and records how many connections are checked out during each copy."""
+
+    name = "recording"
+    builds_urls = True
+
+    def __init__(self):
+        self.checked_out: list[int] = []
+        self.stored: list[str] = []
+        # Set to render every copy as the same image, stored by content like local transforms.
+        self.content_hash = None
+
+    def url(self, photo, params: dict) -> str:
+        return f"{photo.url}?{sorted(params.items())}"
+
+    async def materialize(self, photo, params: dict) -> tuple[str, str, str]:
+        self.checked_out.append(sessionmanager.pool_stats()["primary"]["checked_out"])
+        key = uuid4().hex if self.content_hash is None else f"transformed/{self.content_hash}.png"
+        self.stored.append(key)
+        return f"https://storage.test/{key}", key, self.content_hash
+
+
+@pytest.fixture
+def backend(monkeypatch, storage) -> RecordingBackend:
+    backend = RecordingBackend()
+    monkeypatch.setattr(cloudinary_func_module, "transform_backend", backend)
+    monkeypatch.setattr(cloudinary_func_module, "storage", storage)
+    return backend
+
+
+def _transform(client, data, admin_headers, width: int):
+    return client.request(
+        "POST",
+        "/transform-image/",
+        params={"photo_id": data["photo_id"]},
+        json={"transformations": [{"width": width}], "materialize": True},
+        headers=admin_headers,
+    )
+
+
+def test_materialize_holds_no_connection(client, data, admin_headers, backend, storage):
+    response = _transform(client, data, admin_headers, width=301)
+
+    assert response.status_code == 200
+    assert backend.checked_out == [0]
+    assert storage.deleted == []
+
+
+def test_copy_is_deleted_when_it_cannot_be_recorded(client, data, admin_headers, backend, storage, monkeypatch):
+    async def fail(photo_id, db):
+        raise RuntimeError("Database is gone")
+
+    monkeypatch.setattr(photo_repository, "touch_photo", fail)
+
+    response = _transform(client, data, admin_headers, width=302)
+
+    assert response.status_code == 500
+    assert storage.deleted == backend.stored
+
+
+def test_identical_copies_share_one_stored_image(client, data, admin_headers, backend, storage):
+    backend.content_hash = sha256(uuid4().bytes).hexdigest()
+
+    first = _transform(client, data, admin_headers, width=303)
+    second = _transform(client, data, admin_headers, width=304)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert backend.stored[0] == backend.stored[1]
+    assert storage.deleted == []
+
+
+def test_shared_copy_is_kept_when_it_cannot_be_recorded(client, data, admin_headers, backend, storage, monkeypatch):
+    backend.content_hash = sha256(uuid4().bytes).hexdigest()
+    assert _transform(client, data, admin_headers, width=305).status_code == 200
+
+    async def fail(photo_id, db):
+        raise RuntimeError("Database is gone")
+
+    monkeypatch.setattr(photo_repository, "touch_photo", fail)
+
+    response = _transform(client, data, admin_headers, width=306)
+
+    # The first copy still uses the stored image.
+    assert response.status_code == 500
+    assert storage.deleted == []
+
+
+def test_unshared_copy_by_content_is_deleted_when_it_cannot_be_recorded(
+    client, data, admin_headers, backend, storage, monkeypatch
+):
+    backend.content_hash = sha256(uuid4().bytes).hexdigest()
+
+    async def fail(photo_id, db):
+        raise RuntimeError("Database is gone")
+
+    monkeypatch.setattr(photo_repository, "touch_photo", fail)
+
+    response = _transform(client, data, admin_headers, width=307)
+
+    assert response.status_code == 500
+    assert storage.deleted == backend.stored
+
+
+def test_canonicalize_merges_in_order_and_sorts_by_name():
+    params = canonicalize([
+        Transformation(width=100, crop="fit", effect="sepia"),
+        Transformation(width=200, angle=90, effect=" "),
+    ])
+
+    # The later width wins, the blank effect does not override the earlier one.
+    assert list(params.items()) == [("angle", 90), ("crop", "fit"), ("effect", "sepia"), ("width", 200)]
+
+
+def test_same_transformation_written_differently_has_one_key():
+    first = canonicalize([Transformation(width=100, height=50, crop=" Fill ", gravity="North", effect="Blur:300")])
+    second = canonicalize([Transformation(height="50"), Transformation(effect="blur:300", gravity="north", crop="fill", width=100.0)])
+
+    assert first == second
+    assert transform_key(first, materialize=False) == transform_key(second, materialize=False)
+
+
+def test_case_sensitive_values_keep_their_case():
+    red = canonicalize([Transformation(border="5px_solid_Red", effect="colorize:40:FFaa00")])
+    lower = canonicalize([Transformation(border="5px_solid_red", effect="colorize:40:ffaa00")])
+
+    assert red == {"border": "5px_solid_Red", "effect": "colorize:40:FFaa00"}
+    assert transform_key(red, materialize=False) != transform_key(lower, materialize=False)
+
+
+def test_key_tells_a_copy_from_a_url():
+    params = canonicalize([Transformation(width=100)])
+
+    assert transform_key(params, materialize=True) != transform_key(params, materialize=False)
@@ -0,0 +1,110 @@
+import hashlib
+import io
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from httpx import ASGITransport, AsyncClient
+
+from src.configuration.settings import config
+from src.services.upload import BodySizeLimitMiddleware, sniff_image_format, stage_upload
+
+pytestmark = pytest.mark.anyio
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\0" * 16
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 16
+WEBP = b"RIFF\x10\x00\x00\x00WEBPVP8 " + b"\0" * 8
+
+
+@pytest.mark.parametrize(
+    "head, expected",
+    [
+        (JPEG, "jpeg"),
+        (PNG, "png"),
+        (b"GIF87a" + b"\0" * 8, "gif"),
+        (b"GIF89a" + b"\0" * 8, "gif"),
+        (WEBP, "webp"),
+        (b"RIFF\x10\x00\x00\x00WAVEfmt ", None),
+        (b"%PDF-1.7", None),
+        (b"", None),
+    ],
+)
+def test_sniff_image_format(head, expected):
+    assert sniff_image_format(head) == expected
+
+
+def _upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="image")
+
+
+async def test_stage_upload_fingerprints_and_rewinds_the_file(monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_SIZE", 8)
+    content = PNG + b"pixels"
+
+    staged = await stage_upload(_upload(content))
+
+    assert (staged.image_format, staged.media_type) == ("png", "image/png")
+    assert staged.size == len(content)
+    assert staged.sha256 == hashlib.sha256(content).hexdigest()
+    assert staged.file.read() == content
+
+
+@pytest.mark.parametrize(
+    "content, status_code",
+    [
+        (b"%PDF-1.7" + b"\0" * 16, 415),
+        (JPEG + b"\0" * 100, 413),
+        (b"", 400),
+    ],
+    ids=["not_an_image", "too_large", "empty"],
+)
+async def test_stage_upload_rejects(monkeypatch, content, status_code):
+    monkeypatch.setattr(config, "UPLOAD_MAX_SIZE", 64)
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_SIZE", 16)
+
+    with pytest.raises(HTTPException) as error:
+        await stage_upload(_upload(content))
+
+    assert error.value.status_code == status_code
+
+
+@pytest.fixture
+async def limited_client():
+    app = FastAPI()
+
+    @app.post("/upload")
+    @app.post("/upload/batch")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    limited = BodySizeLimitMiddleware(app, max_body_size=10, path_limits={"/upload/batch": 20})
+    async with AsyncClient(transport=ASGITransport(app=limited), base_url="http://test") as client:
+        yield client
+
+
+def _chunked(body: bytes):
+    # An async body is sent without Content-Length, in chunks of 4 bytes.
+    async def chunks():
+        for start in range(0, len(body), 4):
+            yield body[start:start + 4]
+
+    return chunks()
+
+
+@pytest.mark.parametrize("chunked", [False, True], ids=["content_length", "chunked"])
+@pytest.mark.parametrize(
+    "path, size, status_code",
+    [
+        ("/upload", 10, 200),
+        ("/upload", 11, 413),
+        ("/upload/batch", 20, 200),
+        ("/upload/batch", 21, 413),
+    ],
+)
+async def test_body_size_limit_of_the_path(limited_client, chunked, path, size, status_code):
+    body = b"x" * size
+
+    response = await limited_client.post(path, content=_chunked(body) if chunked else body)
+
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert response.json() == {"size": size}
@@ -0,0 +1,67 @@
+import os
+
+from fastapi import HTTPException
+
+from src.repository.tag import TagRepository
+
+
+def _image() -> bytes:
+    return b"\xff\xd8\xff" + os.urandom(1024)
+
+
+def test_upload_holds_no_connection_during_storage_put(client, admin_headers, storage):
+    response = client.request(
+        "POST", "/photo/upload", files={"file": ("a.jpg", _image(), "image/jpeg")}, headers=admin_headers
+    )
+
+    assert response.status_code == 201
+    assert storage.checked_out == [0]
+
+
+def test_upload_of_stored_content_shares_the_asset(client, admin_headers, storage):
+    image = _image()
+    first = client.request("POST", "/photo/upload", files={"file": ("a.jpg", image, "image/jpeg")}, headers=admin_headers)
+    second = client.request("POST", "/photo/upload", files={"file": ("b.jpg", image, "image/jpeg")}, headers=admin_headers)
+
+    assert second.status_code == 201
+    assert second.json()["cloudinary_id"] == first.json()["cloudinary_id"]
+    assert len(storage.checked_out) == 1
+
+
+def test_batch_upload_holds_no_connection_during_storage_put(client, admin_headers, storage):
+    stored, new = _image(), _image()
+    client.request("POST", "/photo/upload", files={"file": ("stored.jpg", stored, "image/jpeg")}, headers=admin_headers)
+    storage.checked_out.clear()
+
+    response = client.request(
+        "POST",
+        "/photo/upload/batch",
+        files=[
+            ("files", ("stored.jpg", stored, "image/jpeg")),
+            ("files", ("new.jpg", new, "image/jpeg")),
+            ("files", ("copy.jpg", new, "image/jpeg")),
+        ],
+        headers=admin_headers,
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["uploaded"] == 3
+    assert body["items"][1]["photo"]["cloudinary_id"] == body["items"][2]["photo"]["cloudinary_id"]
+    # One upload for the two copies of the new file, none for the stored one.
+    assert storage.checked_out == [0]
+
+
+def test_new_file_is_deleted_when_the_photo_cannot_be_saved(client, admin_headers, storage, monkeypatch):
+    async def fail(db, names):
+        raise HTTPException(status_code=409, detail="Tag conflict")
+
+    monkeypatch.setattr(TagRepository, "get_or_create_many", fail)
+
+    response = client.request(
+        "POST", "/photo/upload", files={"file": ("a.jpg", _image(), "image/jpeg")}, headers=admin_headers
+    )
+
+    assert response.status_code == 409
+    assert len(storage.checked_out) == 1
+    assert len(storage.deleted) == 1